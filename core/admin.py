@@ -1,7 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import Q
+from django.utils import timezone
+from .busqueda import hay_fts, ids_comentarios, ids_menu
 from .models import *
 
+# Máximo de coincidencias que la búsqueda de texto completo devuelve al admin
+LIMITE_BUSQUEDA_ADMIN = 1000
+
 class UsuarioAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'rol', 'is_staff')
     list_filter = ('rol', 'is_staff', 'is_superuser')
@@ -17,21 +23,62 @@ class MenuAdmin(admin.ModelAdmin):
     list_filter = ('categoria', 'disponible', 'restaurante')
     search_fields = ('nombre', 'descripcion')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Con FTS5 se busca en el índice en lugar de LIKE '%término%' sobre cada fila
+        if not search_term or not hay_fts(Menu):
+            return super().get_search_results(request, queryset, search_term)
+        ids = ids_menu(search_term, LIMITE_BUSQUEDA_ADMIN, solo_disponibles=False)
+        return queryset.filter(pk__in=ids), False
+
 class PedidoAdmin(admin.ModelAdmin):
     list_display = ('id', 'cliente', 'fecha_pedido', 'estado', 'total')
     list_filter = ('estado', 'fecha_pedido')
     search_fields = ('cliente__username', 'cliente__email')
 
 class ReservaAdmin(admin.ModelAdmin):
-    list_display = ('id', 'cliente', 'fecha_reserva', 'numero_personas', 'estado')
+    list_display = ('id', 'cliente', 'fecha_reserva', 'numero_personas', 'mesa', 'estado')
     list_filter = ('estado', 'fecha_reserva')
     search_fields = ('cliente__username', 'cliente__email')
 
+class TrayectoZonaInline(admin.TabularInline):
+    model = TrayectoZona
+    fk_name = 'origen'
+    extra = 1
+
+class ZonaEntregaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'activa')
+    list_filter = ('activa',)
+    search_fields = ('nombre',)
+    inlines = [TrayectoZonaInline]
+
+class MesaAdmin(admin.ModelAdmin):
+    list_display = ('numero', 'capacidad', 'zona', 'activa')
+    list_filter = ('activa', 'zona')
+
 class ComentarioAdmin(admin.ModelAdmin):
     list_display = ('cliente', 'calificacion', 'fecha', 'aprobado')
     list_filter = ('calificacion', 'aprobado', 'fecha')
     search_fields = ('cliente__username', 'texto')
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not hay_fts(Comentario):
+            return super().get_search_results(request, queryset, search_term)
+        ids = ids_comentarios(search_term, LIMITE_BUSQUEDA_ADMIN)
+        return queryset.filter(Q(pk__in=ids) | Q(cliente__username__istartswith=search_term)), False
+
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'prioridad', 'intentos', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('reclamo', 'bloqueada_hasta', 'resultado', 'error', 'fecha_creacion', 'fecha_fin')
+    actions = ['reintentar']
+
+    @admin.action(description='Reintentar las tareas seleccionadas')
+    def reintentar(self, request, queryset):
+        actualizadas = queryset.exclude(estado='en_curso').update(
+            estado='pendiente', intentos=0, disponible_desde=timezone.now(), reclamo='', bloqueada_hasta=None,
+        )
+        self.message_user(request, f'{actualizadas} tareas vuelven a la cola.')
+
 # Registrar modelos en el admin
 admin.site.register(Usuario, UsuarioAdmin)
 admin.site.register(Restaurante)
@@ -39,6 +86,10 @@ admin.site.register(Categoria)
 admin.site.register(Menu, MenuAdmin)
 admin.site.register(Pedido, PedidoAdmin)
 admin.site.register(ItemPedido)
+admin.site.register(Mesa, MesaAdmin)
 admin.site.register(Reserva, ReservaAdmin)
 admin.site.register(Comentario, ComentarioAdmin)
-admin.site.register(Reporte)
\ No newline at end of file
+admin.site.register(Reporte)
+admin.site.register(ResumenDiario)
+admin.site.register(Tarea, TareaAdmin)
+admin.site.register(ZonaEntrega, ZonaEntregaAdmin)
\ No newline at end of file
@@ -0,0 +1,123 @@
+import hashlib
+from collections import namedtuple
+
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.views.decorators.http import condition
+
+from .models import Categoria, ItemPedido, Menu, Pedido, Reserva
+
+# API JSON de solo lectura (/api/v1/) para el menú y los pedidos y reservas
+# del cliente. Cada recurso tiene un ETag y un Last-Modified que salen de
+# ``Count`` y ``Max(fecha_actualizacion)`` de sus filas: una consulta agregada
+# que responde un índice. Si el cliente ya tiene esa versión se devuelve 304
+# sin ejecutar la consulta principal ni serializar nada. Las filas se leen con
+# ``values()`` para no construir instancias de los modelos.
+#
+# Un ``queryset.update()`` no toca ``fecha_actualizacion`` (auto_now): quien
+# lo use sobre estos modelos tiene que asignarla, como cambiar_estados.
+
+VERSION_API = 1
+
+CAMPOS_CATEGORIA = ('id', 'nombre', 'descripcion', 'tipo')
+CAMPOS_MENU = ('id', 'categoria_id', 'nombre', 'descripcion', 'precio', 'disponible', 'imagen')
+CAMPOS_PEDIDO = ('id', 'fecha_pedido', 'fecha_actualizacion', 'estado', 'total', 'direccion_entrega')
+CAMPOS_ITEM = ('producto_id', 'producto__nombre', 'cantidad', 'subtotal')
+CAMPOS_RESERVA = ('id', 'fecha_reserva', 'fecha_creacion', 'fecha_actualizacion', 'numero_personas', 'mesa', 'estado')
+
+Validadores = namedtuple('Validadores', ['etag', 'ultima_modificacion'])
+SIN_VALIDADORES = Validadores(None, None)
+
+
+def validadores(*querysets, variantes=()):
+    """ETag y Last-Modified del conjunto de filas de ``querysets``.
+
+    La cantidad de filas entra en el ETag para que un borrado también cambie
+    la versión aunque no mueva la fecha máxima.
+    """
+    partes = [f'v{VERSION_API}', *map(str, variantes)]
+    ultima = None
+    for queryset in querysets:
+        datos = queryset.order_by().aggregate(cantidad=Count('pk'), ultima=Max('fecha_actualizacion'))
+        partes.append(f'{datos["cantidad"]}:{datos["ultima"].isoformat() if datos["ultima"] else ""}')
+        if datos['ultima'] and (ultima is None or datos['ultima'] > ultima):
+            ultima = datos['ultima']
+    resumen = hashlib.md5('|'.join(partes).encode(), usedforsecurity=False).hexdigest()
+    return Validadores(f'"{resumen}"', ultima)
+
+
+def condicional(calcular):
+    """Como ``condition`` de Django, pero calculando los validadores una vez por petición.
+
+    ``calcular(request, *args, **kwargs)`` devuelve unos ``Validadores``.
+    """
+    def obtener(request, *args, **kwargs):
+        if not hasattr(request, '_validadores_api'):
+            request._validadores_api = calcular(request, *args, **kwargs)
+        return request._validadores_api
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: obtener(request, *args, **kwargs).etag,
+        last_modified_func=lambda request, *args, **kwargs: obtener(request, *args, **kwargs).ultima_modificacion,
+    )
+
+
+def respuesta(datos):
+    return JsonResponse(datos, json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False})
+
+
+def validadores_menu(request):
+    return validadores(Menu.objects.all(), Categoria.objects.all())
+
+
+def menu():
+    almacen = Menu._meta.get_field('imagen').storage
+    productos = list(Menu.objects.order_by('categoria_id', 'nombre').values(*CAMPOS_MENU))
+    for producto in productos:
+        producto['imagen'] = almacen.url(producto['imagen']) if producto['imagen'] else None
+    return {
+        'categorias': list(Categoria.objects.order_by('nombre').values(*CAMPOS_CATEGORIA)),
+        'productos': productos,
+    }
+
+
+def pedidos_de(cliente):
+    return Pedido.objects.filter(cliente=cliente).values(*CAMPOS_PEDIDO)
+
+
+def validadores_pedidos(request):
+    return validadores(Pedido.objects.filter(cliente=request.user))
+
+
+def validadores_pedido(request, pedido_id):
+    # Los items muestran el nombre del producto: renombrarlo también cambia la versión
+    fechas = Pedido.objects.filter(pk=pedido_id, cliente=request.user).annotate(
+        productos=Max('items__producto__fecha_actualizacion'),
+    ).values_list('fecha_actualizacion', 'productos').first()
+    if fechas is None:
+        return SIN_VALIDADORES
+    fecha, productos = fechas
+    ultima = max(fecha, productos) if productos else fecha
+    variantes = (pedido_id, fecha.isoformat(), productos.isoformat() if productos else '')
+    return validadores(variantes=variantes)._replace(ultima_modificacion=ultima)
+
+
+def pedido(cliente, pedido_id):
+    """El pedido ``pedido_id`` de ``cliente`` con sus items, o ``None``"""
+    datos = pedidos_de(cliente).filter(pk=pedido_id).first()
+    if datos is None:
+        return None
+    datos['items'] = list(
+        ItemPedido.objects.filter(pedido_id=pedido_id).order_by('id').values(*CAMPOS_ITEM)
+    )
+    for item in datos['items']:
+        item['producto'] = item.pop('producto__nombre')
+    return datos
+
+
+def reservas_de(cliente):
+    return Reserva.objects.filter(cliente=cliente).values(*CAMPOS_RESERVA)
+
+
+def validadores_reservas(request):
+    return validadores(Reserva.objects.filter(cliente=request.user))
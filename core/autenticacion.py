@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import Usuario
+from .versiones import cache_local
+
+# Resolución del usuario autenticado desde la caché. En cada petición
+# AuthenticationMiddleware pide el usuario de la sesión al backend; aquí se
+# sirve la instancia cacheada (con ``rol``, que es lo que miran es_admin,
+# es_personal y es_cliente) y solo se va a la base si no está. Las señales de
+# Usuario reescriben la entrada al guardar y la borran al eliminar.
+#
+# Un cambio hecho con ``queryset.update()`` no pasa por las señales: después
+# hay que llamar a ``olvidar_usuario``.
+#
+# Con una caché local esa reescritura solo llega al proceso que guardó: en los
+# demás un usuario desactivado o con menos permisos seguiría entrando hasta
+# que venza su entrada, así que ahí se guarda solo unos segundos.
+
+USUARIO_CACHE_TTL = 60 * 60
+USUARIO_CACHE_TTL_LOCAL = 30
+
+
+def clave_usuario(user_id):
+    return f'usuario:{user_id}'
+
+
+def _ttl():
+    ttl = getattr(settings, 'USUARIO_CACHE_TTL', USUARIO_CACHE_TTL)
+    if cache_local():
+        return min(ttl, getattr(settings, 'USUARIO_CACHE_TTL_LOCAL', USUARIO_CACHE_TTL_LOCAL))
+    return ttl
+
+
+def guardar_usuario(usuario):
+    cache.set(clave_usuario(usuario.pk), usuario, _ttl())
+
+
+def olvidar_usuario(user_id):
+    cache.delete(clave_usuario(user_id))
+
+
+class BackendUsuarioCacheado(ModelBackend):
+    """``ModelBackend`` cuyo ``get_user`` lee primero de la caché"""
+
+    def get_user(self, user_id):
+        usuario = cache.get(clave_usuario(user_id))
+        if usuario is None:
+            usuario = Usuario._default_manager.filter(pk=user_id).first()
+            if usuario is None:
+                return None
+            guardar_usuario(usuario)
+        return usuario if self.user_can_authenticate(usuario) else None
+
+    async def aget_user(self, user_id):
+        usuario = await cache.aget(clave_usuario(user_id))
+        if usuario is None:
+            usuario = await Usuario._default_manager.filter(pk=user_id).afirst()
+            if usuario is None:
+                return None
+            await cache.aset(clave_usuario(user_id), usuario, _ttl())
+        return usuario if self.user_can_authenticate(usuario) else None
@@ -0,0 +1,84 @@
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Comentario, Menu
+
+# Búsqueda de texto completo con FTS5 de SQLite. La migración 0006 crea las
+# tablas virtuales core_busqueda_menu (nombre, descripción y categoría de cada
+# producto) y core_busqueda_comentarios, y triggers que las mantienen al día
+# con cualquier INSERT/UPDATE/DELETE, incluso los hechos con bulk_create o
+# update(). El tokenizador quita tildes (``jamon`` encuentra ``jamón``), cada
+# término se busca como prefijo y los resultados se ordenan con BM25.
+#
+# En otras bases (sin FTS5) se usa ``icontains`` como antes.
+
+TABLA_MENU = 'core_busqueda_menu'
+TABLA_COMENTARIOS = 'core_busqueda_comentarios'
+# Pesos de BM25 por columna: nombre, descripción, categoría
+PESOS_MENU = (10.0, 2.0, 4.0)
+MAX_TERMINOS = 8
+LIMITE = 20
+
+_TERMINO = re.compile(r'\w+')
+
+
+def consulta_fts(texto):
+    """Expresión MATCH con cada palabra como prefijo, o ``None`` si no hay palabras.
+
+    Las comillas dejan fuera los operadores de FTS5 (``OR``, ``NEAR``, ``*``)
+    que pudiera traer el texto del usuario.
+    """
+    terminos = _TERMINO.findall(texto or '')[:MAX_TERMINOS]
+    if not terminos:
+        return None
+    return ' '.join(f'"{termino}"*' for termino in terminos)
+
+
+def _conexion(modelo):
+    return connections[router.db_for_read(modelo)]
+
+
+def hay_fts(modelo=Menu):
+    return _conexion(modelo).vendor == 'sqlite'
+
+
+def ids_menu(texto, limite=LIMITE, solo_disponibles=True):
+    """Ids de productos que coinciden con ``texto``, del más al menos relevante"""
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return []
+    filtro = 'AND m.disponible' if solo_disponibles else ''
+    sql = (
+        f'SELECT f.rowid FROM {TABLA_MENU} AS f JOIN core_menu AS m ON m.id = f.rowid '
+        f'WHERE {TABLA_MENU} MATCH %s {filtro} '
+        f'ORDER BY bm25({TABLA_MENU}, %s, %s, %s) LIMIT %s'
+    )
+    with _conexion(Menu).cursor() as cursor:
+        cursor.execute(sql, [consulta, *PESOS_MENU, limite])
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def ids_comentarios(texto, limite=LIMITE):
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return []
+    sql = f'SELECT rowid FROM {TABLA_COMENTARIOS} WHERE {TABLA_COMENTARIOS} MATCH %s ORDER BY rank LIMIT %s'
+    with _conexion(Comentario).cursor() as cursor:
+        cursor.execute(sql, [consulta, limite])
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def buscar_menu(texto, limite=LIMITE):
+    """Productos disponibles que coinciden con ``texto``, ordenados por relevancia"""
+    productos = Menu.objects.select_related('categoria')
+    if not hay_fts():
+        return list(
+            productos.filter(disponible=True)
+            .filter(Q(nombre__icontains=texto) | Q(descripcion__icontains=texto) | Q(categoria__nombre__icontains=texto))
+            .order_by('nombre')[:limite]
+        )
+    ids = ids_menu(texto, limite)
+    encontrados = productos.in_bulk(ids)
+    return [encontrados[pk] for pk in ids if pk in encontrados]
@@ -0,0 +1,74 @@
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .models import Menu
+from .versiones import aobtener_version, obtener_version
+
+# Snapshot del catálogo de productos disponibles agrupados por categoría.
+# Se construye con una sola consulta y se guarda en caché junto a la versión
+# del catálogo; las señales de Menu y Categoria incrementan esa versión.
+
+VERSION_CATALOGO = 'catalogo'
+CATALOGO_TIMEOUT = 60 * 60 * 24
+
+
+def _construir_catalogo(restaurante_id=None):
+    productos = Menu.objects.filter(disponible=True).select_related('categoria')
+    if restaurante_id is not None:
+        productos = productos.filter(restaurante_id=restaurante_id)
+
+    productos_por_categoria = {}
+    for producto in productos.order_by('categoria_id', 'id'):
+        productos_por_categoria.setdefault(producto.categoria, []).append(producto)
+    return productos_por_categoria
+
+
+def obtener_catalogo(restaurante_id=None):
+    """Devuelve ``{categoria: [productos disponibles]}`` para el restaurante indicado"""
+    version = obtener_version(VERSION_CATALOGO)
+    clave = f'catalogo:{version}:{restaurante_id or "todos"}'
+    productos_por_categoria = cache.get(clave)
+    if productos_por_categoria is None:
+        productos_por_categoria = _construir_catalogo(restaurante_id)
+        cache.set(clave, productos_por_categoria, CATALOGO_TIMEOUT)
+    return productos_por_categoria
+
+
+async def aobtener_catalogo(restaurante_id=None):
+    version = await aobtener_version(VERSION_CATALOGO)
+    clave = f'catalogo:{version}:{restaurante_id or "todos"}'
+    productos_por_categoria = await cache.aget(clave)
+    if productos_por_categoria is None:
+        productos_por_categoria = await sync_to_async(_construir_catalogo)(restaurante_id)
+        await cache.aset(clave, productos_por_categoria, CATALOGO_TIMEOUT)
+    return productos_por_categoria
+
+
+# Índice en memoria del proceso con precio y disponibilidad por ``Menu.id``.
+# Comparte la versión del catálogo, así que las mismas señales lo invalidan;
+# mientras la versión no cambie, consultarlo no toca la base de datos.
+
+PrecioProducto = namedtuple('PrecioProducto', ['precio', 'disponible', 'nombre'])
+
+_indice_precios = (None, {})
+
+
+def leer_precios(productos):
+    """``{menu_id: PrecioProducto}`` leído de la base para el queryset ``productos``"""
+    return {
+        producto_id: PrecioProducto(precio, disponible, nombre)
+        for producto_id, precio, disponible, nombre in productos.values_list('id', 'precio', 'disponible', 'nombre')
+    }
+
+
+def obtener_indice_precios():
+    """Devuelve ``{menu_id: PrecioProducto}`` para todos los productos"""
+    global _indice_precios
+    version = obtener_version(VERSION_CATALOGO)
+    version_indice, productos = _indice_precios
+    if version_indice != version:
+        productos = leer_precios(Menu.objects.all())
+        _indice_precios = (version, productos)
+    return productos
@@ -0,0 +1,21 @@
+import os
+
+from django.core.checks import Error, register
+
+from .versiones import cache_local
+
+
+@register()
+def cache_compartida_con_varios_workers(app_configs, **kwargs):
+    """Varios workers con caché local no ven las versiones, eventos ni usuarios de los otros"""
+    try:
+        workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    except ValueError:
+        workers = 1
+    if workers > 1 and cache_local():
+        return [Error(
+            f'WEB_CONCURRENCY={workers} con una caché local a cada proceso.',
+            hint='Define REDIS_URL para compartir la caché entre workers o usa un único worker.',
+            id='core.E001',
+        )]
+    return []
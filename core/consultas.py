@@ -0,0 +1,112 @@
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Registro de las consultas SQL de una petición para detectar vistas que se
+# pasan de su presupuesto y patrones N+1 (la misma consulta repetida con
+# distintos parámetros, típico de acceder a relaciones dentro de un {% for %}).
+
+
+class PresupuestoExcedido(AssertionError):
+    pass
+
+
+def presupuesto_consultas(maximo):
+    """Declara cuántas consultas puede hacer una vista como máximo"""
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
+
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?")
+_LISTAS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+def forma_consulta(sql):
+    """Normaliza ``sql`` reemplazando los valores para agrupar consultas iguales"""
+    forma = _LITERALES.sub('?', sql)
+    return _LISTAS.sub('(?)', forma)
+
+
+class RegistroConsultas:
+    """Guarda el SQL ejecutado en todas las conexiones mientras está activo"""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.consultas)
+
+    def repetidas(self, minimo=2):
+        """Formas de consulta que se ejecutaron al menos ``minimo`` veces"""
+        conteo = Counter(forma_consulta(sql) for sql in self.consultas)
+        return {forma: veces for forma, veces in conteo.most_common() if veces >= minimo}
+
+    def resumen(self, minimo=2):
+        lineas = [f'{len(self)} consultas']
+        for forma, veces in self.repetidas(minimo).items():
+            lineas.append(f'  {veces}x {forma[:200]}')
+        return '\n'.join(lineas)
+
+
+@contextmanager
+def registrar_consultas():
+    registro = RegistroConsultas()
+    with _envolver(registro, list(connections.all())):
+        yield registro
+
+
+def instalar_registro(registro):
+    """Como ``registrar_consultas`` pero en dos pasos, para cruzar llamadas a ``sync_to_async``.
+
+    Las conexiones son propias de cada hilo: hay que instalar y quitar el
+    registro en el hilo que ejecuta el ORM. Devuelve las conexiones a pasar
+    a ``quitar_registro``.
+    """
+    conexiones = list(connections.all())
+    for conexion in conexiones:
+        conexion.execute_wrappers.append(registro)
+    return conexiones
+
+
+def quitar_registro(registro, conexiones):
+    for conexion in conexiones:
+        conexion.execute_wrappers.remove(registro)
+
+
+@contextmanager
+def _envolver(registro, conexiones):
+    if not conexiones:
+        yield
+        return
+    with conexiones[0].execute_wrapper(registro):
+        with _envolver(registro, conexiones[1:]):
+            yield
+
+
+@contextmanager
+def presupuesto(maximo, repeticiones=None):
+    """Falla si el bloque ejecuta más de ``maximo`` consultas.
+
+    Con ``repeticiones`` también falla si alguna forma de consulta se repite
+    esa cantidad de veces o más (N+1). Pensado para los tests::
+
+        with presupuesto(6, repeticiones=3):
+            self.client.get(reverse('personal_dashboard'))
+    """
+    with registrar_consultas() as registro:
+        yield registro
+    if len(registro) > maximo:
+        raise PresupuestoExcedido(f'Se esperaban como máximo {maximo} consultas.\n{registro.resumen()}')
+    if repeticiones and registro.repetidas(repeticiones):
+        raise PresupuestoExcedido(f'Consultas repetidas (posible N+1).\n{registro.resumen(repeticiones)}')
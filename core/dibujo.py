@@ -0,0 +1,60 @@
+import io
+
+# Dibujo de los gráficos de reportes. Este módulo corre dentro del pool de
+# procesos: no importa Django y recibe los datos ya calculados, así que cada
+# proceso solo paga una vez la importación de matplotlib.
+
+COLOR = '#0d6efd'
+TITULOS = {
+    'ventas': 'Ventas por día',
+    'horas': 'Pedidos por hora del día',
+    'productos': 'Productos más vendidos',
+}
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot
+    return pyplot
+
+
+def dibujar(tipo, datos, formato='png'):
+    """Devuelve los bytes del gráfico ``tipo`` en ``formato`` (png o svg)"""
+    import numpy as np
+
+    plt = _pyplot()
+    figura, eje = plt.subplots(figsize=(8, 3.6), dpi=100)
+    try:
+        if tipo == 'ventas':
+            etiquetas = datos['fechas']
+            valores = np.asarray(datos['ventas'], dtype=float)
+            posiciones = np.arange(len(etiquetas))
+            eje.fill_between(posiciones, valores, color=COLOR, alpha=0.15)
+            eje.plot(posiciones, valores, color=COLOR, linewidth=2)
+            paso = max(1, len(etiquetas) // 10)
+            eje.set_xticks(posiciones[::paso], [etiquetas[i][5:] for i in range(0, len(etiquetas), paso)])
+            eje.set_ylabel('$')
+        elif tipo == 'horas':
+            valores = np.asarray(datos['pedidos'], dtype=int)
+            eje.bar(np.arange(24), valores, color=COLOR)
+            eje.set_xticks(np.arange(0, 24, 2))
+            eje.set_xlabel('Hora')
+        elif tipo == 'productos':
+            nombres = datos['nombres'][::-1]
+            eje.barh(np.arange(len(nombres)), datos['cantidades'][::-1], color=COLOR)
+            eje.set_yticks(np.arange(len(nombres)), nombres)
+            eje.set_xlabel('Unidades')
+        else:
+            raise ValueError(f'Gráfico desconocido: {tipo}')
+
+        eje.set_title(TITULOS[tipo])
+        eje.spines[['top', 'right']].set_visible(False)
+        eje.grid(axis='y' if tipo != 'productos' else 'x', alpha=0.3)
+        figura.tight_layout()
+
+        salida = io.BytesIO()
+        figura.savefig(salida, format=formato)
+        return salida.getvalue()
+    finally:
+        plt.close(figura)
@@ -0,0 +1,97 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Pedido, Reserva, ResumenDiario, Usuario
+from .resumenes import rango_fechas
+
+# Contadores de los dashboards calculados con un solo aggregate() por tabla
+# (Count/Sum con filter=Q(...)) y cacheados unos segundos, para que muchas
+# pantallas consultando a la vez lleguen a la base una vez por ventana.
+
+
+def _cacheado(clave, calcular):
+    ttl = getattr(settings, 'ESTADISTICAS_CACHE_TTL', 10)
+    if not ttl:
+        return calcular()
+    return cache.get_or_set(f'estadisticas:{clave}', calcular, ttl)
+
+
+async def _acacheado(clave, calcular):
+    # Un acierto de caché no sale del event loop; solo el cálculo usa un hilo
+    ttl = getattr(settings, 'ESTADISTICAS_CACHE_TTL', 10)
+    if not ttl:
+        return await sync_to_async(calcular)()
+    valor = await cache.aget(f'estadisticas:{clave}')
+    if valor is None:
+        valor = await sync_to_async(calcular)()
+        await cache.aset(f'estadisticas:{clave}', valor, ttl)
+    return valor
+
+
+def _rango_hoy():
+    hoy = timezone.localdate()
+    return rango_fechas(hoy, hoy)
+
+
+def _calcular_admin():
+    # Los conteos se resuelven sobre los índices (estado, ...) y (rol); las
+    # ventas históricas salen de los resúmenes diarios y no de sumar
+    # Pedido.total fila por fila
+    pedidos = Pedido.objects.aggregate(
+        total_pedidos=Count('id'),
+        pedidos_pendientes=Count('id', filter=Q(estado='pendiente')),
+    )
+    usuarios = Usuario.objects.aggregate(
+        total_clientes=Count('id', filter=Q(rol='cliente')),
+        total_personal=Count('id', filter=Q(rol='personal')),
+    )
+    ventas = ResumenDiario.objects.aggregate(total_ventas=Sum('total_ventas'))
+    ventas['total_ventas'] = ventas['total_ventas'] or 0
+    return {**pedidos, **usuarios, **ventas}
+
+
+def _calcular_personal():
+    inicio, fin = _rango_hoy()
+    return Pedido.objects.aggregate(
+        pedidos_pendientes=Count('id', filter=Q(estado__in=Pedido.ESTADOS_ABIERTOS)),
+        pedidos_hoy=Count('id', filter=Q(fecha_pedido__gte=inicio, fecha_pedido__lt=fin)),
+    )
+
+
+def estadisticas_admin():
+    return _cacheado('admin', _calcular_admin)
+
+
+async def aestadisticas_admin():
+    return await _acacheado('admin', _calcular_admin)
+
+
+def estadisticas_personal():
+    return _cacheado('personal', _calcular_personal)
+
+
+async def aestadisticas_personal():
+    return await _acacheado('personal', _calcular_personal)
+
+
+def estadisticas_reservas(estado='', fecha=None):
+    """Contadores de gestionar_reservas; ``estado`` y ``fecha`` son los filtros de la vista"""
+    def calcular():
+        filtro = Q()
+        if estado:
+            filtro &= Q(estado=estado)
+        if fecha:
+            inicio, fin = rango_fechas(fecha, fecha)
+            filtro &= Q(fecha_reserva__gte=inicio, fecha_reserva__lt=fin)
+        inicio_hoy, fin_hoy = _rango_hoy()
+        return Reserva.objects.aggregate(
+            total_reservas=Count('id', filter=filtro),
+            reservas_pendientes=Count('id', filter=filtro & Q(estado='pendiente')),
+            reservas_confirmadas=Count('id', filter=filtro & Q(estado='confirmada')),
+            reservas_hoy=Count('id', filter=Q(fecha_reserva__gte=inicio_hoy, fecha_reserva__lt=fin_hoy)),
+        )
+
+    return _cacheado(f'reservas:{estado}:{fecha or ""}', calcular)
@@ -0,0 +1,196 @@
+import gzip
+import mimetypes
+import os
+from collections import namedtuple
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se generan los .gz
+    brotli = None
+
+# Archivos estáticos con hash en el nombre y precomprimidos. collectstatic
+# escribe style.3f2a….css más sus variantes .gz y .br; el middleware las sirve
+# desde STATIC_ROOT con caché de un año, eligiendo la variante que acepte el
+# navegador. Como el hash cambia con el contenido, nunca hace falta revalidar.
+
+EXTENSIONES_COMPRIMIBLES = {'.css', '.js', '.svg', '.json', '.map', '.txt', '.html', '.xml', '.ico'}
+TAMANO_MINIMO = 256
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_SIN_HASH = 'public, max-age=60'
+# Orden de preferencia de las codificaciones y su extensión en disco
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+# Bytes por lectura al servir un archivo bajo ASGI
+TAMANO_BLOQUE = 64 * 1024
+
+
+def comprimir_gzip(contenido):
+    # mtime=0 para que el .gz sea idéntico entre despliegues
+    return gzip.compress(contenido, compresslevel=9, mtime=0)
+
+
+def comprimir_brotli(contenido):
+    return brotli.compress(contenido, quality=11)
+
+
+class AlmacenComprimido(ManifestStaticFilesStorage):
+    """``ManifestStaticFilesStorage`` que además deja variantes .gz y .br de cada archivo.
+
+    Si una plantilla pide un archivo que no está en el manifiesto (por ejemplo
+    en los tests, donde no se corre collectstatic) se usa el nombre sin hash
+    en lugar de fallar.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        procesados = []
+        for original, procesado, modificado in super().post_process(paths, dry_run, **options):
+            if isinstance(procesado, str):
+                procesados.append(procesado)
+            yield original, procesado, modificado
+        if dry_run:
+            return
+
+        # Se comprimen también los originales sin hash para las URLs que los pidan así
+        for nombre in {*procesados, *paths}:
+            if Path(nombre).suffix.lower() not in EXTENSIONES_COMPRIMIBLES or not self.exists(nombre):
+                continue
+            with self.open(nombre) as archivo:
+                contenido = archivo.read()
+            if len(contenido) < TAMANO_MINIMO:
+                continue
+            for extension, comprimir in (('.gz', comprimir_gzip), ('.br', brotli and comprimir_brotli)):
+                if comprimir is None:
+                    continue
+                comprimido = comprimir(contenido)
+                # Solo vale la pena si ahorra algo más que las cabeceras
+                if len(comprimido) < len(contenido) * 0.95:
+                    self.delete(nombre + extension)
+                    self._save(nombre + extension, ContentFile(comprimido))
+
+
+ArchivoEstatico = namedtuple('ArchivoEstatico', ['ruta', 'tamano', 'modificado', 'tipo', 'inmutable', 'variantes'])
+
+
+def indexar(raiz, inmutables=()):
+    """``{ruta relativa: ArchivoEstatico}`` de todo lo que hay bajo ``raiz``.
+
+    ``variantes`` es una tupla ``(codificacion, ruta, tamano)`` en orden de
+    preferencia. Se arma una vez al iniciar para no tocar el disco al buscar.
+    """
+    raiz = Path(raiz)
+    if not raiz.is_dir():
+        return {}
+    extensiones_variante = {extension for _, extension in CODIFICACIONES}
+    indice = {}
+    for directorio, _, archivos in os.walk(raiz):
+        for nombre in archivos:
+            ruta = Path(directorio) / nombre
+            if ruta.suffix in extensiones_variante:
+                continue
+            relativa = ruta.relative_to(raiz).as_posix()
+            estado = ruta.stat()
+            variantes = []
+            for codificacion, extension in CODIFICACIONES:
+                comprimida = ruta.with_name(nombre + extension)
+                if comprimida.is_file():
+                    variantes.append((codificacion, str(comprimida), comprimida.stat().st_size))
+            tipo, _ = mimetypes.guess_type(nombre)
+            indice[relativa] = ArchivoEstatico(
+                str(ruta), estado.st_size, int(estado.st_mtime),
+                tipo or 'application/octet-stream', relativa in inmutables, tuple(variantes),
+            )
+    return indice
+
+
+def nombres_con_hash(raiz):
+    """Los nombres con hash del manifiesto de collectstatic en ``raiz``"""
+    almacen = AlmacenComprimido(location=raiz)
+    return set(almacen.hashed_files.values())
+
+
+def codificaciones_aceptadas(cabecera):
+    aceptadas = set()
+    for parte in cabecera.split(','):
+        codificacion, _, parametros = parte.strip().partition(';')
+        nombre, _, valor = parametros.strip().partition('=')
+        try:
+            if nombre.strip() == 'q' and float(valor) == 0:
+                continue
+        except ValueError:
+            continue
+        aceptadas.add(codificacion.strip().lower())
+    return aceptadas
+
+
+async def leer_en_bloques(ruta):
+    """Contenido de ``ruta`` leído en un hilo aparte, sin bloquear el event loop"""
+    leer = sync_to_async(lambda archivo: archivo.read(TAMANO_BLOQUE), thread_sensitive=False)
+    archivo = await sync_to_async(open, thread_sensitive=False)(ruta, 'rb')
+    try:
+        while bloque := await leer(archivo):
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def responder(request, archivo, asincrono=False):
+    """Respuesta para ``archivo`` según las cabeceras de la petición.
+
+    Con ``asincrono`` (bajo ASGI) el cuerpo es un iterador async: Django
+    consumiría un archivo síncrono entero en memoria antes de enviarlo.
+    """
+    ultima_modificacion = formatdate(archivo.modificado, usegmt=True)
+    desde = request.headers.get('If-Modified-Since')
+    if desde:
+        try:
+            if int(parsedate_to_datetime(desde).timestamp()) >= archivo.modificado:
+                response = HttpResponseNotModified()
+                response['Last-Modified'] = ultima_modificacion
+                response['Cache-Control'] = CACHE_INMUTABLE if archivo.inmutable else CACHE_SIN_HASH
+                return response
+        except (TypeError, ValueError, OverflowError):
+            pass
+
+    ruta, tamano, codificacion = archivo.ruta, archivo.tamano, None
+    if archivo.variantes:
+        aceptadas = codificaciones_aceptadas(request.headers.get('Accept-Encoding', ''))
+        for candidata, ruta_variante, tamano_variante in archivo.variantes:
+            if candidata in aceptadas:
+                ruta, tamano, codificacion = ruta_variante, tamano_variante, candidata
+                break
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=archivo.tipo)
+    elif asincrono:
+        response = StreamingHttpResponse(leer_en_bloques(ruta), content_type=archivo.tipo)
+    else:
+        # Con gunicorn sync FileResponse usa wsgi.file_wrapper, que envía el
+        # archivo con sendfile sin copiarlo a Python
+        response = FileResponse(open(ruta, 'rb'), content_type=archivo.tipo)
+        del response['Content-Disposition']
+    response['Content-Length'] = tamano
+    response['Last-Modified'] = ultima_modificacion
+    response['Cache-Control'] = CACHE_INMUTABLE if archivo.inmutable else CACHE_SIN_HASH
+    if archivo.variantes:
+        response['Vary'] = 'Accept-Encoding'
+    if codificacion:
+        response['Content-Encoding'] = codificacion
+    return response
+
+
+def servir_estaticos():
+    return getattr(settings, 'ESTATICOS_SERVIR', not settings.DEBUG)
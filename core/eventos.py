@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+# Registro de eventos de pedidos en la caché para la cola de cocina en vivo.
+# Cada cambio de un Pedido recibe un número de secuencia y se guarda con su
+# fila ya renderizada; los clientes piden "los eventos desde N", así que el
+# costo crece con la cantidad de cambios y no con las tablets abiertas.
+
+CLAVE_SECUENCIA = 'eventos_pedidos:secuencia'
+EVENTO_TIMEOUT = 60 * 10
+MAX_EVENTOS = 200
+# Cada conexión SSE se cierra sola y EventSource se reconecta con Last-Event-ID.
+# Bajo WSGI la conexión ocupa un worker entero, así que dura mucho menos que
+# el timeout de gunicorn. El long-poll solo espera bajo ASGI.
+DURACION_STREAM = 60
+DURACION_STREAM_SYNC = 25
+ESPERA_POLL = 20
+ESTADOS_CERRADOS = ('entregado', 'cancelado')
+
+
+def _clave_evento(secuencia):
+    return f'eventos_pedidos:{secuencia}'
+
+
+def ultimo_evento():
+    return cache.get(CLAVE_SECUENCIA, 0)
+
+
+async def aultimo_evento():
+    return await cache.aget(CLAVE_SECUENCIA, 0)
+
+
+def publicar_evento_pedido(pedido, nuevo=False):
+    """Registra el estado actual de ``pedido`` como un evento"""
+    evento = {
+        'pedido': pedido.pk,
+        'estado': pedido.estado,
+        'estado_display': pedido.get_estado_display(),
+        'total': str(pedido.total),
+        'nuevo': nuevo,
+        'cerrado': pedido.estado in ESTADOS_CERRADOS,
+    }
+    if not evento['cerrado']:
+        contexto = {'pedido': pedido}
+        evento['fila'] = render_to_string('core/partials/fila_pedido.html', contexto)
+        evento['detalle'] = render_to_string('core/partials/detalle_pedido.html', contexto)
+
+    cache.add(CLAVE_SECUENCIA, 0, timeout=None)
+    secuencia = cache.incr(CLAVE_SECUENCIA)
+    evento['id'] = secuencia
+    cache.set(_clave_evento(secuencia), evento, EVENTO_TIMEOUT)
+    return evento
+
+
+def _armar_respuesta(desde, ultimo, guardados):
+    if desde > ultimo or ultimo - desde > MAX_EVENTOS or len(guardados) < ultimo - desde:
+        # El cliente se quedó demasiado atrás o los eventos ya expiraron
+        return ultimo, None
+    return ultimo, [guardados[_clave_evento(s)] for s in range(desde + 1, ultimo + 1)]
+
+
+def eventos_desde(desde):
+    """Devuelve ``(ultimo_id, eventos)``; ``eventos`` es ``None`` si hay que recargar"""
+    ultimo = ultimo_evento()
+    if desde == ultimo:
+        return ultimo, []
+    claves = [_clave_evento(s) for s in range(max(desde, ultimo - MAX_EVENTOS) + 1, ultimo + 1)]
+    return _armar_respuesta(desde, ultimo, cache.get_many(claves))
+
+
+async def aeventos_desde(desde):
+    ultimo = await aultimo_evento()
+    if desde == ultimo:
+        return ultimo, []
+    claves = [_clave_evento(s) for s in range(max(desde, ultimo - MAX_EVENTOS) + 1, ultimo + 1)]
+    return _armar_respuesta(desde, ultimo, await cache.aget_many(claves))
+
+
+async def esperar_eventos(desde, espera, intervalo=1):
+    """Espera hasta ``espera`` segundos a que haya eventos posteriores a ``desde``"""
+    ultimo, eventos = await aeventos_desde(desde)
+    while eventos == [] and espera > 0:
+        await asyncio.sleep(intervalo)
+        espera -= intervalo
+        ultimo, eventos = await aeventos_desde(desde)
+    return ultimo, eventos
+
+
+def _mensaje(ultimo, eventos):
+    if eventos is None:
+        return f'id: {ultimo}\nevent: recargar\ndata: {{}}\n\n'
+    if eventos:
+        return f'id: {ultimo}\ndata: {json.dumps(eventos)}\n\n'
+    # Comentario para mantener viva la conexión a través de proxies
+    return ': ping\n\n'
+
+
+async def stream_eventos(desde, duracion=DURACION_STREAM, intervalo=1):
+    """Generador de Server-Sent Events con los cambios de pedidos"""
+    loop = asyncio.get_running_loop()
+    fin = loop.time() + duracion
+    yield 'retry: 3000\n\n'
+    while (restante := fin - loop.time()) > 0:
+        ultimo, eventos = await esperar_eventos(desde, min(15, restante), intervalo)
+        yield _mensaje(ultimo, eventos)
+        if eventos is None:
+            return
+        if eventos:
+            desde = ultimo
+
+
+def _esperar_eventos_sync(desde, espera, intervalo):
+    ultimo, eventos = eventos_desde(desde)
+    while eventos == [] and espera > 0:
+        time.sleep(intervalo)
+        espera -= intervalo
+        ultimo, eventos = eventos_desde(desde)
+    return ultimo, eventos
+
+
+def iterar_eventos(desde, duracion=DURACION_STREAM_SYNC, intervalo=1):
+    """Versión síncrona de ``stream_eventos`` para peticiones WSGI.
+
+    Django consumiría entero un generador async antes de enviar nada, así que
+    bajo WSGI cada evento tiene que salir de un iterador síncrono.
+    """
+    fin = time.monotonic() + duracion
+    yield 'retry: 3000\n\n'
+    while (restante := fin - time.monotonic()) > 0:
+        ultimo, eventos = _esperar_eventos_sync(desde, min(15, restante), intervalo)
+        yield _mensaje(ultimo, eventos)
+        if eventos is None:
+            return
+        if eventos:
+            desde = ultimo
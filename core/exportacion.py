@@ -0,0 +1,172 @@
+import csv
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Pedido, Reserva
+from .resumenes import rango_fechas
+
+# Exportación de pedidos (una fila por línea de pedido) y reservas para un
+# rango de fechas. Las filas se leen con ``iterator(chunk_size=...)`` y se
+# codifican y comprimen a medida que se envían, así que la memoria no crece
+# con la cantidad de filas.
+
+CHUNK_SIZE = 2000
+FILAS_POR_TROZO = 500
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# (columna, campo de values_list)
+COLUMNAS_PEDIDOS = (
+    ('pedido_id', 'id'),
+    ('fecha_pedido', 'fecha_pedido'),
+    ('estado', 'estado'),
+    ('total_pedido', 'total'),
+    ('cliente_id', 'cliente_id'),
+    ('cliente_usuario', 'cliente__username'),
+    ('cliente_email', 'cliente__email'),
+    ('direccion_entrega', 'direccion_entrega'),
+    ('item_id', 'items__id'),
+    ('producto_id', 'items__producto_id'),
+    ('producto', 'items__producto__nombre'),
+    ('categoria', 'items__producto__categoria__nombre'),
+    ('precio_lista', 'items__producto__precio'),
+    ('cantidad', 'items__cantidad'),
+    ('subtotal', 'items__subtotal'),
+)
+
+COLUMNAS_RESERVAS = (
+    ('reserva_id', 'id'),
+    ('fecha_reserva', 'fecha_reserva'),
+    ('numero_personas', 'numero_personas'),
+    ('mesa', 'mesa'),
+    ('estado', 'estado'),
+    ('cliente_id', 'cliente_id'),
+    ('cliente_usuario', 'cliente__username'),
+    ('cliente_email', 'cliente__email'),
+    ('notas', 'notas'),
+    ('fecha_creacion', 'fecha_creacion'),
+)
+
+
+def filas_pedidos(desde, hasta):
+    """Pedidos del rango con sus líneas; los pedidos sin líneas salen una vez con la línea vacía"""
+    inicio, fin = rango_fechas(desde, hasta)
+    return (
+        Pedido.objects.filter(fecha_pedido__gte=inicio, fecha_pedido__lt=fin)
+        .order_by('fecha_pedido', 'id', 'items__id')
+        .values_list(*(campo for _, campo in COLUMNAS_PEDIDOS))
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def filas_reservas(desde, hasta):
+    inicio, fin = rango_fechas(desde, hasta)
+    return (
+        Reserva.objects.filter(fecha_reserva__gte=inicio, fecha_reserva__lt=fin)
+        .order_by('fecha_reserva', 'id')
+        .values_list(*(campo for _, campo in COLUMNAS_RESERVAS))
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+CONJUNTOS = {
+    'pedidos': (COLUMNAS_PEDIDOS, filas_pedidos),
+    'reservas': (COLUMNAS_RESERVAS, filas_reservas),
+}
+
+
+def _valor(valor):
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+class _Buffer:
+    """Destino de ``csv.writer`` que devuelve lo escrito en vez de guardarlo"""
+
+    def write(self, texto):
+        return texto
+
+
+def _lotes(filas):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == FILAS_POR_TROZO:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def codificar_csv(columnas, filas):
+    escritor = csv.writer(_Buffer())
+    yield escritor.writerow([nombre for nombre, _ in columnas])
+    for lote in _lotes(filas):
+        yield ''.join(escritor.writerow([_valor(valor) for valor in fila]) for fila in lote)
+
+
+def codificar_jsonl(columnas, filas):
+    nombres = [nombre for nombre, _ in columnas]
+    for lote in _lotes(filas):
+        yield ''.join(
+            json.dumps(dict(zip(nombres, map(_valor, fila))), ensure_ascii=False) + '\n'
+            for fila in lote
+        )
+
+
+CODIFICADORES = {'csv': codificar_csv, 'jsonl': codificar_jsonl}
+
+
+def comprimir(trozos):
+    """Comprime con gzip a medida que llegan los trozos"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for trozo in trozos:
+        comprimido = compresor.compress(trozo)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def exportar(conjunto, formato, desde, hasta, gzip=False):
+    """Generador de bytes con la exportación de ``conjunto`` entre ``desde`` y ``hasta`` (inclusive)"""
+    columnas, filas = CONJUNTOS[conjunto]
+    trozos = (texto.encode('utf-8') for texto in CODIFICADORES[formato](columnas, filas(desde, hasta)))
+    return comprimir(trozos) if gzip else trozos
+
+
+async def _iterar_async(trozos):
+    # Bajo ASGI un iterador síncrono se consumiría entero antes de enviarse;
+    # se pide de a un trozo en el hilo de la petición
+    fin = object()
+    siguiente = sync_to_async(next)
+    while (trozo := await siguiente(trozos, fin)) is not fin:
+        yield trozo
+
+
+def nombre_archivo(conjunto, formato, desde, hasta, gzip=False):
+    return f'{conjunto}_{desde:%Y%m%d}_{hasta:%Y%m%d}.{formato}' + ('.gz' if gzip else '')
+
+
+def respuesta_exportacion(request, conjunto, formato, desde, hasta, gzip=False):
+    trozos = exportar(conjunto, formato, desde, hasta, gzip)
+    if isinstance(request, ASGIRequest):
+        trozos = _iterar_async(trozos)
+    response = StreamingHttpResponse(
+        trozos, content_type='application/gzip' if gzip else FORMATOS[formato],
+    )
+    archivo = nombre_archivo(conjunto, formato, desde, hasta, gzip)
+    response['Content-Disposition'] = f'attachment; filename="{archivo}"'
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import Usuario, Pedido, Reserva, Comentario, ItemPedido
+from .models import Usuario, Pedido, Reserva, Comentario, ItemPedido, ZonaEntrega
 
 class RegistroForm(UserCreationForm):
     email = forms.EmailField(required=True, widget=forms.EmailInput(attrs={'class': 'form-control'}))
@@ -22,12 +22,23 @@ class RegistroForm(UserCreationForm):
 class PedidoForm(forms.ModelForm):
     class Meta:
         model = Pedido
-        fields = ['direccion_entrega', 'notas']
+        fields = ['zona', 'direccion_entrega', 'notas']
         widgets = {
+            'zona': forms.Select(attrs={'class': 'form-control'}),
             'direccion_entrega': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
             'notas': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
         }
 
+    def __init__(self, *args, zonas=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # La zona agrupa el pedido en las rutas de reparto (core.rutas)
+        campo = self.fields['zona']
+        campo.queryset = ZonaEntrega.objects.filter(activa=True).order_by('nombre')
+        campo.empty_label = 'Selecciona tu zona'
+        if zonas is not None:
+            # Opciones ya leídas (la vista es async y no puede consultar al renderizar)
+            campo.choices = [('', campo.empty_label), *zonas]
+
 class ReservaForm(forms.ModelForm):
     fecha_reserva = forms.DateTimeField(
         widget=forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}),
@@ -51,6 +62,12 @@ class ComentarioForm(forms.ModelForm):
             'calificacion': forms.NumberInput(attrs={'min': 1, 'max': 5, 'class': 'form-control'}),
             'pedido': forms.Select(attrs={'class': 'form-control'}),
         }
+        
+    def __init__(self, *args, cliente=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Solo los pedidos del cliente, con el usuario ya cargado para las etiquetas
+        pedidos = Pedido.objects.select_related('cliente').order_by('-fecha_pedido')
+        self.fields['pedido'].queryset = pedidos.filter(cliente=cliente) if cliente else pedidos.none()
 
 class ItemPedidoForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,134 @@
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+from .versiones import aobtener_versiones, cache_local, incrementar_version, obtener_versiones
+
+# Caché de fragmentos de plantilla. La clave de cada fragmento se arma con las
+# versiones de los modelos de los que depende (``'menu'``, ``'categoria'``...)
+# o de un objeto concreto (un ``Pedido``), más los valores por los que varía.
+# Las señales de esos modelos incrementan las versiones, así que un fragmento
+# nunca se invalida a mano: simplemente deja de pedirse su clave vieja.
+#
+# En plantillas se usa ``{% fragmento %}`` (core.templatetags.fragmentos). Las
+# vistas pueden llamar antes a ``aprecargar`` para saber qué fragmentos faltan
+# y consultar la base solo para esos.
+#
+# Con una caché local cada proceso tiene sus propios contadores y no se entera
+# de los cambios hechos en otro (un trabajador de tareas, un shell): ahí los
+# fragmentos duran poco en lugar de un día.
+
+PREFIJO_VERSION = 'modelo:'
+CLAVE_NOMBRES = 'fragmentos:nombres'
+FRAGMENTOS_TTL = 60 * 60 * 24
+FRAGMENTOS_TTL_LOCAL = 60
+
+Precarga = namedtuple('Precarga', ['versiones', 'html'])
+
+
+def nombre_version(fuente):
+    """Contador del que depende ``fuente``: un nombre de modelo, una clase o una instancia"""
+    if isinstance(fuente, models.Model):
+        return f'{PREFIJO_VERSION}{fuente._meta.model_name}:{fuente.pk}'
+    if isinstance(fuente, type) and issubclass(fuente, models.Model):
+        return f'{PREFIJO_VERSION}{fuente._meta.model_name}'
+    return f'{PREFIJO_VERSION}{fuente}'
+
+
+def invalidar(fuente):
+    """Incrementa la versión del modelo y, si ``fuente`` es una instancia, también la suya"""
+    if isinstance(fuente, models.Model):
+        incrementar_version(nombre_version(type(fuente)))
+    incrementar_version(nombre_version(fuente))
+
+
+def clave_fragmento(nombre, versiones, variantes=()):
+    """``versiones`` son pares ``(contador, version)``: el contador identifica al objeto"""
+    datos = repr((tuple(versiones), tuple(str(valor) for valor in variantes)))
+    resumen = hashlib.md5(datos.encode(), usedforsecurity=False).hexdigest()
+    return f'fragmento:{nombre}:{resumen}'
+
+
+def ttl_fragmentos():
+    ttl = getattr(settings, 'FRAGMENTOS_TTL', FRAGMENTOS_TTL)
+    if cache_local():
+        return min(ttl, getattr(settings, 'FRAGMENTOS_TTL_LOCAL', FRAGMENTOS_TTL_LOCAL))
+    return ttl
+
+
+def _contar(nombre, acierto):
+    clave = f'fragmentos:{"aciertos" if acierto else "fallos"}:{nombre}'
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 0, timeout=None)
+        cache.incr(clave)
+    if not acierto:
+        # Los fallos son raros: ahí se aprovecha para anotar el nombre
+        nombres = cache.get(CLAVE_NOMBRES, set())
+        if nombre not in nombres:
+            cache.set(CLAVE_NOMBRES, nombres | {nombre}, timeout=None)
+
+
+def renderizar(nombre, fuentes, variantes, render, precarga=None):
+    """HTML del fragmento desde la caché o, si falta, llamando a ``render()`` y guardándolo"""
+    nombres = [nombre_version(fuente) for fuente in fuentes]
+    versiones = dict(precarga.versiones) if precarga else {}
+    faltan = [nombre_v for nombre_v in nombres if nombre_v not in versiones]
+    if faltan:
+        versiones.update(obtener_versiones(faltan))
+    clave = clave_fragmento(nombre, [(nombre_v, versiones[nombre_v]) for nombre_v in nombres], variantes)
+
+    html = precarga.html.get(clave) if precarga else None
+    if html is None:
+        html = cache.get(clave)
+    if html is not None:
+        _contar(nombre, True)
+        return html
+
+    _contar(nombre, False)
+    html = render()
+    cache.set(clave, html, ttl_fragmentos())
+    return html
+
+
+async def aprecargar(nombre, fragmentos):
+    """Busca de una vez los fragmentos ``nombre`` que va a pedir una plantilla.
+
+    ``fragmentos`` es una lista de ``(fuentes, variantes)`` como los que
+    recibirá ``{% fragmento %}``. Devuelve ``(precarga, faltantes)``: la
+    precarga se pasa a la plantilla como ``fragmentos_precargados`` y
+    ``faltantes`` son los índices que habrá que renderizar. Como la plantilla
+    reutiliza estas mismas versiones y HTML, lo que aquí está en caché no
+    vuelve a depender de la base aunque cambie algo entre medio.
+    """
+    nombres = {nombre_version(fuente) for fuentes, _ in fragmentos for fuente in fuentes}
+    versiones = await aobtener_versiones(nombres)
+    claves = [
+        clave_fragmento(nombre, [(nombre_v, versiones[nombre_v]) for nombre_v in map(nombre_version, fuentes)], variantes)
+        for fuentes, variantes in fragmentos
+    ]
+    html = await cache.aget_many(claves)
+    faltantes = [indice for indice, clave in enumerate(claves) if clave not in html]
+    return Precarga(versiones, html), faltantes
+
+
+def estadisticas_fragmentos():
+    """``{nombre: {'aciertos', 'fallos', 'tasa_aciertos'}}`` de los fragmentos usados"""
+    nombres = sorted(cache.get(CLAVE_NOMBRES, set()))
+    claves = [f'fragmentos:{tipo}:{nombre}' for nombre in nombres for tipo in ('aciertos', 'fallos')]
+    contadores = cache.get_many(claves)
+    estadisticas = {}
+    for nombre in nombres:
+        aciertos = contadores.get(f'fragmentos:aciertos:{nombre}', 0)
+        fallos = contadores.get(f'fragmentos:fallos:{nombre}', 0)
+        total = aciertos + fallos
+        estadisticas[nombre] = {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'tasa_aciertos': round(aciertos / total, 3) if total else None,
+        }
+    return estadisticas
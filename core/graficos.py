@@ -0,0 +1,193 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from .dibujo import dibujar
+from .models import ItemPedido, Pedido, ResumenDiario
+from .resumenes import rango_fechas
+from .versiones import obtener_version
+
+logger = logging.getLogger(__name__)
+
+# Gráficos del reporte cacheados en disco. El nombre del archivo lleva el tipo,
+# la ventana de días, el día y la versión de los datos (que las señales de
+# Pedido incrementan). Si el archivo de la versión actual no existe se sirve el
+# último generado y se pide uno nuevo en segundo plano: un hilo junta los datos
+# con el ORM y un pool de procesos dibuja con matplotlib.
+
+VERSION_GRAFICOS = 'graficos'
+TIPOS = ('ventas', 'horas', 'productos')
+FORMATOS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+VENTANAS = (7, 30, 90)
+
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="800" height="360">'
+    '<rect width="100%" height="100%" fill="#f8f9fa"/>'
+    '<text x="50%" y="50%" text-anchor="middle" fill="#6c757d" font-family="sans-serif" font-size="18">'
+    'Generando gráfico…</text></svg>'
+)
+
+_procesos = None
+_hilos = None
+_en_curso = set()
+_candado = threading.Lock()
+
+
+def directorio():
+    ruta = Path(getattr(settings, 'GRAFICOS_DIR', Path(settings.BASE_DIR) / 'cache' / 'graficos'))
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def _pools():
+    global _procesos, _hilos
+    with _candado:
+        if _procesos is None:
+            # spawn: los procesos no heredan conexiones ni estado de Django
+            _procesos = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'GRAFICOS_PROCESOS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _hilos = ThreadPoolExecutor(max_workers=2, thread_name_prefix='graficos')
+    return _procesos, _hilos
+
+
+def _prefijo(tipo, dias):
+    return f'{tipo}-{dias}d-'
+
+
+def ruta_actual(tipo, dias, formato, hoy=None):
+    hoy = hoy or timezone.localdate()
+    version = obtener_version(VERSION_GRAFICOS)
+    return directorio() / f'{_prefijo(tipo, dias)}{hoy:%Y%m%d}-v{version}.{formato}'
+
+
+def _modificado(archivo):
+    try:
+        return archivo.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def ultimo_generado(tipo, dias, formato):
+    """``(ruta, mtime)`` de la imagen más reciente de ese gráfico, o ``(None, None)``"""
+    archivos = [
+        (modificado, archivo) for archivo in directorio().glob(f'{_prefijo(tipo, dias)}*.{formato}')
+        if (modificado := _modificado(archivo)) is not None
+    ]
+    if not archivos:
+        return None, None
+    modificado, archivo = max(archivos)
+    return archivo, modificado
+
+
+def datos_grafico(tipo, dias, hoy=None):
+    """Datos ya agregados que necesita ``dibujar``; solo tipos simples para pasar entre procesos"""
+    hoy = hoy or timezone.localdate()
+    desde = hoy - timedelta(days=dias - 1)
+    inicio, fin = rango_fechas(desde, hoy)
+
+    if tipo == 'ventas':
+        por_dia = dict(
+            ResumenDiario.objects.filter(fecha__gte=desde, fecha__lte=hoy).values_list('fecha', 'total_ventas')
+        )
+        fechas = [desde + timedelta(days=i) for i in range(dias)]
+        return {
+            'fechas': [fecha.isoformat() for fecha in fechas],
+            'ventas': [float(por_dia.get(fecha, 0)) for fecha in fechas],
+        }
+    if tipo == 'horas':
+        pedidos = [0] * 24
+        por_hora = (
+            Pedido.objects.filter(fecha_pedido__gte=inicio, fecha_pedido__lt=fin)
+            .annotate(hora=ExtractHour('fecha_pedido'))
+            .values('hora')
+            .annotate(total=Count('id'))
+            .values_list('hora', 'total')
+        )
+        for hora, total in por_hora:
+            pedidos[hora] = total
+        return {'pedidos': pedidos}
+    if tipo == 'productos':
+        populares = (
+            ItemPedido.objects.filter(pedido__fecha_pedido__gte=inicio, pedido__fecha_pedido__lt=fin)
+            .values('producto__nombre')
+            .annotate(total=Sum('cantidad'))
+            .order_by('-total')[:10]
+        )
+        return {
+            'nombres': [fila['producto__nombre'] for fila in populares],
+            'cantidades': [fila['total'] for fila in populares],
+        }
+    raise ValueError(f'Gráfico desconocido: {tipo}')
+
+
+def generar_grafico(tipo, dias, formato, ruta=None, procesos=None):
+    """Junta los datos, dibuja en el pool y escribe el archivo de forma atómica"""
+    ruta = ruta or ruta_actual(tipo, dias, formato)
+    datos = datos_grafico(tipo, dias)
+    if procesos is None:
+        contenido = dibujar(tipo, datos, formato)
+    else:
+        contenido = procesos.submit(dibujar, tipo, datos, formato).result()
+
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+    # Las versiones anteriores ya no se van a servir
+    for viejo in ruta.parent.glob(f'{_prefijo(tipo, dias)}*.{formato}'):
+        if viejo != ruta:
+            viejo.unlink(missing_ok=True)
+    return ruta
+
+
+def _generar_en_segundo_plano(tipo, dias, formato, ruta):
+    procesos, _ = _pools()
+    try:
+        generar_grafico(tipo, dias, formato, ruta, procesos)
+    except Exception:
+        logger.exception('No se pudo generar el gráfico %s', ruta.name)
+    finally:
+        close_old_connections()
+        with _candado:
+            _en_curso.discard(ruta)
+
+
+def programar(tipo, dias, formato, ruta):
+    with _candado:
+        if ruta in _en_curso:
+            return
+        _en_curso.add(ruta)
+    _, hilos = _pools()
+    hilos.submit(_generar_en_segundo_plano, tipo, dias, formato, ruta)
+
+
+def obtener_grafico(tipo, dias, formato):
+    """Devuelve la ruta de la imagen a servir (puede ser vieja) o ``None`` si aún no hay ninguna.
+
+    Si la imagen de la versión actual no existe programa su generación, salvo
+    que la última se haya generado hace menos de ``GRAFICOS_INTERVALO_MINIMO``
+    segundos, para no redibujar con cada pedido nuevo.
+    """
+    ruta = ruta_actual(tipo, dias, formato)
+    if ruta.exists():
+        return ruta
+    ultimo, modificado = ultimo_generado(tipo, dias, formato)
+    intervalo = getattr(settings, 'GRAFICOS_INTERVALO_MINIMO', 60)
+    if ultimo is None or time.time() - modificado >= intervalo:
+        programar(tipo, dias, formato, ruta)
+    return ultimo
@@ -0,0 +1,147 @@
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import fragmentos
+from .catalogo import VERSION_CATALOGO
+from .models import Menu
+from .tareas import encolar, tarea
+from .versiones import incrementar_version
+
+# Variantes redimensionadas de las imágenes del menú. Al guardar un producto
+# con una imagen nueva se encola una tarea ``procesar_imagen`` (core.tareas)
+# que genera un JPEG y un WebP por cada ancho de ``IMAGENES_ANCHOS``; así el
+# trabajo sobrevive a que se recicle el worker web. El resultado se anota en
+# ``Menu.imagen_variantes`` junto al nombre de la imagen de origen, así una
+# imagen reemplazada nunca se sirve con las miniaturas de la anterior.
+#
+# El nombre de cada variante lleva el id del producto y un hash del contenido
+# de la imagen: dos productos con ``arepa.jpg`` y ``arepa.png`` no comparten
+# archivos, y una imagen nueva nunca escribe sobre las variantes de otra.
+
+ANCHOS = (200, 400, 800)
+CALIDAD = {'jpg': 80, 'webp': 75}
+CARPETA = 'menu/variantes'
+
+
+def anchos():
+    return tuple(sorted(getattr(settings, 'IMAGENES_ANCHOS', ANCHOS)))
+
+
+def variantes_vigentes(producto):
+    """Las variantes de ``producto`` si corresponden a su imagen actual, si no ``None``"""
+    variantes = producto.imagen_variantes or {}
+    if not producto.imagen or variantes.get('origen') != producto.imagen.name:
+        return None
+    return variantes
+
+
+def necesita_variantes(producto):
+    return bool(producto.imagen) and variantes_vigentes(producto) is None
+
+
+def _anchos_para(ancho_original):
+    # No se agranda: solo los anchos menores al original, o el original si es
+    # más chico que todos
+    return [ancho for ancho in anchos() if ancho < ancho_original] or [ancho_original]
+
+
+def _codificar(imagen, formato):
+    salida = BytesIO()
+    if formato == 'jpg':
+        imagen.convert('RGB').save(salida, 'JPEG', quality=CALIDAD['jpg'], optimize=True, progressive=True)
+    else:
+        imagen.save(salida, 'WEBP', quality=CALIDAD['webp'], method=4)
+    return salida.getvalue()
+
+
+def _guardar(nombre, contenido):
+    # Se borra antes para que el almacenamiento no renombre el archivo
+    default_storage.delete(nombre)
+    return default_storage.save(nombre, ContentFile(contenido))
+
+
+def nombres_variantes(variantes):
+    return {nombre for formato in CALIDAD for _, nombre in (variantes or {}).get(formato, ())}
+
+
+def borrar_variantes(variantes, conservar=()):
+    """Borra los archivos de ``variantes`` salvo los nombres de ``conservar``"""
+    for nombre in nombres_variantes(variantes) - set(conservar):
+        default_storage.delete(nombre)
+
+
+def generar_variantes(producto):
+    """Genera las variantes de la imagen de ``producto`` y las devuelve (sin guardar el producto)"""
+    origen = producto.imagen.name
+    with default_storage.open(origen, 'rb') as archivo:
+        contenido = archivo.read()
+        huella = hashlib.md5(contenido, usedforsecurity=False).hexdigest()[:12]
+        imagen = Image.open(BytesIO(contenido))
+        # Los JPEG se decodifican ya reducidos (1/2, 1/4, 1/8) si sobra resolución
+        # para la variante más ancha; el cuadrado cubre fotos giradas por EXIF
+        imagen.draft('RGB', (anchos()[-1], anchos()[-1]))
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode not in ('RGB', 'RGBA'):
+            imagen = imagen.convert('RGBA' if 'transparency' in imagen.info or imagen.mode in ('LA', 'PA') else 'RGB')
+        ancho, alto = imagen.size
+
+        base = f'{producto.pk}-{huella}'
+        variantes = {'origen': origen, 'ancho': ancho, 'alto': alto, 'jpg': [], 'webp': []}
+        for ancho_variante in _anchos_para(ancho):
+            alto_variante = max(1, round(alto * ancho_variante / ancho))
+            reducida = imagen.resize((ancho_variante, alto_variante), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            for formato in CALIDAD:
+                nombre = _guardar(f'{CARPETA}/{base}-{ancho_variante}.{formato}', _codificar(reducida, formato))
+                variantes[formato].append([ancho_variante, nombre])
+    return variantes
+
+
+def procesar_producto(producto_id, forzar=False):
+    """Genera las variantes del producto si le faltan (o siempre con ``forzar``) y las anota en la base.
+
+    Devuelve ``True`` si generó algo. El ``UPDATE`` se condiciona al nombre de
+    la imagen para no pisar el resultado si la imagen cambió mientras tanto.
+    """
+    producto = Menu.objects.filter(pk=producto_id).only('id', 'imagen', 'imagen_variantes').first()
+    if producto is None or not producto.imagen or not (forzar or necesita_variantes(producto)):
+        return False
+
+    anteriores = producto.imagen_variantes
+    variantes = generar_variantes(producto)
+    actualizados = Menu.objects.filter(pk=producto.pk, imagen=producto.imagen.name).update(imagen_variantes=variantes)
+    if not actualizados:
+        # La imagen cambió mientras tanto; lo que ya esté anotado no se toca
+        actuales = Menu.objects.filter(pk=producto.pk).values_list('imagen_variantes', flat=True).first()
+        borrar_variantes(variantes, conservar=nombres_variantes(actuales))
+        return False
+
+    def confirmado():
+        # Si la tarea se deshace, el producto sigue apuntando a las variantes anteriores
+        borrar_variantes(anteriores, conservar=nombres_variantes(variantes))
+        # update() no dispara señales: el catálogo y los fragmentos deben ver las variantes
+        incrementar_version(VERSION_CATALOGO)
+        fragmentos.invalidar(producto)
+
+    transaction.on_commit(confirmado)
+    return True
+
+
+@tarea('procesar_imagen')
+def procesar_imagen(producto_id):
+    return {'generadas': procesar_producto(producto_id)}
+
+
+def programar(producto):
+    """Encola la generación de variantes para la imagen actual de ``producto``.
+
+    La clave de idempotencia lleva el nombre de la imagen: guardar otra vez el
+    producto antes de que la tarea termine no encola otra.
+    """
+    huella = hashlib.md5(producto.imagen.name.encode(), usedforsecurity=False).hexdigest()[:12]
+    return encolar('procesar_imagen', {'producto_id': producto.pk}, clave=f'imagen:{producto.pk}:{huella}')
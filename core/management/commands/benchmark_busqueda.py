@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from core.busqueda import hay_fts, ids_comentarios, ids_menu
+from core.models import Comentario, Menu
+from core.rendimiento import percentil
+
+TERMINOS = ('arepa', 'arep', 'chicharron', 'maracuya', 'queso campesino', 'frijoles paisa', 'panela')
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return percentil(tiempos, 50), percentil(tiempos, 95), len(resultado)
+
+
+class Command(BaseCommand):
+    help = 'Compara la búsqueda FTS5 con el icontains de siempre sobre productos y comentarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('terminos', nargs='*', default=TERMINOS)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--limite', type=int, default=1000, help='Máximo de resultados por búsqueda')
+
+    def handle(self, *args, **options):
+        if not hay_fts():
+            raise CommandError('La base por defecto no es SQLite: no hay índice FTS5 que medir.')
+        repeticiones, limite = options['repeticiones'], options['limite']
+        self.stdout.write(
+            f'{Menu.objects.count()} productos, {Comentario.objects.count()} comentarios, '
+            f'{repeticiones} repeticiones (ms)'
+        )
+        self.stdout.write(f'{"tabla":<12} {"término":<18} {"icontains p50":>14} {"p95":>7} {"filas":>6} '
+                          f'{"fts p50":>8} {"p95":>7} {"filas":>6}')
+
+        for termino in options['terminos']:
+            palabras = termino.split()
+            # icontains: cada palabra en alguno de los campos, como el search_fields del admin
+            filtro_menu = Q()
+            filtro_comentarios = Q()
+            for palabra in palabras:
+                filtro_menu &= (
+                    Q(nombre__icontains=palabra) | Q(descripcion__icontains=palabra)
+                    | Q(categoria__nombre__icontains=palabra)
+                )
+                filtro_comentarios &= Q(texto__icontains=palabra)
+
+            casos = (
+                ('menu',
+                 lambda: list(Menu.objects.filter(filtro_menu).values_list('id', flat=True)[:limite]),
+                 lambda: ids_menu(termino, limite, solo_disponibles=False)),
+                ('comentarios',
+                 lambda: list(Comentario.objects.filter(filtro_comentarios).values_list('id', flat=True)[:limite]),
+                 lambda: ids_comentarios(termino, limite)),
+            )
+            for tabla, con_like, con_fts in casos:
+                like = medir(con_like, repeticiones)
+                fts = medir(con_fts, repeticiones)
+                self.stdout.write(
+                    f'{tabla:<12} {termino:<18} {like[0]:>14.2f} {like[1]:>7.2f} {like[2]:>6} '
+                    f'{fts[0]:>8.2f} {fts[1]:>7.2f} {fts[2]:>6}'
+                )
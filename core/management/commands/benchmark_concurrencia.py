@@ -0,0 +1,121 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.rendimiento import ENDPOINTS, ENDPOINTS_ESCRITURA, ClienteServidor, medir_concurrente
+
+# Vistas async y, para comparar, un par de vistas que siguen siendo síncronas
+ENDPOINTS_POR_DEFECTO = (
+    'menu', 'hacer_pedido', 'reservar_mesa', 'ver_pedidos',
+    'admin_dashboard', 'personal_dashboard', 'cliente_dashboard', 'generar_reporte',
+)
+
+DESPLIEGUES = {
+    'sync': ('restaurant.wsgi:application', 'sync'),
+    'async': ('restaurant.asgi:application', 'uvicorn.workers.UvicornWorker'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compara el rendimiento con peticiones concurrentes entre el despliegue WSGI y el ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servidor', action='append', default=[], metavar='NOMBRE=URL',
+                            help='Servidor ya levantado, p. ej. async=http://127.0.0.1:8000 (repetible)')
+        parser.add_argument('--iniciar', action='store_true',
+                            help='Levanta con gunicorn un despliegue sync y uno async para la prueba')
+        parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn con --iniciar')
+        parser.add_argument('--puerto', type=int, default=8101, help='Primer puerto con --iniciar')
+        parser.add_argument('--concurrencia', type=int, default=16)
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones por endpoint y servidor')
+        parser.add_argument('--solo', nargs='+', metavar='ENDPOINT', default=list(ENDPOINTS_POR_DEFECTO))
+        parser.add_argument('--password', default='benchmark', help='Contraseña de los usuarios bench_*')
+        parser.add_argument('--salida', type=Path, help='Archivo JSON donde guardar los resultados')
+
+    def handle(self, *args, **options):
+        servidores = {}
+        for valor in options['servidor']:
+            nombre, _, url = valor.partition('=')
+            if not url:
+                raise CommandError(f'--servidor espera NOMBRE=URL, no {valor!r}')
+            servidores[nombre] = url
+        if not servidores and not options['iniciar']:
+            raise CommandError('Indica --iniciar o al menos un --servidor NOMBRE=URL.')
+
+        por_nombre = {endpoint.nombre: endpoint for endpoint in ENDPOINTS + ENDPOINTS_ESCRITURA}
+        desconocidos = set(options['solo']) - set(por_nombre)
+        if desconocidos:
+            raise CommandError(f'Endpoints desconocidos: {", ".join(sorted(desconocidos))}')
+        endpoints = [por_nombre[nombre] for nombre in options['solo']]
+
+        procesos = []
+        try:
+            if options['iniciar']:
+                for desplazamiento, (nombre, (aplicacion, worker)) in enumerate(DESPLIEGUES.items()):
+                    puerto = options['puerto'] + desplazamiento
+                    procesos.append(self.iniciar(aplicacion, worker, puerto, options['workers']))
+                    servidores[nombre] = f'http://127.0.0.1:{puerto}'
+                for url in servidores.values():
+                    self.esperar(url)
+
+            resultados = {}
+            for nombre, url in servidores.items():
+                cliente = ClienteServidor(url, options['password'])
+                self.stdout.write(f'\n{nombre} ({url}), concurrencia {options["concurrencia"]}')
+                self.stdout.write(f'{"endpoint":<24}{"errores":>8}{"p50":>9}{"p95":>9}{"p99":>9}{"req/s":>9}')
+                resultados[nombre] = []
+                for endpoint in endpoints:
+                    try:
+                        resultado = medir_concurrente(cliente, endpoint, options['peticiones'], options['concurrencia'])
+                    except ValueError as e:
+                        raise CommandError(str(e))
+                    resultados[nombre].append(resultado)
+                    self.stdout.write(
+                        f'{resultado["endpoint"]:<24}{resultado["errores"]:>8}{resultado["p50_ms"]:>9.1f}'
+                        f'{resultado["p95_ms"]:>9.1f}{resultado["p99_ms"]:>9.1f}{resultado["peticiones_por_segundo"]:>9.1f}'
+                    )
+        finally:
+            for proceso in procesos:
+                proceso.terminate()
+                proceso.wait(timeout=30)
+
+        if options['salida']:
+            corrida = {
+                'fecha': timezone.now().isoformat(),
+                'concurrencia': options['concurrencia'],
+                'peticiones': options['peticiones'],
+                'workers': options['workers'] if options['iniciar'] else None,
+                'base_de_datos': settings.DATABASES['default']['ENGINE'],
+                'servidores': servidores,
+                'resultados': resultados,
+            }
+            options['salida'].write_text(json.dumps(corrida, indent=2, ensure_ascii=False), encoding='utf-8')
+            self.stdout.write(f'\nResultados guardados en {options["salida"]}')
+
+    def iniciar(self, aplicacion, worker, puerto, workers):
+        comando = [
+            sys.executable, '-m', 'gunicorn', aplicacion,
+            '--worker-class', worker, '--workers', str(workers),
+            '--bind', f'127.0.0.1:{puerto}',
+        ]
+        return subprocess.Popen(comando, cwd=settings.BASE_DIR, env=os.environ.copy(),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def esperar(self, url, limite=30):
+        fin = time.monotonic() + limite
+        while time.monotonic() < fin:
+            try:
+                with urlopen(url, timeout=2):
+                    return
+            except (URLError, ConnectionError, TimeoutError):
+                time.sleep(0.25)
+        raise CommandError(f'El servidor {url} no respondió en {limite} segundos.')
@@ -0,0 +1,64 @@
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from core.mesas import AgendaMesas, duracion_reserva
+
+
+def asignar_lineal(mesas, ocupadas, inicio, fin, personas):
+    """Asignación sin índice: revisa todas las reservas de cada mesa"""
+    for mesa in mesas:
+        if mesa.capacidad < personas:
+            continue
+        if all(fin <= otro_inicio or otro_fin <= inicio for otro_inicio, otro_fin in ocupadas[mesa.numero]):
+            ocupadas[mesa.numero].append((inicio, fin))
+            return mesa
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Mide la asignación de mesas con la agenda indexada frente a una búsqueda lineal'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, default=3000)
+        parser.add_argument('--mesas', type=int, default=60)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        azar = random.Random(options['semilla'])
+        mesas = [
+            SimpleNamespace(numero=f'M{i:03d}', capacidad=azar.choice((2, 2, 4, 4, 6, 8)))
+            for i in range(options['mesas'])
+        ]
+        duracion = duracion_reserva()
+        apertura = datetime(2024, 1, 1, 12)
+        solicitudes = [
+            (apertura + timedelta(minutes=15 * azar.randrange(48)), azar.randint(1, 8))
+            for _ in range(options['reservas'])
+        ]
+
+        agenda = AgendaMesas(mesas)
+        comienzo = time.perf_counter()
+        asignadas = 0
+        for inicio, personas in solicitudes:
+            mesa = agenda.mejor_mesa(inicio, inicio + duracion, personas)
+            if mesa is not None:
+                agenda.ocupar(mesa.numero, inicio, inicio + duracion)
+                asignadas += 1
+        tiempo_agenda = time.perf_counter() - comienzo
+
+        ordenadas = sorted(mesas, key=lambda mesa: (mesa.capacidad, mesa.numero))
+        ocupadas = {mesa.numero: [] for mesa in mesas}
+        comienzo = time.perf_counter()
+        asignadas_lineal = sum(
+            asignar_lineal(ordenadas, ocupadas, inicio, inicio + duracion, personas) is not None
+            for inicio, personas in solicitudes
+        )
+        tiempo_lineal = time.perf_counter() - comienzo
+
+        self.stdout.write(f'Solicitudes: {len(solicitudes)}  Mesas: {len(mesas)}')
+        self.stdout.write(f'Agenda indexada: {asignadas} asignadas en {tiempo_agenda * 1000:.1f} ms')
+        self.stdout.write(f'Búsqueda lineal: {asignadas_lineal} asignadas en {tiempo_lineal * 1000:.1f} ms')
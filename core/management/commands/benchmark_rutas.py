@@ -0,0 +1,46 @@
+import time
+from types import SimpleNamespace
+
+import networkx as nx
+from django.core.management.base import BaseCommand
+
+from core.rutas import calcular_red, planificar
+
+
+class Command(BaseCommand):
+    help = 'Mide los caminos mínimos y el planificador de repartos sobre un grafo de zonas sintético'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zonas', type=int, default=200)
+        parser.add_argument('--pedidos', type=int, default=1000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        semilla = options['semilla']
+        # Cada zona conectada con sus vecinas más algunos atajos, como barrios de una ciudad
+        grafo = nx.connected_watts_strogatz_graph(options['zonas'], 4, 0.1, seed=semilla)
+        for origen, destino in grafo.edges:
+            grafo[origen][destino]['minutos'] = 3 + (origen * 7 + destino * 13 + semilla) % 12
+        nx.set_node_attributes(grafo, {zona: f'Zona {zona}' for zona in grafo}, 'nombre')
+
+        comienzo = time.perf_counter()
+        red = calcular_red(grafo)
+        tiempo_red = time.perf_counter() - comienzo
+
+        pedidos = [
+            SimpleNamespace(id=i, zona_id=(i * 7919 + semilla) % options['zonas'])
+            for i in range(options['pedidos'])
+        ]
+        tiempos = []
+        for _ in range(options['repeticiones']):
+            comienzo = time.perf_counter()
+            plan = planificar(pedidos, red, 0)
+            tiempos.append(time.perf_counter() - comienzo)
+
+        self.stdout.write(f'Grafo: {grafo.number_of_nodes()} zonas, {grafo.number_of_edges()} trayectos')
+        self.stdout.write(f'Caminos mínimos (todos los pares): {tiempo_red * 1000:.1f} ms')
+        self.stdout.write(
+            f'Planificar {len(pedidos)} pedidos: mejor {min(tiempos) * 1000:.1f} ms, '
+            f'peor {max(tiempos) * 1000:.1f} ms ({len(plan.rutas)} salidas, {len(plan.sin_ruta)} sin ruta)'
+        )
@@ -0,0 +1,86 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Pedido, Usuario
+from core.rendimiento import (
+    ENDPOINTS, ENDPOINTS_ESCRITURA, USUARIOS_BENCHMARK, ClienteDjango, ClienteServidor, comparar, medir,
+)
+
+
+class Command(BaseCommand):
+    help = 'Mide p50/p95/p99, consultas por petición y rendimiento de cada vista de core.urls'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=50)
+        parser.add_argument('--calentamiento', type=int, default=5)
+        parser.add_argument('--solo', nargs='+', metavar='ENDPOINT', help='Mide solo estos endpoints')
+        parser.add_argument('--escrituras', action='store_true',
+                            help='Incluye las vistas que crean filas (hacer_pedido por POST)')
+        parser.add_argument('--servidor', metavar='URL',
+                            help='Mide contra un servidor local (p. ej. http://127.0.0.1:8000) en vez del cliente de pruebas')
+        parser.add_argument('--password', default='benchmark', help='Contraseña de los usuarios bench_* (solo --servidor)')
+        parser.add_argument('--salida', type=Path, help='Archivo JSON donde guardar los resultados')
+        parser.add_argument('--comparar', type=Path, metavar='JSON', help='Resultados anteriores para comparar el p95')
+
+    def handle(self, *args, **options):
+        faltantes = set(USUARIOS_BENCHMARK.values()) - set(
+            Usuario.objects.filter(username__in=USUARIOS_BENCHMARK.values()).values_list('username', flat=True)
+        )
+        if faltantes:
+            raise CommandError(f'Faltan los usuarios {", ".join(sorted(faltantes))}; ejecuta antes sembrar_datos.')
+
+        endpoints = ENDPOINTS + (ENDPOINTS_ESCRITURA if options['escrituras'] else ())
+        if options['solo']:
+            conocidos = {endpoint.nombre for endpoint in endpoints}
+            desconocidos = set(options['solo']) - conocidos
+            if desconocidos:
+                raise CommandError(f'Endpoints desconocidos: {", ".join(sorted(desconocidos))}')
+            endpoints = [endpoint for endpoint in endpoints if endpoint.nombre in options['solo']]
+
+        if options['servidor']:
+            cliente = ClienteServidor(options['servidor'], options['password'])
+        else:
+            cliente = ClienteDjango()
+
+        resultados = []
+        self.stdout.write(f'{"endpoint":<24}{"estado":>8}{"p50":>9}{"p95":>9}{"p99":>9}{"consultas":>11}{"req/s":>9}')
+        for endpoint in endpoints:
+            try:
+                resultado = medir(cliente, endpoint, options['repeticiones'], options['calentamiento'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            resultados.append(resultado)
+            consultas = resultado['consultas'] if resultado['consultas'] is not None else '-'
+            self.stdout.write(
+                f'{resultado["endpoint"]:<24}{",".join(map(str, resultado["estados"])):>8}'
+                f'{resultado["p50_ms"]:>9.1f}{resultado["p95_ms"]:>9.1f}{resultado["p99_ms"]:>9.1f}'
+                f'{consultas:>11}{resultado["peticiones_por_segundo"]:>9.1f}'
+            )
+
+        corrida = {
+            'fecha': timezone.now().isoformat(),
+            'modo': 'servidor' if options['servidor'] else 'cliente',
+            'servidor': options['servidor'],
+            'repeticiones': options['repeticiones'],
+            'pedidos_en_base': Pedido.objects.count(),
+            'base_de_datos': settings.DATABASES['default']['ENGINE'],
+            'debug': settings.DEBUG,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'resultados': resultados,
+        }
+        if options['salida']:
+            options['salida'].write_text(json.dumps(corrida, indent=2, ensure_ascii=False), encoding='utf-8')
+            self.stdout.write(f'Resultados guardados en {options["salida"]}')
+
+        if options['comparar']:
+            anterior = json.loads(options['comparar'].read_text(encoding='utf-8'))
+            self.stdout.write(f'\nComparación del p95 contra {options["comparar"]}:')
+            for nombre, antes, ahora, variacion in comparar(corrida, anterior):
+                self.stdout.write(f'{nombre:<24}{antes:>9.1f}{ahora:>9.1f}{variacion:>+9.1f} %')
@@ -0,0 +1,31 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exportacion import CONJUNTOS, FORMATOS, exportar
+
+
+class Command(BaseCommand):
+    help = 'Exporta pedidos (con sus líneas) o reservas de un rango de fechas en CSV o JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('conjunto', choices=sorted(CONJUNTOS))
+        parser.add_argument('--desde', type=date.fromisoformat, required=True, help='Primer día (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=date.fromisoformat, required=True, help='Último día (AAAA-MM-DD)')
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida con gzip')
+        parser.add_argument('--salida', help='Archivo de destino (por defecto la salida estándar)')
+
+    def handle(self, *args, **options):
+        if options['desde'] > options['hasta']:
+            raise CommandError('--desde debe ser anterior o igual a --hasta')
+
+        trozos = exportar(options['conjunto'], options['formato'], options['desde'], options['hasta'], options['gzip'])
+        if options['salida']:
+            with open(options['salida'], 'wb') as archivo:
+                archivo.writelines(trozos)
+            self.stderr.write(self.style.SUCCESS(f'Exportación guardada en {options["salida"]}.'))
+        else:
+            sys.stdout.buffer.writelines(trozos)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.imagenes import necesita_variantes, procesar_producto
+from core.models import Menu
+
+
+def _procesar(producto_id, forzar):
+    try:
+        return procesar_producto(producto_id, forzar=forzar), None
+    except Exception as error:
+        return False, f'producto {producto_id}: {error}'
+
+
+def _procesar_en_hilo(producto_id, forzar):
+    try:
+        return _procesar(producto_id, forzar)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas JPEG/WebP de las imágenes del menú que aún no las tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenera también las que ya tienen variantes')
+        parser.add_argument('--hilos', type=int, default=4, help='Imágenes procesadas en paralelo')
+
+    def handle(self, *args, **options):
+        forzar = options['todas']
+        productos = Menu.objects.exclude(imagen='').exclude(imagen__isnull=True).only('id', 'imagen', 'imagen_variantes')
+        pendientes = [producto.pk for producto in productos.iterator() if forzar or necesita_variantes(producto)]
+        if not pendientes:
+            self.stdout.write('No hay imágenes pendientes.')
+            return
+
+        inicio = time.perf_counter()
+        if options['hilos'] <= 1:
+            resultados = [_procesar(producto_id, forzar) for producto_id in pendientes]
+        else:
+            # Pillow libera el GIL al redimensionar y codificar, así que los hilos rinden
+            with ThreadPoolExecutor(max_workers=options['hilos']) as hilos:
+                resultados = list(hilos.map(_procesar_en_hilo, pendientes, [forzar] * len(pendientes)))
+
+        errores = [error for _, error in resultados if error]
+        for error in errores:
+            self.stderr.write(error)
+        generadas = sum(1 for generado, _ in resultados if generado)
+        self.stdout.write(self.style.SUCCESS(
+            f'Variantes generadas para {generadas} de {len(pendientes)} productos '
+            f'en {time.perf_counter() - inicio:.1f} s ({len(errores)} errores).'
+        ))
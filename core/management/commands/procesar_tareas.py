@@ -0,0 +1,107 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tareas
+
+
+class Command(BaseCommand):
+    help = 'Trabajador de la cola de tareas en segundo plano (core.tareas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4, help='Tareas ejecutadas en paralelo')
+        parser.add_argument('--procesos', action='store_true',
+                            help='Usa un pool de procesos en lugar de hilos (para tareas que consumen CPU)')
+        parser.add_argument('--tipo', action='append', dest='tipos', choices=sorted(tareas.TIPOS),
+                            help='Solo procesa estos tipos (se puede repetir)')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos entre consultas con la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Termina cuando no queden tareas disponibles')
+        parser.add_argument('--limpiar', type=int, metavar='DIAS',
+                            help='Antes de empezar borra las tareas terminadas hace más de DIAS días')
+
+    def handle(self, *args, **options):
+        if options['limpiar'] is not None:
+            self.stdout.write(f'{tareas.limpiar(options["limpiar"])} tareas viejas borradas.')
+
+        inicio = time.perf_counter()
+        if options['hilos'] <= 1 and not options['procesos']:
+            estados = self.procesar_en_serie(options)
+        else:
+            estados = self.procesar_en_pool(options)
+
+        resumen = ', '.join(f'{cantidad} {estado}' for estado, cantidad in sorted(estados.items())) or 'ninguna'
+        self.stdout.write(self.style.SUCCESS(
+            f'Tareas ejecutadas: {resumen} en {time.perf_counter() - inicio:.1f} s.'
+        ))
+
+    def procesar_en_serie(self, options):
+        estados = {}
+        try:
+            while True:
+                reclamadas = tareas.reclamar(1, options['tipos'])
+                if not reclamadas:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                estado = tareas.ejecutar(reclamadas[0])
+                estados[estado] = estados.get(estado, 0) + 1
+        except KeyboardInterrupt:
+            pass
+        return estados
+
+    def procesar_en_pool(self, options):
+        hilos = max(options['hilos'], 1)
+        if options['procesos']:
+            # Las conexiones abiertas no deben pasar a los procesos hijos
+            connections.close_all()
+            pool = ProcessPoolExecutor(
+                max_workers=hilos,
+                mp_context=multiprocessing.get_context('spawn'),
+                # Con spawn cada proceso arranca vacío y tiene que cargar Django
+                initializer=django.setup,
+            )
+
+            def enviar(reclamada):
+                return pool.submit(tareas.ejecutar_en_proceso, reclamada.pk, reclamada.reclamo)
+        else:
+            pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='tareas')
+
+            def enviar(reclamada):
+                return pool.submit(tareas.ejecutar_en_hilo, reclamada)
+
+        estados = {}
+        en_curso = set()
+        try:
+            while True:
+                # Solo se reclama lo que el pool puede empezar ya: lo demás
+                # queda en la cola para otros trabajadores
+                nuevas = tareas.reclamar(hilos - len(en_curso), options['tipos'])
+                en_curso.update(enviar(reclamada) for reclamada in nuevas)
+                if not en_curso:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                if nuevas and len(en_curso) < hilos:
+                    continue
+                terminadas, en_curso = wait(en_curso, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                for futuro in terminadas:
+                    try:
+                        estado = futuro.result()
+                    except Exception as error:
+                        # Sin poder anotar el resultado, la tarea se retoma al vencer su reserva
+                        self.stderr.write(f'Error del trabajador: {error!r}')
+                        estado = 'interrumpida'
+                    if estado is not None:
+                        estados[estado] = estados.get(estado, 0) + 1
+        except KeyboardInterrupt:
+            # Las tareas ya empezadas terminan; las demás siguen en la cola
+            self.stdout.write('Esperando a que terminen las tareas en curso...')
+        finally:
+            pool.shutdown(wait=True)
+        return estados
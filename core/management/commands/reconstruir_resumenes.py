@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core.models import Pedido, Reserva
+from core.graficos import VERSION_GRAFICOS
+from core.resumenes import recalcular_dias
+from core.versiones import incrementar_version
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla ResumenDiario a partir de los pedidos y reservas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help='Primer día (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Último día (AAAA-MM-DD)')
+        parser.add_argument('--dias-por-lote', type=int, default=31)
+
+    def handle(self, *args, **options):
+        desde, hasta = options['desde'], options['hasta']
+        if desde is None or hasta is None:
+            limites_pedidos = Pedido.objects.aggregate(min=Min('fecha_pedido'), max=Max('fecha_pedido'))
+            limites_reservas = Reserva.objects.aggregate(min=Min('fecha_reserva'), max=Max('fecha_reserva'))
+            fechas = [
+                timezone.localdate(valor)
+                for valor in (*limites_pedidos.values(), *limites_reservas.values())
+                if valor is not None
+            ]
+            if not fechas:
+                self.stdout.write('No hay pedidos ni reservas para resumir.')
+                return
+            desde = desde or min(fechas)
+            hasta = hasta or max(fechas)
+        if desde > hasta:
+            raise CommandError('--desde debe ser anterior o igual a --hasta')
+
+        dias = 0
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + timedelta(days=options['dias_por_lote'] - 1), hasta)
+            with transaction.atomic():
+                dias += recalcular_dias(inicio, fin)
+            inicio = fin + timedelta(days=1)
+
+        incrementar_version(VERSION_GRAFICOS)
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes reconstruidos: {dias} días entre {desde} y {hasta}.'))
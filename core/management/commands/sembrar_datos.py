@@ -0,0 +1,232 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import (
+    Categoria, Comentario, ItemPedido, Menu, Mesa, Pedido, Reserva, Restaurante, TrayectoZona, Usuario,
+    ZonaEntrega,
+)
+from core.catalogo import VERSION_CATALOGO
+from core.fragmentos import invalidar
+from core.graficos import VERSION_GRAFICOS
+from core.mesas import VERSION_MESAS
+from core.resumenes import recalcular_dias
+from core.rutas import VERSION_ZONAS
+from core.versiones import incrementar_version
+
+# Cantidades para ``--escala 1``; cada una se multiplica por la escala
+CANTIDADES = {
+    'restaurantes': 3,
+    'categorias': 12,
+    'productos': 2000,
+    'clientes': 2000,
+    'pedidos': 100000,
+    'reservas': 50000,
+    'comentarios': 20000,
+    'mesas': 40,
+    'zonas': 40,
+}
+
+COMENTARIOS = (
+    'Muy rico todo', 'Llegó frío', 'Excelente atención', 'Tardó un poco', 'Volveré pronto',
+    'Porciones generosas', 'Buen precio', 'El postre increíble',
+)
+
+# Palabras para armar nombres y descripciones variados (la búsqueda de texto
+# completo no se puede medir sobre textos idénticos)
+PLATOS = (
+    'Arepa', 'Bandeja', 'Sancocho', 'Empanada', 'Ajiaco', 'Tamal', 'Chicharrón', 'Buñuelo',
+    'Mondongo', 'Frijoles', 'Patacón', 'Jugo', 'Limonada', 'Café', 'Natilla', 'Postre',
+)
+VARIANTES = (
+    'paisa', 'de queso', 'de pollo', 'de maíz', 'con hogao', 'especial', 'de la casa',
+    'de lulo', 'de maracuyá', 'con aguacate', 'campesino', 'tradicional',
+)
+INGREDIENTES = (
+    'frijoles', 'chicharrón', 'plátano maduro', 'aguacate', 'arroz blanco', 'huevo frito',
+    'carne molida', 'chorizo', 'arepa', 'hogao', 'yuca', 'mazorca', 'guascas', 'papa criolla',
+    'queso campesino', 'panela', 'leche', 'limón', 'cilantro', 'ají',
+)
+
+
+class Command(BaseCommand):
+    help = 'Llena la base con datos de prueba realistas para medir las vistas a escala'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=1.0,
+                            help='Multiplica todas las cantidades (1 = 100.000 pedidos)')
+        for nombre, cantidad in CANTIDADES.items():
+            parser.add_argument(f'--{nombre}', type=int, help=f'Por defecto {cantidad} × escala')
+        parser.add_argument('--dias', type=int, default=365, help='Días de historial hacia atrás')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por bulk_create')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--password', default='benchmark',
+                            help='Contraseña de los usuarios bench_admin, bench_personal y bench_cliente')
+
+    def handle(self, *args, **options):
+        cantidades = {
+            nombre: options[nombre] if options[nombre] is not None else max(1, int(cantidad * options['escala']))
+            for nombre, cantidad in CANTIDADES.items()
+        }
+        if Usuario.objects.filter(username='bench_admin').exists():
+            raise CommandError('La base ya tiene datos sembrados (existe bench_admin).')
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.ahora = timezone.now()
+        self.segundos = options['dias'] * 24 * 3600
+
+        with transaction.atomic():
+            clientes = self.sembrar_usuarios(cantidades['clientes'], options['password'])
+            self.zonas = self.sembrar_zonas(cantidades['zonas'])
+            productos = self.sembrar_menu(cantidades)
+            pedidos = self.sembrar_pedidos(cantidades['pedidos'], clientes, productos)
+            self.sembrar_reservas(cantidades['reservas'], cantidades['mesas'], clientes)
+            self.sembrar_comentarios(cantidades['comentarios'], pedidos)
+            desde = timezone.localdate(self.ahora - timedelta(seconds=self.segundos))
+            recalcular_dias(desde, timezone.localdate(self.ahora) + timedelta(days=30))
+        incrementar_version(VERSION_CATALOGO)
+        incrementar_version(VERSION_GRAFICOS)
+        incrementar_version(VERSION_ZONAS)
+        incrementar_version(VERSION_MESAS)
+        # bulk_create no dispara señales
+        for modelo in (Categoria, Menu, Pedido, Reserva):
+            invalidar(modelo)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        resumen = ', '.join(f'{cantidad} {nombre}' for nombre, cantidad in cantidades.items())
+        self.stdout.write(self.style.SUCCESS(f'Datos sembrados: {resumen}.'))
+
+    def fecha_pasada(self):
+        return self.ahora - timedelta(seconds=self.azar.randrange(self.segundos))
+
+    def sembrar_usuarios(self, n, password):
+        clave = make_password(password)
+        Usuario.objects.bulk_create([
+            Usuario(username='bench_admin', rol='admin', password=clave, is_staff=True),
+            Usuario(username='bench_personal', rol='personal', password=clave),
+            *(Usuario(username=f'bench_personal{i}', rol='personal', password=clave) for i in range(10)),
+        ])
+        return Usuario.objects.bulk_create(
+            [Usuario(username='bench_cliente', password=clave, direccion='Calle 1')]
+            + [Usuario(username=f'bench_cliente{i}', password=clave, direccion=f'Calle {i}') for i in range(n - 1)],
+            batch_size=self.lote,
+        )
+
+    def sembrar_zonas(self, n):
+        zonas = ZonaEntrega.objects.bulk_create([ZonaEntrega(nombre=f'Barrio {i + 1}') for i in range(n)])
+        # Una cadena que deja todas conectadas más atajos al azar
+        pares = {(i, i + 1) for i in range(n - 1)}
+        for _ in range(n * 2):
+            origen, destino = sorted(self.azar.sample(range(n), 2)) if n > 1 else (0, 0)
+            if origen != destino:
+                pares.add((origen, destino))
+        TrayectoZona.objects.bulk_create([
+            TrayectoZona(origen=zonas[origen], destino=zonas[destino], minutos=self.azar.randint(3, 15))
+            for origen, destino in sorted(pares)
+        ])
+        return zonas
+
+    def sembrar_menu(self, cantidades):
+        restaurantes = Restaurante.objects.bulk_create([
+            Restaurante(nombre=f'Sucursal {i + 1}', direccion=f'Avenida {i + 1}', telefono='555-0100',
+                        area_entrega='Centro, Norte, Sur', zona=self.azar.choice(self.zonas))
+            for i in range(cantidades['restaurantes'])
+        ])
+        categorias = Categoria.objects.bulk_create([
+            Categoria(nombre=f'Categoría {i + 1}', tipo='bebida' if i % 4 == 3 else 'comida')
+            for i in range(cantidades['categorias'])
+        ])
+        return Menu.objects.bulk_create([
+            Menu(
+                categoria=categorias[i % len(categorias)],
+                restaurante=restaurantes[i % len(restaurantes)],
+                nombre=f'{PLATOS[i % len(PLATOS)]} {self.azar.choice(VARIANTES)} {i + 1}',
+                descripcion=self.descripcion(),
+                precio=Decimal(self.azar.randrange(300, 5000)) / 100,
+                disponible=self.azar.random() > 0.05,
+            )
+            for i in range(cantidades['productos'])
+        ], batch_size=self.lote)
+
+    def descripcion(self):
+        *primeros, ultimo = self.azar.sample(INGREDIENTES, self.azar.randint(2, 4))
+        return f'Con {", ".join(primeros)} y {ultimo}. Preparado en el día.'
+
+    def sembrar_pedidos(self, n, clientes, productos):
+        estados = [estado for estado, _ in Pedido.ESTADOS]
+        creados = []
+        for inicio in range(0, n, self.lote):
+            pedidos, lineas = [], []
+            for _ in range(min(self.lote, n - inicio)):
+                productos_pedido = self.azar.sample(productos, self.azar.randint(1, 4))
+                items = [(producto, self.azar.randint(1, 3)) for producto in productos_pedido]
+                pedidos.append(Pedido(
+                    cliente=self.azar.choice(clientes),
+                    estado=self.azar.choice(estados),
+                    zona=self.azar.choice(self.zonas),
+                    total=sum(producto.precio * cantidad for producto, cantidad in items),
+                ))
+                lineas.append(items)
+            Pedido.objects.bulk_create(pedidos)
+            # ``fecha_pedido`` es auto_now_add: se corrige después de insertar
+            for pedido in pedidos:
+                pedido.fecha_pedido = self.fecha_pasada()
+            Pedido.objects.bulk_update(pedidos, ['fecha_pedido'], batch_size=1000)
+            ItemPedido.objects.bulk_create([
+                ItemPedido(pedido=pedido, producto=producto, cantidad=cantidad, subtotal=producto.precio * cantidad)
+                for pedido, items in zip(pedidos, lineas)
+                for producto, cantidad in items
+            ], batch_size=self.lote)
+            creados.extend(pedidos)
+        return creados
+
+    def sembrar_reservas(self, n, n_mesas, clientes):
+        mesas = Mesa.objects.bulk_create([
+            Mesa(numero=f'M{i + 1:02d}', capacidad=self.azar.choice((2, 2, 4, 4, 6, 8)),
+                 zona=self.azar.choice(('Salón', 'Terraza', 'Barra')))
+            for i in range(n_mesas)
+        ])
+        estados = [estado for estado, _ in Reserva.ESTADOS]
+        for inicio in range(0, n, self.lote):
+            reservas = []
+            for _ in range(min(self.lote, n - inicio)):
+                # Un 10 % de las reservas queda en el próximo mes
+                if self.azar.random() < 0.1:
+                    fecha = self.ahora + timedelta(minutes=30 * self.azar.randrange(30 * 48))
+                else:
+                    fecha = self.fecha_pasada()
+                reservas.append(Reserva(
+                    cliente=self.azar.choice(clientes),
+                    fecha_reserva=fecha,
+                    numero_personas=self.azar.randint(1, 8),
+                    estado=self.azar.choice(estados),
+                    mesa=self.azar.choice(mesas).numero if self.azar.random() < 0.5 else '',
+                ))
+            Reserva.objects.bulk_create(reservas)
+            for reserva in reservas:
+                reserva.fecha_creacion = min(reserva.fecha_reserva, self.ahora) - timedelta(days=self.azar.randint(0, 14))
+            Reserva.objects.bulk_update(reservas, ['fecha_creacion'], batch_size=1000)
+
+    def sembrar_comentarios(self, n, pedidos):
+        for inicio in range(0, n, self.lote):
+            comentarios = []
+            for _ in range(min(self.lote, n - inicio)):
+                pedido = self.azar.choice(pedidos)
+                comentarios.append(Comentario(
+                    cliente_id=pedido.cliente_id,
+                    pedido=pedido,
+                    texto=f'{self.azar.choice(COMENTARIOS)}. {self.azar.choice(COMENTARIOS)}, '
+                         f'sobre todo el {self.azar.choice(INGREDIENTES)}.',
+                    calificacion=self.azar.randint(1, 5),
+                    aprobado=self.azar.random() < 0.7,
+                ))
+            Comentario.objects.bulk_create(comentarios)
+            for comentario in comentarios:
+                comentario.fecha = comentario.pedido.fecha_pedido + timedelta(hours=self.azar.randint(1, 72))
+            Comentario.objects.bulk_update(comentarios, ['fecha'], batch_size=1000)
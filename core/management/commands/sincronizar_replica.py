@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Copia la base primaria SQLite sobre las réplicas SQLite locales (simula la replicación)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('alias', nargs='*', help='Réplicas a copiar (por defecto todas)')
+
+    def handle(self, *args, **options):
+        aliases = options['alias'] or list(getattr(settings, 'DATABASE_REPLICAS', []))
+        if not aliases:
+            raise CommandError('No hay réplicas configuradas; define DB_REPLICAS.')
+
+        primaria = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primaria['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Solo se pueden copiar bases SQLite; usa la replicación del motor.')
+        for alias in aliases:
+            if alias not in settings.DATABASES:
+                raise CommandError(f'La base {alias} no está en DATABASES.')
+            if settings.DATABASES[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'La réplica {alias} no es SQLite; usa la replicación del motor.')
+
+        connections.close_all()
+        with sqlite3.connect(primaria['NAME']) as origen:
+            for alias in aliases:
+                destino = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    origen.backup(destino)
+                finally:
+                    destino.close()
+                self.stdout.write(self.style.SUCCESS(f'{alias} sincronizada con {primaria["NAME"]}.'))
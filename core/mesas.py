@@ -0,0 +1,188 @@
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Mesa, Reserva
+from .resumenes import rango_fechas
+from .versiones import obtener_version
+
+# Asignación de mesas. Para cada día se arma una agenda con, por mesa, los
+# intervalos reservados ordenados por inicio y el máximo acumulado de sus
+# fines: saber si una mesa está libre en [inicio, fin) es una búsqueda
+# binaria aunque haya reservas que se solapan (datos viejos o cargados a mano).
+#
+# Las agendas se guardan en memoria del proceso bajo la versión ``VERSION_MESAS``,
+# que las señales de Mesa y Reserva incrementan al confirmar cada cambio. Esa
+# copia solo sirve para mostrar disponibilidad: asignar una mesa se hace en
+# ``confirmar_reserva``, que bloquea las mesas y arma la agenda desde la base
+# dentro de la transacción para que dos personas no den la misma mesa.
+
+ESTADOS_QUE_OCUPAN = ('pendiente', 'confirmada')
+VERSION_MESAS = 'mesas'
+# Días de agenda que se guardan por proceso
+MAX_AGENDAS = 64
+
+_agendas = (None, {})
+
+
+class MesaNoDisponible(Exception):
+    pass
+
+
+def duracion_reserva():
+    return timedelta(minutes=getattr(settings, 'RESERVA_DURACION_MINUTOS', 120))
+
+
+class AgendaMesas:
+    """Intervalos ocupados por mesa; las mesas se recorren de menor a mayor capacidad"""
+
+    def __init__(self, mesas):
+        self.mesas = sorted(mesas, key=lambda mesa: (mesa.capacidad, mesa.numero))
+        self.por_numero = {mesa.numero: mesa for mesa in self.mesas}
+        self.inicios = {mesa.numero: [] for mesa in self.mesas}
+        self.fines = {mesa.numero: [] for mesa in self.mesas}
+        # ``hasta[numero][i]`` es el fin más tardío entre los intervalos 0..i
+        self.hasta = {mesa.numero: [] for mesa in self.mesas}
+
+    def ocupar(self, numero, inicio, fin):
+        inicios, fines, hasta = self.inicios[numero], self.fines[numero], self.hasta[numero]
+        posicion = bisect_right(inicios, inicio)
+        inicios.insert(posicion, inicio)
+        fines.insert(posicion, fin)
+        hasta.insert(posicion, fin)
+        for i in range(posicion, len(hasta)):
+            hasta[i] = max(fines[i], hasta[i - 1]) if i else fines[i]
+
+    def agregar(self, numero, inicio, fin):
+        """Como ``ocupar`` para intervalos que llegan ordenados por inicio: sin insertar ni recalcular"""
+        hasta = self.hasta[numero]
+        self.inicios[numero].append(inicio)
+        self.fines[numero].append(fin)
+        hasta.append(max(fin, hasta[-1]) if hasta else fin)
+
+    def libre(self, numero, inicio, fin):
+        """``True`` si la mesa no tiene reservas que se crucen con [inicio, fin)"""
+        # Solo pueden cruzarse los intervalos que empiezan antes de ``fin``, y
+        # alguno lo hace si el más tardío en terminar pasa de ``inicio``
+        posicion = bisect_left(self.inicios[numero], fin)
+        return posicion == 0 or self.hasta[numero][posicion - 1] <= inicio
+
+    def disponibles(self, inicio, fin, personas):
+        return [
+            mesa for mesa in self.mesas
+            if mesa.capacidad >= personas and self.libre(mesa.numero, inicio, fin)
+        ]
+
+    def mejor_mesa(self, inicio, fin, personas):
+        """La mesa libre más chica en la que caben ``personas``, o ``None``"""
+        for mesa in self.mesas:
+            if mesa.capacidad >= personas and self.libre(mesa.numero, inicio, fin):
+                return mesa
+        return None
+
+
+def cargar_agenda(dia, excluir=None, mesas=None):
+    """Agenda del día leída de la base con las reservas activas que tienen mesa asignada"""
+    duracion = duracion_reserva()
+    inicio, fin = rango_fechas(dia, dia)
+    agenda = AgendaMesas(Mesa.objects.filter(activa=True) if mesas is None else mesas)
+    reservas = Reserva.objects.filter(
+        fecha_reserva__gte=inicio - duracion,
+        fecha_reserva__lt=fin + duracion,
+        estado__in=ESTADOS_QUE_OCUPAN,
+    ).exclude(mesa='')
+    if excluir is not None:
+        reservas = reservas.exclude(pk=excluir)
+    # Ordenadas por inicio, cada mesa se arma en una pasada
+    for numero, fecha_reserva in reservas.order_by('fecha_reserva').values_list('mesa', 'fecha_reserva'):
+        if numero in agenda.por_numero:
+            agenda.agregar(numero, fecha_reserva, fecha_reserva + duracion)
+    return agenda
+
+
+def obtener_agenda(dia):
+    """Agenda del día sin consultas mientras no cambien las mesas ni las reservas"""
+    global _agendas
+    version = obtener_version(VERSION_MESAS)
+    version_agendas, agendas = _agendas
+    if version_agendas != version or len(agendas) >= MAX_AGENDAS:
+        agendas = {}
+        _agendas = (version, agendas)
+    agenda = agendas.get(dia)
+    if agenda is None:
+        agenda = agendas[dia] = cargar_agenda(dia)
+    return agenda
+
+
+def intervalo(reserva):
+    return reserva.fecha_reserva, reserva.fecha_reserva + duracion_reserva()
+
+
+def mesas_disponibles(fecha_reserva, personas):
+    inicio = fecha_reserva
+    agenda = obtener_agenda(timezone.localdate(inicio))
+    return agenda.disponibles(inicio, inicio + duracion_reserva(), personas)
+
+
+async def amesas_disponibles(fecha_reserva, personas):
+    return await sync_to_async(mesas_disponibles)(fecha_reserva, personas)
+
+
+def hay_mesas():
+    return Mesa.objects.filter(activa=True).exists()
+
+
+async def ahay_mesas():
+    return await Mesa.objects.filter(activa=True).aexists()
+
+
+def asignar_mesa(reserva, numero=None, agenda=None):
+    """Asigna ``numero`` (validando cupo y solapamientos) o la mejor mesa libre.
+
+    Lanza ``MesaNoDisponible`` si no se puede; no guarda la reserva. Sin
+    ``agenda`` se lee la del día desde la base.
+    """
+    if agenda is None:
+        agenda = cargar_agenda(timezone.localdate(reserva.fecha_reserva), excluir=reserva.pk)
+    inicio, fin = intervalo(reserva)
+    if numero:
+        mesa = agenda.por_numero.get(numero)
+        if mesa is None:
+            raise MesaNoDisponible(f'La mesa {numero} no existe o no está activa.')
+        if mesa.capacidad < reserva.numero_personas:
+            raise MesaNoDisponible(f'La mesa {numero} es para {mesa.capacidad} personas.')
+        if not agenda.libre(numero, inicio, fin):
+            raise MesaNoDisponible(f'La mesa {numero} ya está reservada en ese horario.')
+    else:
+        mesa = agenda.mejor_mesa(inicio, fin, reserva.numero_personas)
+        if mesa is None:
+            raise MesaNoDisponible('No hay mesas libres para esa cantidad de personas en ese horario.')
+    reserva.mesa = mesa.numero
+    return mesa
+
+
+def confirmar_reserva(reserva, estado='confirmada', numero=None, elegir=False):
+    """Guarda ``reserva`` con ``estado`` y su mesa dentro de una transacción.
+
+    Con inventario de mesas y un estado que ocupa mesa se valida ``numero``
+    (o la mesa que ya tenía) y, si no hay ninguna y se confirma o se pide
+    ``elegir``, se asigna la mejor libre. Las mesas se bloquean y la agenda se
+    lee de la base dentro de la transacción, así que dos asignaciones a la vez
+    no pueden dar la misma mesa. Sin inventario ``numero`` se guarda tal cual.
+    Lanza ``MesaNoDisponible`` sin guardar nada si no se puede.
+    """
+    with transaction.atomic():
+        reserva.estado = estado
+        mesas = list(Mesa.objects.select_for_update().filter(activa=True)) if estado in ESTADOS_QUE_OCUPAN else []
+        pedida = numero or (None if elegir else reserva.mesa or None)
+        if mesas and (pedida or elegir or estado == 'confirmada'):
+            agenda = cargar_agenda(timezone.localdate(reserva.fecha_reserva), excluir=reserva.pk, mesas=mesas)
+            asignar_mesa(reserva, pedida, agenda)
+        elif numero:
+            reserva.mesa = numero
+        reserva.save()
+    return reserva
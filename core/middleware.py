@@ -0,0 +1,155 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .consultas import (
+    PresupuestoExcedido, RegistroConsultas, instalar_registro, logger, quitar_registro, registrar_consultas,
+)
+from .estaticos import indexar, nombres_con_hash, responder, servir_estaticos
+from .replicas import usar_primaria
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class PresupuestoConsultasMiddleware:
+    """Middleware de desarrollo que cuenta las consultas de cada petición.
+
+    Usa el presupuesto declarado con ``@presupuesto_consultas`` en la vista (o
+    ``PRESUPUESTO_CONSULTAS_DEFECTO``) y las repeticiones permitidas en
+    ``PRESUPUESTO_CONSULTAS_REPETIDAS``. Con ``PRESUPUESTO_CONSULTAS_ESTRICTO``
+    lanza ``PresupuestoExcedido``; si no, solo registra una advertencia.
+
+    Bajo ASGI el ORM corre en el hilo que ``sync_to_async`` reserva para la
+    petición (las conexiones son de cada hilo), así que el registro se
+    instala y se quita allí; mide tanto el ORM async como las vistas síncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with registrar_consultas() as registro:
+            response = self.get_response(request)
+        self.revisar(request, registro)
+        return response
+
+    async def __acall__(self, request):
+        registro = RegistroConsultas()
+        conexiones = await sync_to_async(instalar_registro)(registro)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(quitar_registro)(registro, conexiones)
+        self.revisar(request, registro)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.presupuesto_consultas = getattr(
+            view_func, 'presupuesto_consultas',
+            getattr(settings, 'PRESUPUESTO_CONSULTAS_DEFECTO', None),
+        )
+
+    def revisar(self, request, registro):
+        problemas = []
+        maximo = getattr(request, 'presupuesto_consultas', None)
+        if maximo is not None and len(registro) > maximo:
+            problemas.append(f'{len(registro)} consultas con un presupuesto de {maximo}')
+        repeticiones = getattr(settings, 'PRESUPUESTO_CONSULTAS_REPETIDAS', 5)
+        if repeticiones and registro.repetidas(repeticiones):
+            problemas.append('consultas repetidas (posible N+1)')
+        if not problemas:
+            return
+
+        mensaje = f'{request.method} {request.path}: {", ".join(problemas)}\n{registro.resumen(repeticiones or 2)}'
+        if getattr(settings, 'PRESUPUESTO_CONSULTAS_ESTRICTO', False):
+            raise PresupuestoExcedido(mensaje)
+        logger.warning(mensaje)
+
+
+class LecturaPrimariaMiddleware:
+    """Fija a la base primaria las peticiones que escriben y las que siguen a una escritura.
+
+    Tras un POST (o cualquier método no seguro) deja una cookie que durante
+    ``REPLICA_RETRASO_MAXIMO`` segundos manda también las lecturas de ese
+    navegador a la primaria, para que vea lo que acaba de guardar aunque la
+    réplica todavía no lo tenga.
+    """
+    sync_capable = True
+    async_capable = True
+    cookie = 'leer_primaria'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.fijar(request):
+            return self.get_response(request)
+        with usar_primaria():
+            response = self.get_response(request)
+        return self.marcar(request, response)
+
+    async def __acall__(self, request):
+        if not self.fijar(request):
+            return await self.get_response(request)
+        with usar_primaria():
+            response = await self.get_response(request)
+        return self.marcar(request, response)
+
+    def fijar(self, request):
+        return request.method not in METODOS_SEGUROS or self.cookie in request.COOKIES
+
+    def marcar(self, request, response):
+        if request.method not in METODOS_SEGUROS:
+            response.set_cookie(
+                self.cookie, '1', max_age=getattr(settings, 'REPLICA_RETRASO_MAXIMO', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class EstaticosMiddleware:
+    """Sirve los archivos de ``STATIC_ROOT`` antes de pasar por el resto de la aplicación.
+
+    Pensado para producción (``ESTATICOS_SERVIR``, por defecto ``not DEBUG``):
+    los nombres con hash del manifiesto salen con caché inmutable de un año y
+    se envía la variante .br o .gz si el navegador la acepta. El índice de
+    archivos se arma al iniciar el proceso, después de ``collectstatic``.
+    Bajo WSGI el archivo sale con sendfile; bajo ASGI se lee por bloques en
+    un hilo aparte.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not servir_estaticos():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.prefijo = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.archivos = indexar(settings.STATIC_ROOT, nombres_con_hash(settings.STATIC_ROOT))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.buscar(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.buscar(request, asincrono=True) or await self.get_response(request)
+
+    def buscar(self, request, asincrono=False):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefijo):
+            return None
+        # Solo se sirven rutas del índice, así que no hay forma de salir de STATIC_ROOT
+        archivo = self.archivos.get(request.path_info[len(self.prefijo):])
+        return responder(request, archivo, asincrono) if archivo else None
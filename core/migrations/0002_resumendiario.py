@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('total_pedidos', models.PositiveIntegerField(default=0)),
+                ('pedidos_entregados', models.PositiveIntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('reservas_completadas', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Mesa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.CharField(max_length=10, unique=True)),
+                ('capacidad', models.PositiveIntegerField()),
+                ('zona', models.CharField(blank=True, help_text='Salón, terraza, barra...', max_length=50)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='mesa',
+            field=models.CharField(blank=True, help_text='Número de la Mesa asignada', max_length=10),
+        ),
+    ]
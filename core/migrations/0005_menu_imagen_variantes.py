@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_mesa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
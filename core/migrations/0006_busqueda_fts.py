@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# Índices FTS5 para la búsqueda de productos y comentarios (ver core.busqueda).
+# Solo en SQLite; en otras bases la búsqueda usa icontains.
+
+TOKENIZADOR = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+CREAR = [
+    f"CREATE VIRTUAL TABLE core_busqueda_menu USING fts5(nombre, descripcion, categoria, {TOKENIZADOR})",
+    """INSERT INTO core_busqueda_menu (rowid, nombre, descripcion, categoria)
+       SELECT m.id, m.nombre, m.descripcion, c.nombre
+       FROM core_menu AS m JOIN core_categoria AS c ON c.id = m.categoria_id""",
+    """CREATE TRIGGER core_menu_busqueda_insertar AFTER INSERT ON core_menu BEGIN
+           INSERT INTO core_busqueda_menu (rowid, nombre, descripcion, categoria)
+           VALUES (new.id, new.nombre, new.descripcion, (SELECT nombre FROM core_categoria WHERE id = new.categoria_id));
+       END""",
+    """CREATE TRIGGER core_menu_busqueda_actualizar AFTER UPDATE OF nombre, descripcion, categoria_id ON core_menu BEGIN
+           UPDATE core_busqueda_menu
+           SET nombre = new.nombre, descripcion = new.descripcion,
+               categoria = (SELECT nombre FROM core_categoria WHERE id = new.categoria_id)
+           WHERE rowid = new.id;
+       END""",
+    """CREATE TRIGGER core_menu_busqueda_borrar AFTER DELETE ON core_menu BEGIN
+           DELETE FROM core_busqueda_menu WHERE rowid = old.id;
+       END""",
+    """CREATE TRIGGER core_categoria_busqueda_actualizar AFTER UPDATE OF nombre ON core_categoria BEGIN
+           UPDATE core_busqueda_menu SET categoria = new.nombre
+           WHERE rowid IN (SELECT id FROM core_menu WHERE categoria_id = new.id);
+       END""",
+
+    f"CREATE VIRTUAL TABLE core_busqueda_comentarios USING fts5(texto, {TOKENIZADOR})",
+    "INSERT INTO core_busqueda_comentarios (rowid, texto) SELECT id, texto FROM core_comentario",
+    """CREATE TRIGGER core_comentario_busqueda_insertar AFTER INSERT ON core_comentario BEGIN
+           INSERT INTO core_busqueda_comentarios (rowid, texto) VALUES (new.id, new.texto);
+       END""",
+    """CREATE TRIGGER core_comentario_busqueda_actualizar AFTER UPDATE OF texto ON core_comentario BEGIN
+           UPDATE core_busqueda_comentarios SET texto = new.texto WHERE rowid = new.id;
+       END""",
+    """CREATE TRIGGER core_comentario_busqueda_borrar AFTER DELETE ON core_comentario BEGIN
+           DELETE FROM core_busqueda_comentarios WHERE rowid = old.id;
+       END""",
+]
+
+BORRAR = [
+    'DROP TRIGGER IF EXISTS core_menu_busqueda_insertar',
+    'DROP TRIGGER IF EXISTS core_menu_busqueda_actualizar',
+    'DROP TRIGGER IF EXISTS core_menu_busqueda_borrar',
+    'DROP TRIGGER IF EXISTS core_categoria_busqueda_actualizar',
+    'DROP TRIGGER IF EXISTS core_comentario_busqueda_insertar',
+    'DROP TRIGGER IF EXISTS core_comentario_busqueda_actualizar',
+    'DROP TRIGGER IF EXISTS core_comentario_busqueda_borrar',
+    'DROP TABLE IF EXISTS core_busqueda_menu',
+    'DROP TABLE IF EXISTS core_busqueda_comentarios',
+]
+
+
+def _ejecutar(sentencias):
+    def ejecutar(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sentencia in sentencias:
+            schema_editor.execute(sentencia)
+    return ejecutar
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_menu_imagen_variantes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_ejecutar(CREAR), _ejecutar(BORRAR)),
+    ]
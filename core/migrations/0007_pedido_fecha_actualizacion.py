@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copiar_fecha_pedido(apps, schema_editor):
+    # Los pedidos existentes parten con su fecha de creación
+    Pedido = apps.get_model('core', 'Pedido')
+    Pedido.objects.update(fecha_actualizacion=F('fecha_pedido'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_busqueda_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copiar_fecha_pedido, migrations.RunPython.noop),
+    ]
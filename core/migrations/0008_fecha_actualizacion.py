@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:25
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F
+
+# SQLite agrega las columnas rehaciendo core_menu y core_categoria, y los
+# triggers de búsqueda de la 0006 impiden renombrar esas tablas: se quitan
+# antes y se vuelven a crear al final.
+busqueda = import_module('core.migrations.0006_busqueda_fts')
+TRIGGERS = [
+    sentencia for sentencia in busqueda.CREAR
+    if sentencia.startswith(('CREATE TRIGGER core_menu', 'CREATE TRIGGER core_categoria'))
+]
+QUITAR = [f'DROP TRIGGER IF EXISTS {sentencia.split()[2]}' for sentencia in TRIGGERS]
+
+
+def copiar_fecha_creacion(apps, schema_editor):
+    # Las reservas existentes parten con su fecha de creación
+    Reserva = apps.get_model('core', 'Reserva')
+    Reserva.objects.update(fecha_actualizacion=F('fecha_creacion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_pedido_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.RunPython(busqueda._ejecutar(QUITAR), busqueda._ejecutar(TRIGGERS)),
+        migrations.AddField(
+            model_name='categoria',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(busqueda._ejecutar(TRIGGERS), busqueda._ejecutar(QUITAR)),
+        migrations.RunPython(copiar_fecha_creacion, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['cliente', 'fecha_actualizacion'], name='pedido_cliente_act_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['cliente', 'fecha_actualizacion'], name='reserva_cliente_act_idx'),
+        ),
+    ]
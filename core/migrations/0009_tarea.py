@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:28
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50)),
+                ('datos', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('prioridad', models.SmallIntegerField(default=0, help_text='Las de mayor prioridad se ejecutan primero')),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('max_intentos', models.PositiveSmallIntegerField(default=3)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reclamo', models.CharField(blank=True, max_length=32)),
+                ('bloqueada_hasta', models.DateTimeField(blank=True, null=True)),
+                ('clave', models.CharField(blank=True, help_text='Clave de idempotencia', max_length=100, null=True, unique=True)),
+                ('resultado', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', '-prioridad', 'disponible_desde'], name='tarea_cola_idx'), models.Index(fields=['estado', 'bloqueada_hasta'], name='tarea_bloqueo_idx')],
+            },
+        ),
+    ]
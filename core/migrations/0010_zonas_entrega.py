@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:31
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_tarea'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZonaEntrega',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='zona',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pedidos', to='core.zonaentrega'),
+        ),
+        migrations.AddField(
+            model_name='restaurante',
+            name='zona',
+            field=models.ForeignKey(blank=True, help_text='Zona desde la que salen los repartos', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='restaurantes', to='core.zonaentrega'),
+        ),
+        migrations.CreateModel(
+            name='TrayectoZona',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minutos', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('destino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trayectos_llegada', to='core.zonaentrega')),
+                ('origen', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trayectos_salida', to='core.zonaentrega')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('origen', 'destino'), name='trayecto_unico')],
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
 class Usuario(AbstractUser):
     ROLES = (
@@ -13,6 +15,11 @@ class Usuario(AbstractUser):
     telefono = models.CharField(max_length=15, blank=True, null=True)
     direccion = models.TextField(blank=True, null=True)
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['rol'], name='usuario_rol_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.username} ({self.rol})"
 
@@ -22,14 +29,39 @@ class Restaurante(models.Model):
     telefono = models.CharField(max_length=15)
     area_entrega = models.TextField(help_text="Zonas de entrega disponibles")
     activo = models.BooleanField(default=True)
+    zona = models.ForeignKey('ZonaEntrega', on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='restaurantes', help_text="Zona desde la que salen los repartos")
+    
+    def __str__(self):
+        return self.nombre
+
+class ZonaEntrega(models.Model):
+    """Sector de reparto; los trayectos entre zonas forman el grafo de core.rutas"""
+    nombre = models.CharField(max_length=100, unique=True)
+    activa = models.BooleanField(default=True)
     
     def __str__(self):
         return self.nombre
 
+class TrayectoZona(models.Model):
+    """Minutos de viaje entre dos zonas vecinas, válido en ambos sentidos"""
+    origen = models.ForeignKey(ZonaEntrega, on_delete=models.CASCADE, related_name='trayectos_salida')
+    destino = models.ForeignKey(ZonaEntrega, on_delete=models.CASCADE, related_name='trayectos_llegada')
+    minutos = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['origen', 'destino'], name='trayecto_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.origen} - {self.destino} ({self.minutos} min)"
+
 class Categoria(models.Model):
     nombre = models.CharField(max_length=50)
     descripcion = models.TextField(blank=True)
     tipo = models.CharField(max_length=10, choices=[('comida', 'Comida'), ('bebida', 'Bebida')])
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.nombre
@@ -41,7 +73,10 @@ class Menu(models.Model):
     precio = models.DecimalField(max_digits=8, decimal_places=2)
     disponible = models.BooleanField(default=True)
     imagen = models.ImageField(upload_to='menu/', blank=True, null=True)
+    # Miniaturas JPEG/WebP generadas por core.imagenes a partir de ``imagen``
+    imagen_variantes = models.JSONField(default=dict, blank=True, editable=False)
     restaurante = models.ForeignKey(Restaurante, on_delete=models.CASCADE)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.nombre} - ${self.precio}"
@@ -55,17 +90,43 @@ class Pedido(models.Model):
         ('entregado', 'Entregado'),
         ('cancelado', 'Cancelado'),
     )
+    # Estados a los que puede pasar un pedido desde cada estado (ver core.pedidos.cambiar_estados)
+    TRANSICIONES = {
+        'pendiente': ('confirmado', 'cancelado'),
+        'confirmado': ('en_preparacion', 'cancelado'),
+        'en_preparacion': ('listo', 'cancelado'),
+        'listo': ('entregado', 'cancelado'),
+        'entregado': (),
+        'cancelado': (),
+    }
+    # Los que siguen en la cola de cocina
+    ESTADOS_ABIERTOS = ('pendiente', 'confirmado', 'en_preparacion', 'listo')
     
     cliente = models.ForeignKey(Usuario, on_delete=models.CASCADE, limit_choices_to={'rol': 'cliente'})
     fecha_pedido = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     direccion_entrega = models.TextField(blank=True)
+    zona = models.ForeignKey(ZonaEntrega, on_delete=models.SET_NULL, null=True, blank=True, related_name='pedidos')
     notas = models.TextField(blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['cliente', 'fecha_pedido'], name='pedido_cliente_fecha_idx'),
+            models.Index(fields=['estado', 'fecha_pedido'], name='pedido_estado_fecha_idx'),
+            models.Index(fields=['fecha_pedido'], name='pedido_fecha_idx'),
+            models.Index(fields=['cliente', 'fecha_actualizacion'], name='pedido_cliente_act_idx'),
+        ]
+    
     def __str__(self):
         return f"Pedido #{self.id} - {self.cliente.username}"
 
+    @property
+    def estados_siguientes(self):
+        nombres = dict(self.ESTADOS)
+        return [(estado, nombres[estado]) for estado in self.TRANSICIONES.get(self.estado, ())]
+
 class ItemPedido(models.Model):
     pedido = models.ForeignKey(Pedido, related_name='items', on_delete=models.CASCADE)
     producto = models.ForeignKey(Menu, on_delete=models.CASCADE)
@@ -76,10 +137,20 @@ class ItemPedido(models.Model):
         self.subtotal = self.producto.precio * self.cantidad
         super().save(*args, **kwargs)
         
-        # Actualizar total del pedido
-        total = sum(item.subtotal for item in self.pedido.items.all())
+        # Actualizar total del pedido (los pedidos nuevos se crean en bloque
+        # desde core.pedidos.crear_pedido; este camino es para ediciones sueltas)
+        total = self.pedido.items.aggregate(total=models.Sum('subtotal'))['total'] or 0
         self.pedido.total = total
-        self.pedido.save()
+        self.pedido.save(update_fields=['total', 'fecha_actualizacion'])
+
+class Mesa(models.Model):
+    numero = models.CharField(max_length=10, unique=True)
+    capacidad = models.PositiveIntegerField()
+    zona = models.CharField(max_length=50, blank=True, help_text="Salón, terraza, barra...")
+    activa = models.BooleanField(default=True)
+    
+    def __str__(self):
+        return f"Mesa {self.numero} ({self.capacidad} personas)"
 
 class Reserva(models.Model):
     ESTADOS = (
@@ -92,10 +163,20 @@ class Reserva(models.Model):
     cliente = models.ForeignKey(Usuario, on_delete=models.CASCADE, limit_choices_to={'rol': 'cliente'})
     fecha_reserva = models.DateTimeField()
     numero_personas = models.PositiveIntegerField()
-    mesa = models.CharField(max_length=10, blank=True)
+    mesa = models.CharField(max_length=10, blank=True, help_text="Número de la Mesa asignada")
     estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
     notas = models.TextField(blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_reserva'], name='reserva_fecha_idx'),
+            models.Index(fields=['estado', 'fecha_reserva'], name='reserva_estado_fecha_idx'),
+            models.Index(fields=['cliente', 'fecha_creacion'], name='reserva_cliente_creacion_idx'),
+            models.Index(fields=['fecha_creacion'], name='reserva_creacion_idx'),
+            models.Index(fields=['cliente', 'fecha_actualizacion'], name='reserva_cliente_act_idx'),
+        ]
     
     def __str__(self):
         return f"Reserva #{self.id} - {self.cliente.username}"
@@ -110,6 +191,12 @@ class Comentario(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
     aprobado = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['aprobado', 'fecha'], name='comentario_aprobado_fecha_idx'),
+            models.Index(fields=['fecha'], name='comentario_fecha_idx'),
+        ]
+    
     def __str__(self):
         return f"Comentario de {self.cliente.username} - {self.calificacion}★"
 
@@ -130,4 +217,58 @@ class Reporte(models.Model):
     reservas_completadas = models.PositiveIntegerField(default=0)
     
     def __str__(self):
-        return f"{self.get_tipo_display()} - {self.fecha_inicio} a {self.fecha_fin}"
\ No newline at end of file
+        return f"{self.get_tipo_display()} - {self.fecha_inicio} a {self.fecha_fin}"
+
+class ResumenDiario(models.Model):
+    """Totales por día que alimentan los reportes.
+
+    Se mantiene de forma incremental desde las señales de Pedido y Reserva
+    (ver core.resumenes) y se puede reconstruir con el comando
+    ``reconstruir_resumenes``.
+    """
+    fecha = models.DateField(unique=True)
+    total_pedidos = models.PositiveIntegerField(default=0)
+    pedidos_entregados = models.PositiveIntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    reservas_completadas = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Resumen {self.fecha}"
+
+class Tarea(models.Model):
+    """Trabajo en segundo plano de la cola de core.tareas.
+
+    Un trabajador (``manage.py procesar_tareas``) la reclama poniendo su
+    ``reclamo`` y ``bloqueada_hasta``; si no termina antes de esa hora otro
+    trabajador puede volver a tomarla.
+    """
+    ESTADOS = (
+        ('pendiente', 'Pendiente'),
+        ('en_curso', 'En curso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    )
+
+    tipo = models.CharField(max_length=50)
+    datos = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    prioridad = models.SmallIntegerField(default=0, help_text="Las de mayor prioridad se ejecutan primero")
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    reclamo = models.CharField(max_length=32, blank=True)
+    bloqueada_hasta = models.DateTimeField(null=True, blank=True)
+    clave = models.CharField(max_length=100, unique=True, null=True, blank=True, help_text="Clave de idempotencia")
+    resultado = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', '-prioridad', 'disponible_desde'], name='tarea_cola_idx'),
+            models.Index(fields=['estado', 'bloqueada_hasta'], name='tarea_bloqueo_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tarea #{self.id} {self.tipo} ({self.get_estado_display()})"
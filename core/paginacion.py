@@ -0,0 +1,123 @@
+import base64
+import json
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Paginación por cursor (keyset) sobre un campo de fecha más el id como
+# desempate. Cada página filtra desde la última fila vista en lugar de usar
+# OFFSET, así que su costo no depende de cuántas filas haya antes.
+
+POR_PAGINA = 20
+
+
+@dataclass
+class PaginaCursor:
+    items: list
+    siguiente: str = None
+    anterior: str = None
+
+    @property
+    def tiene_otras_paginas(self):
+        return bool(self.siguiente or self.anterior)
+
+
+def codificar_cursor(valor, pk, direccion):
+    datos = json.dumps({'v': valor.isoformat(), 'id': pk, 'd': direccion})
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Devuelve ``(valor, id, direccion)`` o ``None`` si el token no es válido"""
+    if not token:
+        return None
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        valor = parse_datetime(datos['v'])
+        pk = int(datos['id'])
+        direccion = datos['d']
+    except (ValueError, TypeError, KeyError):
+        return None
+    if valor is None or direccion not in ('sig', 'ant'):
+        return None
+    return valor, pk, direccion
+
+
+def _consulta_pagina(queryset, campo, cursor, por_pagina, descendente):
+    posicion = decodificar_cursor(cursor)
+    direccion = posicion[2] if posicion else 'sig'
+    # Para ir hacia atrás se recorre en el orden inverso y luego se invierte
+    hacia_adelante = direccion == 'sig'
+    ascendente = hacia_adelante != descendente
+    orden = (campo, 'id') if ascendente else (f'-{campo}', '-id')
+
+    if posicion:
+        valor, pk, _ = posicion
+        op = 'gt' if ascendente else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'{campo}__{op}': valor}) | Q(**{campo: valor, f'id__{op}': pk})
+        )
+    return queryset.order_by(*orden)[:por_pagina + 1], posicion, hacia_adelante
+
+
+def _valor(fila, campo):
+    # Las filas pueden ser instancias o diccionarios de ``values()``
+    return fila[campo] if isinstance(fila, dict) else getattr(fila, campo)
+
+
+def _armar_pagina(filas, campo, por_pagina, posicion, hacia_adelante):
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if not hacia_adelante:
+        filas.reverse()
+
+    pagina = PaginaCursor(items=filas)
+    if filas:
+        primero, ultimo = filas[0], filas[-1]
+        if hay_mas if hacia_adelante else posicion:
+            pagina.siguiente = codificar_cursor(_valor(ultimo, campo), _valor(ultimo, 'id'), 'sig')
+        if posicion if hacia_adelante else hay_mas:
+            pagina.anterior = codificar_cursor(_valor(primero, campo), _valor(primero, 'id'), 'ant')
+    return pagina
+
+
+def paginar(queryset, campo, cursor=None, por_pagina=POR_PAGINA, descendente=True):
+    """Devuelve una ``PaginaCursor`` ordenada por ``(campo, id)``.
+
+    Con ``descendente`` las filas más recientes van primero. ``cursor`` es el
+    token ``siguiente`` o ``anterior`` de una página previa.
+    """
+    consulta, posicion, hacia_adelante = _consulta_pagina(queryset, campo, cursor, por_pagina, descendente)
+    return _armar_pagina(list(consulta), campo, por_pagina, posicion, hacia_adelante)
+
+
+async def apaginar(queryset, campo, cursor=None, por_pagina=POR_PAGINA, descendente=True):
+    """Versión asíncrona de ``paginar`` para las vistas async"""
+    consulta, posicion, hacia_adelante = _consulta_pagina(queryset, campo, cursor, por_pagina, descendente)
+    filas = [fila async for fila in consulta]
+    return _armar_pagina(filas, campo, por_pagina, posicion, hacia_adelante)
+
+
+async def apaginar_por_partes(queryset, partes, campo, cursor=None, por_pagina=POR_PAGINA, descendente=True):
+    """Como ``apaginar`` sobre la unión de ``queryset.filter(parte)`` para cada parte.
+
+    Para filtros como ``estado__in`` que obligan a elegir entre recorrer el
+    índice de la fecha saltando filas u ordenar todas las que cumplen: cada
+    parte busca su propia página en el índice ``(estado, fecha)`` dentro de
+    un ``id IN (...)`` y solo esas filas se ordenan, todo en una consulta.
+    """
+    filtro = Q()
+    for parte in partes:
+        ids, _, _ = _consulta_pagina(queryset.filter(parte), campo, cursor, por_pagina, descendente)
+        filtro |= Q(pk__in=ids.values('pk'))
+    return await apaginar(queryset.filter(filtro), campo, cursor, por_pagina, descendente)
+
+
+def pagina_json(pagina, serializar):
+    """Cuerpo JSON de una página para el scroll infinito"""
+    return {
+        'items': [serializar(item) for item in pagina.items],
+        'siguiente': pagina.siguiente,
+        'anterior': pagina.anterior,
+    }
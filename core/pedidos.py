@@ -0,0 +1,205 @@
+import json
+
+from django.db import transaction
+from django.db.models import Case, Q, Value, When, prefetch_related_objects
+from django.utils import timezone
+
+from . import fragmentos, resumenes
+from .catalogo import leer_precios, obtener_indice_precios
+from .eventos import publicar_evento_pedido
+from .graficos import VERSION_GRAFICOS
+from .models import ItemPedido, Menu, Pedido
+from .versiones import incrementar_version
+
+MAX_CAMBIOS = 100
+
+
+class CarritoInvalido(ValueError):
+    """El carrito enviado por el cliente no se puede convertir en un pedido"""
+
+
+class CambiosInvalidos(ValueError):
+    """El lote de cambios de estado enviado no tiene un formato válido"""
+
+
+def leer_carrito(carrito_data):
+    """Convierte el JSON del carrito en ``{producto_id: cantidad}``"""
+    if not carrito_data:
+        return {}
+    try:
+        items = json.loads(carrito_data)
+    except (TypeError, ValueError):
+        raise CarritoInvalido('El carrito no tiene un formato válido.')
+    if not isinstance(items, list):
+        raise CarritoInvalido('El carrito no tiene un formato válido.')
+
+    cantidades = {}
+    for item in items:
+        try:
+            producto_id = int(item['id'])
+            cantidad = int(item['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            raise CarritoInvalido('El carrito contiene productos inválidos.')
+        if cantidad < 1:
+            raise CarritoInvalido('Las cantidades deben ser mayores que cero.')
+        # Un mismo producto repetido se suma en una sola línea
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+    return cantidades
+
+
+def construir_items(cantidades, indice=None):
+    """Valida y cotiza el carrito contra el índice de precios del servidor.
+
+    Devuelve los ``ItemPedido`` sin guardar. Los precios enviados por el
+    cliente se ignoran y los productos no disponibles se rechazan antes de
+    escribir nada. Sin ``indice`` se usa el de memoria del proceso.
+    """
+    if indice is None:
+        indice = obtener_indice_precios()
+    faltantes = []
+    no_disponibles = []
+    items = []
+    for producto_id, cantidad in cantidades.items():
+        producto = indice.get(producto_id)
+        if producto is None:
+            faltantes.append(str(producto_id))
+        elif not producto.disponible:
+            no_disponibles.append(producto.nombre)
+        else:
+            items.append(ItemPedido(
+                producto_id=producto_id,
+                cantidad=cantidad,
+                subtotal=producto.precio * cantidad,
+            ))
+
+    if faltantes:
+        raise CarritoInvalido(f'Productos no encontrados: {", ".join(faltantes)}')
+    if no_disponibles:
+        raise CarritoInvalido(f'Productos no disponibles: {", ".join(no_disponibles)}')
+    return items
+
+
+def crear_pedido(pedido, carrito_data):
+    """Guarda ``pedido`` con todos los items del carrito en una sola transacción.
+
+    El índice en memoria rechaza los carritos inválidos sin abrir una
+    transacción. Dentro de ella los precios y la disponibilidad de los
+    productos del carrito se vuelven a leer de la base con una consulta: el
+    índice de este proceso puede no haberse enterado de un cambio de precio
+    hecho en otro. El total se calcula una vez en Python y los items se
+    insertan con ``bulk_create``, sin pasar por ``ItemPedido.save()``. Si el
+    carrito no es válido se lanza ``CarritoInvalido`` y no se escribe nada.
+    """
+    cantidades = leer_carrito(carrito_data)
+    construir_items(cantidades)
+
+    with transaction.atomic():
+        items = construir_items(cantidades, leer_precios(Menu.objects.filter(pk__in=cantidades)))
+        pedido.total = sum((item.subtotal for item in items), 0)
+        pedido.save()
+        for item in items:
+            item.pedido = pedido
+        ItemPedido.objects.bulk_create(items)
+    return pedido, items
+
+
+def leer_cambios(cuerpo):
+    """Convierte ``{"cambios": [{"id", "desde", "hacia"}, ...]}`` en tuplas para ``cambiar_estados``"""
+    try:
+        datos = json.loads(cuerpo)
+        cambios = datos['cambios']
+    except (TypeError, ValueError, KeyError):
+        raise CambiosInvalidos('El cuerpo debe ser JSON con una lista "cambios".')
+    if not isinstance(cambios, list) or not cambios:
+        raise CambiosInvalidos('La lista de cambios está vacía.')
+    if len(cambios) > MAX_CAMBIOS:
+        raise CambiosInvalidos(f'Se permiten como máximo {MAX_CAMBIOS} cambios por petición.')
+
+    tuplas = []
+    for cambio in cambios:
+        try:
+            tuplas.append((int(cambio['id']), str(cambio['desde']), str(cambio['hacia'])))
+        except (KeyError, TypeError, ValueError):
+            raise CambiosInvalidos('Cada cambio necesita "id", "desde" y "hacia".')
+    return tuplas
+
+def transicion_valida(desde, hacia):
+    return hacia in Pedido.TRANSICIONES.get(desde, ())
+
+
+def cambiar_estados(cambios):
+    """Aplica varios cambios de estado ``(pedido_id, desde, hacia)`` con un solo UPDATE.
+
+    El UPDATE solo toca las filas que siguen en el estado ``desde`` que vio
+    quien pide el cambio, así que dos tablets que mueven el mismo pedido a la
+    vez no se pisan: la segunda recibe ``conflicto`` con el estado actual.
+    Devuelve un resultado por cambio, en el mismo orden, con ``id``, ``ok``,
+    ``estado``, ``fecha_actualizacion`` y ``error`` (``transicion_invalida``,
+    ``duplicado``, ``conflicto`` o ``no_existe``).
+
+    Como ``update()`` no dispara las señales de Pedido, aquí se hace lo mismo
+    que ellas para los pedidos que cambiaron: resúmenes diarios, fragmentos,
+    gráficos y eventos de la cola de cocina.
+    """
+    resultados = []
+    validos = {}
+    for pedido_id, desde, hacia in cambios:
+        resultado = {'id': pedido_id, 'ok': False, 'estado': None, 'fecha_actualizacion': None, 'error': None}
+        if not transicion_valida(desde, hacia):
+            resultado['error'] = 'transicion_invalida'
+        elif pedido_id in validos:
+            resultado['error'] = 'duplicado'
+        else:
+            validos[pedido_id] = (desde, hacia)
+        resultados.append(resultado)
+    if not validos:
+        return resultados
+
+    ahora = timezone.now()
+    condicion = Q()
+    casos = []
+    for pedido_id, (desde, hacia) in validos.items():
+        condicion |= Q(id=pedido_id, estado=desde)
+        casos.append(When(id=pedido_id, then=Value(hacia)))
+
+    with transaction.atomic():
+        actualizados = Pedido.objects.filter(condicion).update(
+            estado=Case(*casos, default='estado'),
+            fecha_actualizacion=ahora,
+        )
+        pedidos = Pedido.objects.select_related('cliente').in_bulk(validos)
+        cambiados = []
+        for pedido in pedidos.values():
+            desde, hacia = validos[pedido.pk]
+            if actualizados and pedido.estado == hacia and pedido.fecha_actualizacion == ahora:
+                pedido._resumen_original = (desde, pedido.total, pedido.fecha_pedido)
+                resumenes.registrar_pedido(pedido)
+                cambiados.append(pedido)
+        if cambiados:
+            def confirmado():
+                # Después del commit: lo que se cachee antes queda bajo las versiones viejas
+                for pedido in cambiados:
+                    fragmentos.invalidar(pedido)
+                incrementar_version(VERSION_GRAFICOS)
+                # La fila y el detalle del evento muestran los items
+                prefetch_related_objects(cambiados, 'items__producto')
+                for pedido in cambiados:
+                    publicar_evento_pedido(pedido)
+
+            transaction.on_commit(confirmado)
+
+    ids_cambiados = {pedido.pk for pedido in cambiados}
+    for resultado in resultados:
+        if resultado['error']:
+            continue
+        pedido = pedidos.get(resultado['id'])
+        if pedido is None:
+            resultado['error'] = 'no_existe'
+            continue
+        resultado['estado'] = pedido.estado
+        resultado['fecha_actualizacion'] = pedido.fecha_actualizacion
+        if pedido.pk in ids_cambiados:
+            resultado['ok'] = True
+        else:
+            resultado['error'] = 'conflicto'
+    return resultados
@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import ItemPedido, Menu
+from .resumenes import rango_fechas
+
+# Pronóstico de demanda por producto para planificar la preparación. Las
+# cantidades vendidas se cargan con una consulta agrupada en una matriz
+# productos × períodos y todo el cálculo se hace con operaciones de NumPy
+# sobre la matriz completa, sin recorrer productos en Python.
+
+DIAS_HISTORIAL = 182
+VENTANA_CORTA = 7
+VENTANA_NIVEL = 28
+# Peso (en semanas) con que la estacionalidad de cada producto se acerca a 1
+# cuando hay pocos datos
+SUAVIZADO_SEMANAL = 2
+
+
+def cargar_demanda(desde, hasta, granularidad='dia'):
+    """Devuelve ``(producto_ids, matriz)`` con las unidades vendidas entre ``desde`` y ``hasta``.
+
+    ``matriz[i, j]`` son las unidades de ``producto_ids[i]`` en el día ``j``
+    (o en la hora ``j`` contada desde ``desde`` a las 00:00 si la granularidad
+    es ``'hora'``). Los pedidos cancelados no cuentan.
+    """
+    inicio, fin = rango_fechas(desde, hasta)
+    dias = (hasta - desde).days + 1
+    truncar = TruncHour if granularidad == 'hora' else TruncDate
+    filas = list(
+        ItemPedido.objects.filter(pedido__fecha_pedido__gte=inicio, pedido__fecha_pedido__lt=fin)
+        .exclude(pedido__estado='cancelado')
+        .annotate(periodo=truncar('pedido__fecha_pedido'))
+        .values('producto_id', 'periodo')
+        .annotate(unidades=Sum('cantidad'))
+        .values_list('producto_id', 'periodo', 'unidades')
+        .order_by()
+    )
+    if not filas:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, dias * (24 if granularidad == 'hora' else 1)))
+
+    productos = np.fromiter((fila[0] for fila in filas), dtype=np.int64, count=len(filas))
+    unidades = np.fromiter((fila[2] for fila in filas), dtype=np.float64, count=len(filas))
+    if granularidad == 'hora':
+        periodos = np.fromiter(
+            ((timezone.localtime(fila[1]).date() - desde).days * 24 + timezone.localtime(fila[1]).hour for fila in filas),
+            dtype=np.int64, count=len(filas),
+        )
+        columnas = dias * 24
+    else:
+        periodos = np.fromiter(((fila[1] - desde).days for fila in filas), dtype=np.int64, count=len(filas))
+        columnas = dias
+
+    producto_ids, filas_matriz = np.unique(productos, return_inverse=True)
+    matriz = np.zeros((len(producto_ids), columnas))
+    np.add.at(matriz, (filas_matriz, periodos), unidades)
+    return producto_ids, matriz
+
+
+def media_movil(matriz, ventana):
+    """Media de las últimas ``ventana`` columnas para cada columna (las primeras quedan en NaN)"""
+    acumulada = np.cumsum(np.pad(matriz, ((0, 0), (1, 0))), axis=1)
+    medias = np.full(matriz.shape, np.nan)
+    medias[:, ventana - 1:] = (acumulada[:, ventana:] - acumulada[:, :-ventana]) / ventana
+    return medias
+
+
+def estacionalidad_semanal(matriz, desde):
+    """Índice por producto y día de la semana (lunes = 0); 1 es un día promedio"""
+    dias_semana = (desde.weekday() + np.arange(matriz.shape[1])) % 7
+    uno_caliente = np.eye(7)[dias_semana]
+    sumas = matriz @ uno_caliente
+    cuentas = uno_caliente.sum(axis=0)
+    media = matriz.mean(axis=1, keepdims=True)
+    # Se suman semanas ficticias de demanda promedio para que un producto con
+    # pocas ventas no tenga índices extremos
+    esperado = (cuentas + SUAVIZADO_SEMANAL) * media
+    return np.divide(sumas + SUAVIZADO_SEMANAL * media, esperado, out=np.ones_like(sumas), where=esperado > 0)
+
+
+def calcular_pronostico(matriz, desde, objetivo):
+    """Pronóstico para el día ``objetivo`` a partir de la matriz diaria que empieza en ``desde``.
+
+    El nivel es la media de las últimas ``VENTANA_NIVEL`` días desestacionalizada
+    y se multiplica por el índice del día de la semana de ``objetivo``.
+    Devuelve un diccionario de arreglos alineados con las filas de la matriz.
+    """
+    indices = estacionalidad_semanal(matriz, desde)
+    dias_semana = (desde.weekday() + np.arange(matriz.shape[1])) % 7
+    ventana = min(VENTANA_NIVEL, matriz.shape[1])
+    recientes = matriz[:, -ventana:] / indices[:, dias_semana[-ventana:]]
+    nivel = recientes.mean(axis=1)
+    indice_objetivo = indices[:, objetivo.weekday()]
+    pronostico = nivel * indice_objetivo
+    return {
+        'pronostico': pronostico,
+        'preparar': np.ceil(pronostico).astype(int),
+        'media_corta': media_movil(matriz, min(VENTANA_CORTA, matriz.shape[1]))[:, -1],
+        'indice_dia': indice_objetivo,
+    }
+
+
+def hora_pico(matriz_horaria):
+    """Hora del día con más unidades para cada producto"""
+    por_hora = matriz_horaria.reshape(matriz_horaria.shape[0], -1, 24).sum(axis=1)
+    return por_hora.argmax(axis=1)
+
+
+def pronostico_preparacion(objetivo=None, dias=DIAS_HISTORIAL):
+    """Lista de productos con las unidades a preparar para ``objetivo`` (mañana por defecto).
+
+    Usa los ``dias`` completos anteriores a hoy y se cachea por día objetivo.
+    """
+    hoy = timezone.localdate()
+    objetivo = objetivo or hoy + timedelta(days=1)
+    clave = f'pronostico:{hoy}:{objetivo}:{dias}'
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado
+
+    hasta = hoy - timedelta(days=1)
+    desde = hasta - timedelta(days=dias - 1)
+    producto_ids, matriz = cargar_demanda(desde, hasta)
+    resultado = []
+    if len(producto_ids):
+        calculo = calcular_pronostico(matriz, desde, objetivo)
+        ids_horas, matriz_horaria = cargar_demanda(hasta - timedelta(days=VENTANA_NIVEL - 1), hasta, 'hora')
+        picos = dict(zip(ids_horas.tolist(), hora_pico(matriz_horaria).tolist()))
+        productos = Menu.objects.select_related('categoria').in_bulk(producto_ids.tolist())
+
+        orden = np.argsort(-calculo['pronostico'], kind='stable')
+        for i in orden[calculo['preparar'][orden] > 0]:
+            producto = productos.get(int(producto_ids[i]))
+            if producto is None:
+                continue
+            resultado.append({
+                'producto_id': producto.id,
+                'nombre': producto.nombre,
+                'categoria': producto.categoria.nombre,
+                'disponible': producto.disponible,
+                'pronostico': round(float(calculo['pronostico'][i]), 1),
+                'preparar': int(calculo['preparar'][i]),
+                'media_corta': round(float(calculo['media_corta'][i]), 1),
+                'indice_dia': round(float(calculo['indice_dia'][i]), 2),
+                'hora_pico': picos.get(producto.id),
+            })
+
+    cache.set(clave, resultado, getattr(settings, 'PRONOSTICO_CACHE_TTL', 60 * 60))
+    return resultado
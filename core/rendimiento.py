@@ -0,0 +1,224 @@
+import json
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from http.cookiejar import CookieJar
+from statistics import mean
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urljoin
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Menu, Usuario
+
+# Medición de latencia de las vistas de ``core.urls``. Cada endpoint se pide
+# como el usuario del rol indicado (los que crea ``sembrar_datos``).
+
+Endpoint = namedtuple('Endpoint', 'nombre url rol metodo', defaults=('get',))
+
+USUARIOS_BENCHMARK = {
+    'admin': 'bench_admin',
+    'personal': 'bench_personal',
+    'cliente': 'bench_cliente',
+}
+
+# Los eventos en vivo (SSE y long-poll) quedan afuera: su latencia es la espera
+ENDPOINTS = (
+    Endpoint('index', 'index', None),
+    Endpoint('menu', 'menu', None),
+    Endpoint('registro', 'registro', None),
+    Endpoint('admin_dashboard', 'admin_dashboard', 'admin'),
+    Endpoint('gestionar_menu', 'gestionar_menu', 'admin'),
+    Endpoint('gestionar_personal', 'gestionar_personal', 'admin'),
+    Endpoint('ver_comentarios', 'ver_comentarios', 'admin'),
+    Endpoint('generar_reporte', 'generar_reporte', 'admin'),
+    Endpoint('gestionar_reservas', 'gestionar_reservas', 'admin'),
+    Endpoint('personal_dashboard', 'personal_dashboard', 'personal'),
+    Endpoint('editar_perfil_personal', 'editar_perfil_personal', 'personal'),
+    Endpoint('rutas_reparto', 'rutas_reparto', 'personal'),
+    Endpoint('cliente_dashboard', 'cliente_dashboard', 'cliente'),
+    Endpoint('hacer_pedido', 'hacer_pedido', 'cliente'),
+    Endpoint('reservar_mesa', 'reservar_mesa', 'cliente'),
+    Endpoint('ver_pedidos', 'ver_pedidos', 'cliente'),
+    Endpoint('ver_reservas', 'ver_reservas', 'cliente'),
+    Endpoint('hacer_comentario', 'hacer_comentario', 'cliente'),
+    Endpoint('editar_perfil_cliente', 'editar_perfil_cliente', 'cliente'),
+    Endpoint('api_menu', 'api_menu', None),
+    Endpoint('api_pedidos', 'api_pedidos', 'cliente'),
+    Endpoint('api_reservas', 'api_reservas', 'cliente'),
+)
+
+# Escrituras: solo se miden a pedido porque agregan filas en cada repetición
+ENDPOINTS_ESCRITURA = (
+    Endpoint('hacer_pedido_post', 'hacer_pedido', 'cliente', 'post'),
+)
+
+
+def percentil(valores, p):
+    """Percentil ``p`` (0-100) con interpolación lineal entre los dos valores vecinos"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def datos_pedido():
+    producto = Menu.objects.filter(disponible=True).order_by('id').first()
+    if producto is None:
+        return {}
+    return {
+        'direccion_entrega': 'Calle 1',
+        'carrito_data': json.dumps([{'id': producto.id, 'cantidad': 2}]),
+    }
+
+
+class ClienteDjango:
+    """Pide las vistas en el mismo proceso con el cliente de pruebas y cuenta las consultas"""
+
+    def __init__(self):
+        self.clientes = {}
+
+    def _cliente(self, rol):
+        if rol not in self.clientes:
+            cliente = Client(SERVER_NAME='localhost')
+            if rol is not None:
+                cliente.force_login(Usuario.objects.get(username=USUARIOS_BENCHMARK[rol]))
+            self.clientes[rol] = cliente
+        return self.clientes[rol]
+
+    def pedir(self, endpoint, datos=None):
+        cliente = self._cliente(endpoint.rol)
+        # Se cuentan las consultas de la primaria y de las réplicas
+        with ExitStack() as pila:
+            capturas = [pila.enter_context(CaptureQueriesContext(conexion)) for conexion in connections.all()]
+            comienzo = time.perf_counter()
+            respuesta = getattr(cliente, endpoint.metodo)(reverse(endpoint.url), datos or {})
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+            tiempo = time.perf_counter() - comienzo
+        return respuesta.status_code, tiempo, sum(len(captura) for captura in capturas)
+
+
+class ClienteServidor:
+    """Pide las vistas a un servidor local por HTTP; no puede contar consultas"""
+
+    CSRF = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+    def __init__(self, base, password):
+        self.base = base.rstrip('/') + '/'
+        self.password = password
+        self.sesiones = {}
+
+    def _abrir(self, sesion, ruta, datos=None):
+        url = urljoin(self.base, ruta.lstrip('/'))
+        cuerpo = None
+        if datos is not None:
+            csrf = next((c.value for c in sesion.cookiejar if c.name == 'csrftoken'), '')
+            cuerpo = urlencode({**datos, 'csrfmiddlewaretoken': csrf}).encode()
+        peticion = Request(url, data=cuerpo, headers={'Referer': url})
+        try:
+            with sesion.open(peticion) as respuesta:
+                return respuesta.status, respuesta.read()
+        except HTTPError as error:
+            return error.code, error.read()
+
+    def _sesion(self, rol):
+        if rol not in self.sesiones:
+            cookies = HTTPCookieProcessor(CookieJar())
+            sesion = build_opener(cookies)
+            sesion.cookiejar = cookies.cookiejar
+            if rol is not None:
+                self._abrir(sesion, reverse('login'))
+                self._abrir(sesion, reverse('login'), {
+                    'username': USUARIOS_BENCHMARK[rol],
+                    'password': self.password,
+                })
+                if not any(cookie.name == 'sessionid' for cookie in sesion.cookiejar):
+                    raise ValueError(f'No se pudo iniciar sesión como {USUARIOS_BENCHMARK[rol]}.')
+            self.sesiones[rol] = sesion
+        return self.sesiones[rol]
+
+    def pedir(self, endpoint, datos=None):
+        sesion = self._sesion(endpoint.rol)
+        if endpoint.metodo == 'post':
+            datos = datos or {}
+        comienzo = time.perf_counter()
+        estado, _ = self._abrir(sesion, reverse(endpoint.url), datos)
+        return estado, time.perf_counter() - comienzo, None
+
+
+def medir(cliente, endpoint, repeticiones=50, calentamiento=5):
+    """Latencias en milisegundos, consultas por petición y rendimiento de un endpoint"""
+    datos = datos_pedido() if endpoint.metodo == 'post' else None
+    for _ in range(calentamiento):
+        cliente.pedir(endpoint, datos)
+
+    tiempos, consultas, estados = [], [], set()
+    comienzo = time.perf_counter()
+    for _ in range(repeticiones):
+        estado, tiempo, n_consultas = cliente.pedir(endpoint, datos)
+        estados.add(estado)
+        tiempos.append(tiempo * 1000)
+        if n_consultas is not None:
+            consultas.append(n_consultas)
+    total = time.perf_counter() - comienzo
+
+    return {
+        'endpoint': endpoint.nombre,
+        'url': reverse(endpoint.url),
+        'metodo': endpoint.metodo.upper(),
+        'rol': endpoint.rol,
+        'estados': sorted(estados),
+        'repeticiones': repeticiones,
+        'p50_ms': round(percentil(tiempos, 50), 3),
+        'p95_ms': round(percentil(tiempos, 95), 3),
+        'p99_ms': round(percentil(tiempos, 99), 3),
+        'media_ms': round(mean(tiempos), 3),
+        'consultas': round(mean(consultas), 2) if consultas else None,
+        'peticiones_por_segundo': round(repeticiones / total, 2) if total else None,
+    }
+
+
+def medir_concurrente(cliente, endpoint, peticiones=200, concurrencia=16):
+    """Lanza ``peticiones`` repartidas en ``concurrencia`` hilos y mide el rendimiento total"""
+    datos = datos_pedido() if endpoint.metodo == 'post' else None
+    cliente.pedir(endpoint, datos)
+
+    comienzo = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        respuestas = list(ejecutor.map(lambda _: cliente.pedir(endpoint, datos), range(peticiones)))
+    total = time.perf_counter() - comienzo
+
+    tiempos = [tiempo * 1000 for _, tiempo, _ in respuestas]
+    return {
+        'endpoint': endpoint.nombre,
+        'concurrencia': concurrencia,
+        'peticiones': peticiones,
+        'errores': sum(1 for estado, _, _ in respuestas if estado >= 400),
+        'p50_ms': round(percentil(tiempos, 50), 3),
+        'p95_ms': round(percentil(tiempos, 95), 3),
+        'p99_ms': round(percentil(tiempos, 99), 3),
+        'peticiones_por_segundo': round(peticiones / total, 2) if total else None,
+    }
+
+
+def comparar(actual, anterior):
+    """``[(endpoint, p95 anterior, p95 actual, variación %)]`` de los endpoints en ambas corridas"""
+    previos = {resultado['endpoint']: resultado for resultado in anterior['resultados']}
+    filas = []
+    for resultado in actual['resultados']:
+        previo = previos.get(resultado['endpoint'])
+        if previo is None or not previo['p95_ms']:
+            continue
+        variacion = (resultado['p95_ms'] - previo['p95_ms']) / previo['p95_ms'] * 100
+        filas.append((resultado['endpoint'], previo['p95_ms'], resultado['p95_ms'], round(variacion, 1)))
+    return filas
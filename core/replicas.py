@@ -0,0 +1,69 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Ruteo a réplicas de lectura. Las lecturas van a una réplica salvo que la
+# ejecución esté "fijada" a la primaria: peticiones que escriben, las que llegan
+# poco después de una escritura del mismo navegador (leer lo propio) y todo lo
+# que corra dentro de una transacción abierta en la primaria.
+
+_usar_primaria = ContextVar('usar_primaria', default=False)
+
+# Las sesiones se escriben al iniciar sesión y se leen en cada petición: con
+# retraso de réplica el usuario parecería desconectado
+APPS_SOLO_PRIMARIA = {'sessions', 'auth'}
+
+
+def solo_primaria(model):
+    """Sesiones, permisos y el modelo de usuario se leen siempre de la primaria.
+
+    El usuario se cachea al leerlo (``BackendUsuarioCacheado.get_user`` tras
+    un fallo de caché y ``recachear_usuario`` después de cada guardado): una
+    réplica atrasada dejaría en la caché un rol o una contraseña viejos
+    durante todo el TTL.
+    """
+    return model._meta.app_label in APPS_SOLO_PRIMARIA or model._meta.label == settings.AUTH_USER_MODEL
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def usar_primaria():
+    """Dentro del bloque todas las lecturas van a la base primaria"""
+    token = _usar_primaria.set(True)
+    try:
+        yield
+    finally:
+        _usar_primaria.reset(token)
+
+
+def fijado_a_primaria():
+    return _usar_primaria.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class RouterReplicas:
+    """Escrituras y migraciones en ``default``; lecturas repartidas entre ``DATABASE_REPLICAS``"""
+
+    def db_for_read(self, model, **hints):
+        disponibles = replicas()
+        if not disponibles or fijado_a_primaria() or solo_primaria(model):
+            return DEFAULT_DB_ALIAS
+        return random.choice(disponibles)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplicas tienen los mismos datos
+        bases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
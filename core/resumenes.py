@@ -0,0 +1,172 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .models import Pedido, Reserva, ResumenDiario
+
+# Mantenimiento incremental de ResumenDiario. Cada Pedido aporta al día de su
+# fecha_pedido y cada Reserva completada al día de su fecha_reserva; al
+# guardar o borrar se aplica la diferencia entre el aporte anterior y el nuevo.
+
+CAMPOS_RESUMEN = ('total_pedidos', 'pedidos_entregados', 'total_ventas', 'reservas_completadas')
+
+
+def _dia(fecha_hora):
+    return timezone.localdate(fecha_hora) if timezone.is_aware(fecha_hora) else fecha_hora.date()
+
+
+def aporte_pedido(estado, total, fecha_pedido):
+    """Devuelve ``(dia, {campo: valor})`` con lo que un pedido suma al resumen"""
+    entregado = estado == 'entregado'
+    return _dia(fecha_pedido), {
+        'total_pedidos': 1,
+        'pedidos_entregados': 1 if entregado else 0,
+        'total_ventas': Decimal(total) if entregado else Decimal('0'),
+    }
+
+
+def aporte_reserva(estado, fecha_reserva):
+    return _dia(fecha_reserva), {
+        'reservas_completadas': 1 if estado == 'completada' else 0,
+    }
+
+
+def guardar_estado_original(instance, campos):
+    """Recuerda los valores cargados desde la base para calcular diferencias.
+
+    Se lee ``__dict__`` para no disparar consultas con campos diferidos; si
+    falta alguno el original queda como ``None`` y el día se recalcula entero.
+    """
+    if instance.pk is None or any(campo not in instance.__dict__ for campo in campos):
+        instance._resumen_original = None
+    else:
+        instance._resumen_original = tuple(instance.__dict__[campo] for campo in campos)
+
+
+def _aplicar(dia, valores, signo):
+    cambios = {}
+    for campo, valor in valores.items():
+        if not valor:
+            continue
+        if signo > 0 or campo == 'total_ventas':
+            cambios[campo] = F(campo) + signo * valor
+        else:
+            # Un resumen desfasado no debe romper el guardado del pedido
+            cambios[campo] = Greatest(F(campo) - valor, 0)
+    if not cambios:
+        return
+    ResumenDiario.objects.get_or_create(fecha=dia)
+    ResumenDiario.objects.filter(fecha=dia).update(**cambios)
+
+
+def _registrar(anterior, actual):
+    if anterior == actual:
+        return
+    if anterior is not None:
+        _aplicar(*anterior, signo=-1)
+    if actual is not None:
+        _aplicar(*actual, signo=1)
+
+
+def registrar_pedido(pedido, creado=False, eliminado=False):
+    original = getattr(pedido, '_resumen_original', None)
+    if not creado and original is None:
+        recalcular_dias(_dia(pedido.fecha_pedido), _dia(pedido.fecha_pedido))
+    else:
+        anterior = None if creado else aporte_pedido(*original)
+        actual = None if eliminado else aporte_pedido(pedido.estado, pedido.total, pedido.fecha_pedido)
+        _registrar(anterior, actual)
+    guardar_estado_original(pedido, ('estado', 'total', 'fecha_pedido'))
+
+
+def registrar_reserva(reserva, creado=False, eliminado=False):
+    original = getattr(reserva, '_resumen_original', None)
+    if not creado and original is None:
+        recalcular_dias(_dia(reserva.fecha_reserva), _dia(reserva.fecha_reserva))
+    else:
+        anterior = None if creado else aporte_reserva(*original)
+        actual = None if eliminado else aporte_reserva(reserva.estado, reserva.fecha_reserva)
+        _registrar(anterior, actual)
+    guardar_estado_original(reserva, ('estado', 'fecha_reserva'))
+
+
+def rango_fechas(desde, hasta):
+    """Convierte un rango de días en un rango semiabierto de fechas con hora"""
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def recalcular_dias(desde, hasta):
+    """Reconstruye los resúmenes de ``desde`` a ``hasta`` (inclusive) desde las tablas originales"""
+    inicio, fin = rango_fechas(desde, hasta)
+    resumenes = {}
+
+    pedidos = (
+        Pedido.objects.filter(fecha_pedido__gte=inicio, fecha_pedido__lt=fin)
+        .annotate(dia=TruncDate('fecha_pedido'))
+        .values('dia')
+        .annotate(
+            total_pedidos=Count('id'),
+            pedidos_entregados=Count('id', filter=Q(estado='entregado')),
+            total_ventas=Sum('total', filter=Q(estado='entregado')),
+        )
+        .order_by()
+    )
+    for fila in pedidos:
+        resumen = resumenes.setdefault(fila['dia'], ResumenDiario(fecha=fila['dia']))
+        resumen.total_pedidos = fila['total_pedidos']
+        resumen.pedidos_entregados = fila['pedidos_entregados']
+        resumen.total_ventas = fila['total_ventas'] or 0
+
+    reservas = (
+        Reserva.objects.filter(fecha_reserva__gte=inicio, fecha_reserva__lt=fin, estado='completada')
+        .annotate(dia=TruncDate('fecha_reserva'))
+        .values('dia')
+        .annotate(reservas_completadas=Count('id'))
+        .order_by()
+    )
+    for fila in reservas:
+        resumen = resumenes.setdefault(fila['dia'], ResumenDiario(fecha=fila['dia']))
+        resumen.reservas_completadas = fila['reservas_completadas']
+
+    ResumenDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta).exclude(fecha__in=resumenes).delete()
+    ResumenDiario.objects.bulk_create(
+        resumenes.values(),
+        update_conflicts=True,
+        unique_fields=['fecha'],
+        update_fields=list(CAMPOS_RESUMEN),
+    )
+    return len(resumenes)
+
+
+def totales(desde, hasta):
+    """Suma los resúmenes entre dos días (inclusive)"""
+    resultado = ResumenDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta).aggregate(
+        **{campo: Sum(campo) for campo in CAMPOS_RESUMEN}
+    )
+    return {campo: valor or 0 for campo, valor in resultado.items()}
+
+
+def resumen_periodos(hoy=None):
+    """Totales de hoy, últimos 7 días y últimos 30 días leyendo a lo sumo 31 filas"""
+    hoy = hoy or timezone.localdate()
+    filas = list(
+        ResumenDiario.objects.filter(fecha__gte=hoy - timedelta(days=30), fecha__lte=hoy)
+        .values('fecha', *CAMPOS_RESUMEN)
+    )
+
+    def sumar(desde):
+        return {
+            campo: sum((fila[campo] for fila in filas if fila['fecha'] >= desde), 0)
+            for campo in CAMPOS_RESUMEN
+        }
+
+    return {
+        'hoy': sumar(hoy),
+        'semana': sumar(hoy - timedelta(days=7)),
+        'mes': sumar(hoy - timedelta(days=30)),
+    }
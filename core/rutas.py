@@ -0,0 +1,166 @@
+from collections import namedtuple
+
+import networkx as nx
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Pedido, Restaurante, TrayectoZona, ZonaEntrega
+from .versiones import obtener_version
+
+# Planificación de repartos sobre el grafo de zonas de entrega. Las zonas son
+# nodos y los trayectos aristas con los minutos de viaje. Los caminos mínimos
+# entre todos los pares se calculan una vez con Dijkstra y se guardan en la
+# caché (y en memoria del proceso) bajo la versión ``VERSION_ZONAS``, que las
+# señales de ZonaEntrega y TrayectoZona incrementan. Con eso, planificar es
+# solo recorrer diccionarios: no hay grafos ni consultas por pedido.
+
+VERSION_ZONAS = 'zonas'
+RED_TIMEOUT = 60 * 60 * 24
+# Pedidos que lleva un repartidor por salida y minutos máximos hasta la última entrega
+CAPACIDAD = 5
+MAX_MINUTOS = 45
+
+# ``distancias[a][b]`` son los minutos del camino más corto de ``a`` a ``b``,
+# ``previos[a][b]`` la zona anterior a ``b`` en ese camino y ``cercanas[a]``
+# las zonas alcanzables desde ``a`` de la más cercana a la más lejana
+Red = namedtuple('Red', ['distancias', 'previos', 'cercanas', 'nombres'])
+Parada = namedtuple('Parada', ['zona', 'nombre', 'llegada', 'pedidos'])
+Ruta = namedtuple('Ruta', ['paradas', 'minutos', 'recorrido'])
+Plan = namedtuple('Plan', ['rutas', 'sin_ruta', 'origen'])
+# Lo que se muestra de cada pedido, leído con ``values_list`` sin instanciar modelos
+PedidoListo = namedtuple('PedidoListo', ['id', 'zona_id', 'fecha_pedido', 'total', 'direccion_entrega', 'cliente'])
+
+_red = (None, None)
+
+
+def construir_grafo():
+    grafo = nx.Graph()
+    grafo.add_nodes_from(
+        (zona_id, {'nombre': nombre})
+        for zona_id, nombre in ZonaEntrega.objects.filter(activa=True).values_list('id', 'nombre')
+    )
+    trayectos = TrayectoZona.objects.filter(origen__activa=True, destino__activa=True)
+    for origen, destino, minutos in trayectos.values_list('origen_id', 'destino_id', 'minutos'):
+        # Si se cargó el trayecto en los dos sentidos vale el más corto
+        if not grafo.has_edge(origen, destino) or minutos < grafo[origen][destino]['minutos']:
+            grafo.add_edge(origen, destino, minutos=minutos)
+    return grafo
+
+
+def calcular_red(grafo):
+    """Caminos mínimos entre todos los pares de zonas de ``grafo``"""
+    distancias, previos, cercanas = {}, {}, {}
+    for zona in grafo:
+        anteriores, distancia = nx.dijkstra_predecessor_and_distance(grafo, zona, weight='minutos')
+        distancias[zona] = distancia
+        previos[zona] = {destino: lista[0] for destino, lista in anteriores.items() if lista}
+        cercanas[zona] = sorted(distancia, key=distancia.get)
+    return Red(distancias, previos, cercanas, dict(grafo.nodes(data='nombre')))
+
+
+def obtener_red():
+    """La red de la versión actual de las zonas, sin consultas si ya está calculada"""
+    global _red
+    version = obtener_version(VERSION_ZONAS)
+    version_red, red = _red
+    if version_red != version:
+        clave = f'rutas:red:{version}'
+        red = cache.get(clave)
+        if red is None:
+            red = calcular_red(construir_grafo())
+            cache.set(clave, red, RED_TIMEOUT)
+        _red = (version, red)
+    return red
+
+
+def opciones_zonas():
+    """``(id, nombre)`` de las zonas activas por nombre, para los formularios"""
+    return sorted(obtener_red().nombres.items(), key=lambda zona: zona[1])
+
+
+def camino(red, desde, hasta):
+    """Zonas por las que se pasa de ``desde`` a ``hasta``, sin incluir ``desde``"""
+    zonas = []
+    while hasta != desde:
+        zonas.append(hasta)
+        hasta = red.previos[desde][hasta]
+    zonas.reverse()
+    return zonas
+
+
+def planificar(pedidos, red, origen, capacidad=CAPACIDAD, max_minutos=MAX_MINUTOS):
+    """Agrupa ``pedidos`` (los más antiguos primero) en salidas de repartidor.
+
+    Cada salida empieza por la zona del pedido más antiguo que queda, para
+    que ninguno espere indefinidamente, y sigue por la zona pendiente más
+    cercana a la parada actual mientras haya lugar y no se pase de
+    ``max_minutos``. Los pedidos de una misma zona van juntos si caben.
+    Solo se mira ``pedido.zona_id``; los que no tienen zona o no se pueden
+    alcanzar desde ``origen`` quedan en ``sin_ruta``.
+    """
+    capacidad = max(capacidad, 1)
+    alcanzables = red.distancias.get(origen, {})
+    por_zona = {}
+    sin_ruta = []
+    for pedido in pedidos:
+        if pedido.zona_id in alcanzables:
+            por_zona.setdefault(pedido.zona_id, []).append(pedido)
+        else:
+            sin_ruta.append(pedido)
+
+    # Las zonas en el orden de su pedido más antiguo (los dict conservan la inserción)
+    rutas = []
+    while por_zona:
+        primera = next(iter(por_zona))
+        paradas = []
+        actual, minutos, lugar = origen, 0, capacidad
+        siguiente = primera
+        while siguiente is not None:
+            minutos += red.distancias[actual][siguiente]
+            pendientes = por_zona[siguiente]
+            llevados, por_zona[siguiente] = pendientes[:lugar], pendientes[lugar:]
+            if not por_zona[siguiente]:
+                del por_zona[siguiente]
+            paradas.append(Parada(siguiente, red.nombres.get(siguiente), minutos, llevados))
+            lugar -= len(llevados)
+            actual, siguiente = siguiente, None
+            if not lugar:
+                break
+            for zona in red.cercanas[actual]:
+                if minutos + red.distancias[actual][zona] > max_minutos:
+                    break
+                if zona in por_zona:
+                    siguiente = zona
+                    break
+
+        recorrido = []
+        anterior = origen
+        for parada in paradas:
+            recorrido.extend(red.nombres.get(zona) for zona in camino(red, anterior, parada.zona))
+            anterior = parada.zona
+        rutas.append(Ruta(paradas, minutos, recorrido))
+    return Plan(rutas, sin_ruta, origen)
+
+
+def zona_origen():
+    """Zona del primer restaurante activo que tenga una asignada"""
+    return (
+        Restaurante.objects.filter(activo=True, zona__isnull=False)
+        .order_by('id').values_list('zona_id', flat=True).first()
+    )
+
+
+def planificar_listos():
+    """Plan de repartos para todos los pedidos en estado ``listo``"""
+    pedidos = (
+        Pedido.objects.filter(estado='listo')
+        .order_by('fecha_pedido', 'id')
+        .values_list('id', 'zona_id', 'fecha_pedido', 'total', 'direccion_entrega', 'cliente__username')
+    )
+    return planificar(
+        map(PedidoListo._make, pedidos),
+        obtener_red(),
+        zona_origen(),
+        getattr(settings, 'RUTAS_CAPACIDAD', CAPACIDAD),
+        getattr(settings, 'RUTAS_MAX_MINUTOS', MAX_MINUTOS),
+    )
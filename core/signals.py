@@ -0,0 +1,130 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from . import fragmentos, imagenes, resumenes
+from .autenticacion import guardar_usuario, olvidar_usuario
+from .catalogo import VERSION_CATALOGO
+from .eventos import publicar_evento_pedido
+from .graficos import VERSION_GRAFICOS
+from .mesas import VERSION_MESAS
+from .models import Categoria, Menu, Mesa, Pedido, Reserva, TrayectoZona, Usuario, ZonaEntrega
+from .rutas import VERSION_ZONAS
+from .versiones import incrementar_version
+
+
+@receiver([post_save, post_delete], sender=Menu)
+@receiver([post_save, post_delete], sender=Categoria)
+def invalidar_catalogo(sender, **kwargs):
+    # Al confirmar: un snapshot armado antes del commit no debe quedar con la versión nueva
+    transaction.on_commit(lambda: incrementar_version(VERSION_CATALOGO))
+
+
+@receiver([post_save, post_delete], sender=Mesa)
+@receiver([post_save, post_delete], sender=Reserva)
+def invalidar_agendas_mesas(sender, **kwargs):
+    # Al confirmar: una agenda armada antes del commit no debe quedar con la versión nueva
+    transaction.on_commit(lambda: incrementar_version(VERSION_MESAS))
+
+
+@receiver([post_save, post_delete], sender=ZonaEntrega)
+@receiver([post_save, post_delete], sender=TrayectoZona)
+def invalidar_red_zonas(sender, **kwargs):
+    incrementar_version(VERSION_ZONAS)
+
+
+@receiver([post_save, post_delete], sender=Menu)
+@receiver([post_save, post_delete], sender=Categoria)
+@receiver([post_save, post_delete], sender=Pedido)
+@receiver([post_save, post_delete], sender=Reserva)
+@receiver([post_save, post_delete], sender=Usuario)
+def invalidar_fragmentos(sender, instance, **kwargs):
+    fragmentos.invalidar(instance)
+
+
+@receiver(post_save, sender=Menu)
+def programar_variantes_imagen(sender, instance, **kwargs):
+    if imagenes.necesita_variantes(instance):
+        # La tarea se guarda en la misma transacción que el producto
+        imagenes.programar(instance)
+    elif not instance.imagen and instance.imagen_variantes:
+        # Se quitó la imagen: las miniaturas de la anterior sobran
+        variantes = instance.imagen_variantes
+        Menu.objects.filter(pk=instance.pk).update(imagen_variantes={})
+        transaction.on_commit(lambda: imagenes.borrar_variantes(variantes))
+
+
+@receiver(post_delete, sender=Menu)
+def borrar_variantes_imagen(sender, instance, **kwargs):
+    if instance.imagen_variantes:
+        transaction.on_commit(lambda: imagenes.borrar_variantes(instance.imagen_variantes))
+
+
+@receiver(post_save, sender=Pedido)
+def notificar_cambio_pedido(sender, instance, created, **kwargs):
+    def publicar():
+        # Se publica al confirmar la transacción para que los items ya existan
+        pedido = (
+            Pedido.objects.select_related('cliente')
+            .prefetch_related('items__producto')
+            .filter(pk=instance.pk)
+            .first()
+        )
+        if pedido is not None:
+            publicar_evento_pedido(pedido, nuevo=created)
+
+    transaction.on_commit(publicar)
+
+
+@receiver(post_init, sender=Pedido)
+def recordar_pedido(sender, instance, **kwargs):
+    resumenes.guardar_estado_original(instance, ('estado', 'total', 'fecha_pedido'))
+
+
+@receiver(post_save, sender=Pedido)
+def resumir_pedido(sender, instance, created, **kwargs):
+    resumenes.registrar_pedido(instance, creado=created)
+
+
+@receiver(post_delete, sender=Pedido)
+def resumir_pedido_eliminado(sender, instance, **kwargs):
+    resumenes.registrar_pedido(instance, eliminado=True)
+
+
+@receiver([post_save, post_delete], sender=Pedido)
+def invalidar_graficos(sender, **kwargs):
+    incrementar_version(VERSION_GRAFICOS)
+
+
+@receiver(post_init, sender=Reserva)
+def recordar_reserva(sender, instance, **kwargs):
+    resumenes.guardar_estado_original(instance, ('estado', 'fecha_reserva'))
+
+
+@receiver(post_save, sender=Reserva)
+def resumir_reserva(sender, instance, created, **kwargs):
+    resumenes.registrar_reserva(instance, creado=created)
+
+
+@receiver(post_delete, sender=Reserva)
+def resumir_reserva_eliminada(sender, instance, **kwargs):
+    resumenes.registrar_reserva(instance, eliminado=True)
+
+
+@receiver(post_save, sender=Usuario)
+def recachear_usuario(sender, instance, **kwargs):
+    # Se relee completo: un save(update_fields=...) puede venir de una instancia parcial
+    def guardar():
+        usuario = Usuario.objects.filter(pk=instance.pk).first()
+        if usuario is None:
+            olvidar_usuario(instance.pk)
+        else:
+            guardar_usuario(usuario)
+
+    olvidar_usuario(instance.pk)
+    transaction.on_commit(guardar)
+
+
+@receiver(post_delete, sender=Usuario)
+def olvidar_usuario_eliminado(sender, instance, **kwargs):
+    olvidar_usuario(instance.pk)
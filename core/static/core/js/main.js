@@ -53,8 +53,9 @@ document.addEventListener('DOMContentLoaded', function() {
         document.body.classList.add('mobile-view');
     }
 
-    // Actualizar automáticamente el dashboard cada 30 segundos (solo en dashboards)
-    if (window.location.pathname.includes('dashboard')) {
+    // Actualizar automáticamente el dashboard cada 30 segundos (solo en dashboards
+    // que no reciben los cambios en vivo con data-eventos-url)
+    if (window.location.pathname.includes('dashboard') && !document.querySelector('[data-eventos-url]')) {
         setInterval(() => {
             window.location.reload();
         }, 30000);
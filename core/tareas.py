@@ -0,0 +1,197 @@
+import logging
+import traceback
+import uuid
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Reporte, Tarea
+from .resumenes import totales
+
+logger = logging.getLogger(__name__)
+
+# Cola de trabajos en segundo plano guardada en la base, sin broker externo.
+# ``encolar`` inserta una Tarea y ``manage.py procesar_tareas`` las reclama
+# y ejecuta en un pool de hilos o procesos. Reclamar es un UPDATE condicional
+# que marca las filas con un token (``reclamo``) y una hora de vencimiento:
+# si el trabajador muere, la tarea vuelve a estar disponible al vencer y la
+# toma otro. Una tarea puede correr más de una vez, así que cada tipo debe
+# tolerar repetirse. Los fallos se reintentan con espera exponencial hasta
+# ``max_intentos``.
+#
+# Los tipos se registran con ``@tarea('nombre')`` y reciben ``datos`` como
+# argumentos con nombre; lo que devuelven se guarda en ``resultado``.
+
+MAX_INTENTOS = 3
+# Segundos que una tarea reclamada queda reservada para su trabajador
+VISIBILIDAD = 5 * 60
+# Espera antes del primer reintento; se duplica en cada uno
+ESPERA_REINTENTO = 30
+
+TIPOS = {}
+
+
+def tarea(nombre):
+    """Registra la función decorada como el tipo de tarea ``nombre``"""
+    def registrar(funcion):
+        TIPOS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def _ajuste(nombre, defecto):
+    return getattr(settings, f'TAREAS_{nombre}', defecto)
+
+
+def encolar(tipo, datos=None, prioridad=0, clave=None, retraso=0, max_intentos=None):
+    """Agrega una tarea a la cola y la devuelve.
+
+    Con ``clave`` (idempotencia) encolar dos veces lo mismo devuelve la tarea
+    ya existente en lugar de crear otra, aunque ya haya terminado. Si está
+    activo ``TAREAS_SINCRONAS`` la tarea se ejecuta en el mismo proceso al
+    confirmar la transacción, útil en desarrollo sin trabajador.
+    """
+    if tipo not in TIPOS:
+        raise LookupError(f'Tipo de tarea desconocido: {tipo}')
+    campos = {
+        'tipo': tipo,
+        'datos': datos or {},
+        'prioridad': prioridad,
+        'max_intentos': max_intentos or _ajuste('MAX_INTENTOS', MAX_INTENTOS),
+        'disponible_desde': timezone.now() + timedelta(seconds=retraso),
+    }
+    if clave is None:
+        nueva, creada = Tarea.objects.create(**campos), True
+    else:
+        nueva, creada = Tarea.objects.get_or_create(clave=clave, defaults=campos)
+    if creada and _ajuste('SINCRONAS', False) and not retraso:
+        transaction.on_commit(lambda: procesar(ids=[nueva.pk]))
+    return nueva
+
+
+def _disponibles(ahora):
+    # Pendientes ya vencida su espera, o reclamadas cuyo trabajador no terminó a tiempo
+    return Q(estado='pendiente', disponible_desde__lte=ahora) | Q(estado='en_curso', bloqueada_hasta__lt=ahora)
+
+
+def reclamar(limite, tipos=None, ids=None):
+    """Reserva hasta ``limite`` tareas para este trabajador, las más prioritarias primero"""
+    if limite < 1:
+        return []
+    ahora = timezone.now()
+    candidatas = Tarea.objects.filter(_disponibles(ahora))
+    if tipos:
+        candidatas = candidatas.filter(tipo__in=tipos)
+    if ids:
+        candidatas = candidatas.filter(pk__in=ids)
+    elegidas = list(candidatas.order_by('-prioridad', 'disponible_desde', 'id').values_list('id', flat=True)[:limite])
+    if not elegidas:
+        return []
+
+    # El UPDATE repite la condición: si otro trabajador reclamó alguna entre
+    # medio, esa fila ya no coincide y se queda con él
+    reclamo = uuid.uuid4().hex
+    Tarea.objects.filter(_disponibles(ahora), pk__in=elegidas).update(
+        estado='en_curso',
+        reclamo=reclamo,
+        bloqueada_hasta=ahora + timedelta(seconds=_ajuste('VISIBILIDAD', VISIBILIDAD)),
+        intentos=F('intentos') + 1,
+    )
+    return list(Tarea.objects.filter(reclamo=reclamo).order_by('-prioridad', 'disponible_desde', 'id'))
+
+
+class ReservaPerdida(Exception):
+    """La reserva de la tarea venció y ahora la tiene otro trabajador"""
+
+
+def _terminar(reclamada, **cambios):
+    # Solo si la reserva sigue siendo de este trabajador
+    actualizadas = Tarea.objects.filter(pk=reclamada.pk, reclamo=reclamada.reclamo).update(
+        reclamo='', bloqueada_hasta=None, **cambios,
+    )
+    if not actualizadas:
+        raise ReservaPerdida(reclamada.pk)
+
+
+def ejecutar(reclamada):
+    """Corre una tarea reclamada y guarda cómo terminó; devuelve el estado final.
+
+    La tarea y su marca de completada se confirman en la misma transacción:
+    si otro trabajador ya la retomó, lo que hizo esta ejecución se deshace.
+    """
+    funcion = TIPOS.get(reclamada.tipo)
+    try:
+        if funcion is None:
+            raise LookupError(f'Tipo de tarea desconocido: {reclamada.tipo}')
+        if reclamada.intentos > reclamada.max_intentos:
+            # Venció su reserva en todos los intentos sin llegar a terminar
+            raise TimeoutError('La tarea agotó sus intentos sin terminar')
+        with transaction.atomic():
+            resultado = funcion(**reclamada.datos)
+            _terminar(reclamada, estado='completada', resultado=resultado, error='', fecha_fin=timezone.now())
+        return 'completada'
+    except ReservaPerdida:
+        logger.warning('La tarea %s ya la tomó otro trabajador', reclamada.pk)
+        return None
+    except Exception:
+        logger.exception('Falló la tarea %s (intento %s)', reclamada.pk, reclamada.intentos)
+        error = traceback.format_exc()
+
+    if funcion is not None and reclamada.intentos < reclamada.max_intentos:
+        espera = _ajuste('ESPERA_REINTENTO', ESPERA_REINTENTO) * 2 ** (reclamada.intentos - 1)
+        cambios = {'estado': 'pendiente', 'disponible_desde': timezone.now() + timedelta(seconds=espera)}
+    else:
+        cambios = {'estado': 'fallida', 'fecha_fin': timezone.now()}
+    try:
+        _terminar(reclamada, error=error, **cambios)
+    except ReservaPerdida:
+        return None
+    return cambios['estado']
+
+
+def ejecutar_en_hilo(reclamada):
+    try:
+        return ejecutar(reclamada)
+    finally:
+        connections.close_all()
+
+
+def ejecutar_en_proceso(tarea_id, reclamo):
+    """Versión para el pool de procesos: recibe el id, no la instancia"""
+    close_old_connections()
+    reclamada = Tarea.objects.filter(pk=tarea_id, reclamo=reclamo).first()
+    if reclamada is None:
+        return None
+    return ejecutar(reclamada)
+
+
+def procesar(limite=None, tipos=None, ids=None):
+    """Ejecuta en este hilo las tareas disponibles (o solo ``ids``); devuelve cuántas corrió"""
+    ejecutadas = 0
+    while limite is None or ejecutadas < limite:
+        reclamadas = reclamar(1, tipos, ids)
+        if not reclamadas:
+            break
+        ejecutar(reclamadas[0])
+        ejecutadas += 1
+    return ejecutadas
+
+
+def limpiar(dias=7):
+    """Borra las tareas terminadas hace más de ``dias`` días"""
+    limite = timezone.now() - timedelta(days=dias)
+    borradas, _ = Tarea.objects.filter(estado__in=('completada', 'fallida'), fecha_fin__lt=limite).delete()
+    return borradas
+
+
+# Tipos de tarea
+
+@tarea('guardar_reporte')
+def guardar_reporte(tipo, fecha_inicio, fecha_fin):
+    """Guarda un Reporte con los totales de ResumenDiario del período"""
+    desde, hasta = date.fromisoformat(fecha_inicio), date.fromisoformat(fecha_fin)
+    reporte = Reporte.objects.create(tipo=tipo, fecha_inicio=desde, fecha_fin=hasta, **totales(desde, hasta))
+    return {'reporte': reporte.pk}
@@ -0,0 +1,50 @@
+from django import template
+
+from .. import fragmentos
+
+register = template.Library()
+
+
+class NodoFragmento(template.Node):
+    def __init__(self, nodelist, nombre, fuentes, variantes):
+        self.nodelist = nodelist
+        self.nombre = nombre
+        self.fuentes = fuentes
+        self.variantes = variantes
+
+    def render(self, context):
+        return fragmentos.renderizar(
+            self.nombre.resolve(context),
+            [fuente.resolve(context) for fuente in self.fuentes],
+            [variante.resolve(context) for variante in self.variantes],
+            lambda: self.nodelist.render(context),
+            context.get('fragmentos_precargados'),
+        )
+
+
+@register.tag
+def fragmento(parser, token):
+    """Cachea el contenido según las versiones de los modelos de los que depende.
+
+    Uso: ``{% fragmento 'menu' 'menu' 'categoria' por user.rol %}...{% endfragmento %}``.
+    Tras el nombre van las fuentes (nombres de modelo o instancias, cuya versión
+    propia se usa) y, después de ``por``, los valores por los que varía.
+    """
+    bits = token.split_contents()[1:]
+    if not bits:
+        raise template.TemplateSyntaxError("'fragmento' necesita un nombre")
+    nodelist = parser.parse(('endfragmento',))
+    parser.delete_first_token()
+
+    fuentes, variantes = bits[1:], []
+    if 'por' in fuentes:
+        posicion = fuentes.index('por')
+        fuentes, variantes = fuentes[:posicion], fuentes[posicion + 1:]
+    if not fuentes:
+        raise template.TemplateSyntaxError("'fragmento' necesita al menos un modelo del que dependa")
+    return NodoFragmento(
+        nodelist,
+        parser.compile_filter(bits[0]),
+        [parser.compile_filter(bit) for bit in fuentes],
+        [parser.compile_filter(bit) for bit in variantes],
+    )
@@ -0,0 +1,41 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from ..imagenes import variantes_vigentes
+
+register = template.Library()
+
+SIZES_DEFECTO = '(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw'
+
+
+def _srcset(pares):
+    return ', '.join(f'{default_storage.url(nombre)} {ancho}w' for ancho, nombre in pares)
+
+
+@register.simple_tag
+def imagen_producto(producto, sizes=SIZES_DEFECTO, clase='', estilo='', carga='lazy'):
+    """``<picture>`` con WebP y JPEG en varios anchos para que el navegador elija.
+
+    Uso: ``{% imagen_producto producto sizes="..." clase="card-img-top" %}``.
+    Mientras las variantes no estén generadas devuelve la imagen original.
+    """
+    if not producto.imagen:
+        return ''
+    variantes = variantes_vigentes(producto)
+    if variantes is None:
+        return format_html(
+            '<img src="{}" class="{}" alt="{}" style="{}" loading="{}" decoding="async">',
+            producto.imagen.url, clase, producto.nombre, estilo, carga,
+        )
+
+    jpg = variantes['jpg']
+    # El alto según la proporción del original evita saltos al cargar
+    ancho = jpg[-1][0]
+    alto = max(1, round(variantes['alto'] * ancho / variantes['ancho']))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}"><img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" class="{}" alt="{}" style="{}" '
+        'loading="{}" decoding="async"></picture>',
+        _srcset(variantes['webp']), sizes, default_storage.url(jpg[-1][1]), _srcset(jpg), sizes, ancho, alto,
+        clase, producto.nombre, estilo, carga,
+    )
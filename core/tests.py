@@ -1,3 +1,1886 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import json
+import random
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q, Sum
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import api, autenticacion, estaticos, fragmentos, graficos, imagenes, rutas, tareas
+from .autenticacion import BackendUsuarioCacheado, clave_usuario
+from .busqueda import buscar_menu, consulta_fts, ids_comentarios
+from .catalogo import VERSION_CATALOGO, obtener_catalogo, obtener_indice_precios
+from .consultas import PresupuestoExcedido, presupuesto
+from .estadisticas import estadisticas_admin, estadisticas_personal, estadisticas_reservas
+from .eventos import (
+    MAX_EVENTOS, eventos_desde, esperar_eventos, iterar_eventos, publicar_evento_pedido, stream_eventos,
+    ultimo_evento,
+)
+from .middleware import EstaticosMiddleware
+from .models import *
+from .paginacion import apaginar_por_partes, codificar_cursor, decodificar_cursor, paginar
+from .mesas import AgendaMesas, MesaNoDisponible, cargar_agenda, confirmar_reserva, duracion_reserva, mesas_disponibles
+from .pedidos import CarritoInvalido, cambiar_estados, crear_pedido, leer_carrito
+from .pronostico import calcular_pronostico, media_movil, pronostico_preparacion
+from .rendimiento import percentil
+from .replicas import RouterReplicas, usar_primaria
+from .resumenes import recalcular_dias
+from .versiones import obtener_version
+
+# Tablas que crecen con el historial del restaurante. Un SCAN sin índice sobre
+# ellas hace que el costo de la página crezca con el tiempo. El catálogo
+# (Menu, Categoria, Restaurante) y los resúmenes (Reporte, ResumenDiario) son
+# pequeños por naturaleza y se pueden recorrer completos.
+TABLAS_GRANDES = {
+    'core_pedido', 'core_itempedido', 'core_reserva', 'core_comentario',
+    'core_usuario', 'django_session',
+}
+
+
+def sembrar_historial(n=3000):
+    """Crea un historial grande con bulk_create y actualiza las estadísticas del planificador"""
+    rnd = random.Random(1)
+    ahora = timezone.now()
+    restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+    categorias = [Categoria.objects.create(nombre=f'Categoría {i}', tipo='comida') for i in range(5)]
+    productos = Menu.objects.bulk_create([
+        Menu(categoria=categorias[i % 5], nombre=f'Producto {i}', precio=10, restaurante=restaurante)
+        for i in range(200)
+    ])
+    clientes = Usuario.objects.bulk_create([Usuario(username=f'cliente{i}') for i in range(300)])
+    Usuario.objects.bulk_create([Usuario(username=f'personal{i}', rol='personal') for i in range(5)])
+
+    # El primer cliente es un cliente frecuente con cientos de pedidos
+    pedidos = Pedido.objects.bulk_create([
+        Pedido(cliente=clientes[0] if i % 5 == 0 else rnd.choice(clientes),
+               estado=rnd.choice(Pedido.ESTADOS)[0], total=10)
+        for i in range(n)
+    ])
+    for i, pedido in enumerate(pedidos):
+        pedido.fecha_pedido = ahora - timedelta(minutes=30 * i)
+    Pedido.objects.bulk_update(pedidos, ['fecha_pedido'], batch_size=500)
+    ItemPedido.objects.bulk_create([
+        ItemPedido(pedido=pedido, producto=rnd.choice(productos), cantidad=1, subtotal=10)
+        for pedido in pedidos
+    ])
+    Reserva.objects.bulk_create([
+        Reserva(cliente=rnd.choice(clientes), fecha_reserva=ahora + timedelta(hours=i),
+                numero_personas=2, estado=rnd.choice(Reserva.ESTADOS)[0])
+        for i in range(n)
+    ])
+    Comentario.objects.bulk_create([
+        Comentario(cliente=rnd.choice(clientes), texto='Muy bueno', calificacion=5, aprobado=i % 2 == 0)
+        for i in range(n)
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return clientes
+
+
+def escaneos_completos(consultas):
+    """Devuelve ``[(tabla, sql)]`` de las consultas que recorren una tabla grande.
+
+    Solo se aceptan búsquedas (``SEARCH ... USING [COVERING] INDEX``). Un
+    ``SCAN`` cuenta aunque use un índice: recorrerlo entero también crece con
+    el historial. La excepción es un recorrido ordenado con ``LIMIT`` y sin
+    ``WHERE``, que se detiene al llenar la página.
+    """
+    escaneos = []
+    with connection.cursor() as cursor:
+        for consulta in consultas:
+            sql = consulta['sql'].lstrip()
+            if not sql.upper().startswith('SELECT'):
+                continue
+            pagina_sin_filtro = ' LIMIT ' in sql and ' WHERE ' not in sql
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            for fila in cursor.fetchall():
+                detalle = fila[-1].split()
+                if detalle[0] != 'SCAN' or pagina_sin_filtro and 'INDEX' in detalle:
+                    continue
+                tabla = detalle[2] if detalle[1] == 'TABLE' else detalle[1]
+                if tabla in TABLAS_GRANDES:
+                    escaneos.append((tabla, sql))
+    return escaneos
+
+
+class PlanesDeConsultaTests(TestCase):
+    """Falla si alguna vista recorre completa una tabla que crece con el historial"""
+
+    @classmethod
+    def setUpTestData(cls):
+        clientes = sembrar_historial()
+        cls.cliente = clientes[0]
+        cls.admin = Usuario.objects.create(username='admin', rol='admin')
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('El análisis de planes usa EXPLAIN QUERY PLAN de SQLite')
+
+    def assertSinEscaneosCompletos(self, usuario, urls):
+        self.client.force_login(usuario)
+        for url in urls:
+            with self.subTest(url=url):
+                # Se miran las consultas de cada petición; los contadores
+                # cacheados unos segundos (core.estadisticas) no cuentan
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as consultas:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                escaneos = escaneos_completos(consultas.captured_queries)
+                self.assertEqual(escaneos, [], f'{url} recorre tablas completas')
+
+    def test_vistas_admin(self):
+        self.assertSinEscaneosCompletos(self.admin, [
+            reverse('admin_dashboard'),
+            reverse('gestionar_menu'),
+            reverse('gestionar_personal'),
+            reverse('gestionar_reservas'),
+            reverse('gestionar_reservas') + f'?estado=pendiente&fecha={timezone.localdate()}',
+            reverse('ver_comentarios'),
+            reverse('generar_reporte'),
+        ])
+
+    def test_vistas_personal(self):
+        self.assertSinEscaneosCompletos(self.admin, [
+            reverse('personal_dashboard'),
+            reverse('personal_dashboard') + '?formato=json',
+        ])
+
+    def test_vistas_cliente(self):
+        self.client.force_login(self.cliente)
+        siguiente = self.client.get(reverse('ver_pedidos') + '?formato=json').json()['siguiente']
+        self.assertIsNotNone(siguiente)
+        self.assertSinEscaneosCompletos(self.cliente, [
+            reverse('cliente_dashboard'),
+            reverse('ver_pedidos'),
+            reverse('ver_pedidos') + f'?cursor={siguiente}',
+            reverse('ver_reservas'),
+            reverse('hacer_pedido'),
+            reverse('menu'),
+        ])
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Cada vista cuesta un número constante de consultas, sin importar cuántas filas muestre"""
+
+    @classmethod
+    def setUpTestData(cls):
+        clientes = sembrar_historial(300)
+        cls.cliente = clientes[0]
+        cls.admin = Usuario.objects.create(username='admin', rol='admin')
+
+    def assertDentroDelPresupuesto(self, usuario, nombres):
+        self.client.force_login(usuario)
+        for nombre in nombres:
+            url = reverse(nombre)
+            maximo = resolve(url).func.presupuesto_consultas
+            with self.subTest(vista=nombre):
+                with presupuesto(maximo, repeticiones=3):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_vistas_admin_y_personal(self):
+        self.assertDentroDelPresupuesto(self.admin, [
+            'admin_dashboard', 'personal_dashboard', 'gestionar_menu', 'gestionar_reservas',
+            'ver_comentarios', 'generar_reporte', 'gestionar_personal', 'rutas_reparto',
+        ])
+
+    def test_vistas_cliente(self):
+        self.assertDentroDelPresupuesto(self.cliente, [
+            'cliente_dashboard', 'ver_pedidos', 'ver_reservas', 'menu', 'hacer_pedido',
+            'api_menu', 'api_pedidos', 'api_reservas',
+        ])
+
+    @modify_settings(MIDDLEWARE={'prepend': 'core.middleware.PresupuestoConsultasMiddleware'})
+    @override_settings(PRESUPUESTO_CONSULTAS_DEFECTO=1, PRESUPUESTO_CONSULTAS_ESTRICTO=True)
+    def test_middleware_estricto(self):
+        self.client.force_login(self.cliente)
+        # Sin la sesión ni el usuario en caché, leerlos de la base excede el presupuesto
+        cache.clear()
+        with self.assertRaises(PresupuestoExcedido):
+            self.client.get(reverse('dashboard'))
+
+    @modify_settings(MIDDLEWARE={'prepend': 'core.middleware.PresupuestoConsultasMiddleware'})
+    @override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True)
+    async def test_middleware_bajo_asgi(self):
+        await self.async_client.aforce_login(self.cliente)
+        with override_settings(PRESUPUESTO_CONSULTAS_DEFECTO=1):
+            # dashboard es síncrona: corre en el hilo de sync_to_async
+            await cache.aclear()
+            with self.assertRaises(PresupuestoExcedido):
+                await self.async_client.get(reverse('dashboard'))
+        # ver_pedidos es async y declara 3 consultas
+        with mock.patch.object(resolve(reverse('ver_pedidos')).func, 'presupuesto_consultas', 0):
+            with self.assertRaises(PresupuestoExcedido):
+                await self.async_client.get(reverse('ver_pedidos'))
+        response = await self.async_client.get(reverse('ver_pedidos'))
+        self.assertEqual(response.status_code, 200)
+
+
+class BenchmarkUrlsTests(TestCase):
+    """Siembra una base chica y corre el benchmark completo sobre ella"""
+
+    def test_percentil(self):
+        self.assertEqual(percentil([1, 2, 3, 4, 5], 50), 3)
+        self.assertEqual(percentil([10, 20], 95), 19.5)
+        self.assertIsNone(percentil([], 99))
+
+    def test_sembrar_y_medir(self):
+        call_command('sembrar_datos', escala=0.002, lote=50, stdout=StringIO())
+        self.assertEqual(Pedido.objects.count(), 200)
+        self.assertEqual(
+            ResumenDiario.objects.aggregate(total=Sum('total_pedidos'))['total'], 200
+        )
+
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = Path(directorio) / 'resultados.json'
+            call_command('benchmark_urls', repeticiones=2, calentamiento=0, escrituras=True,
+                         salida=salida, stdout=StringIO())
+            corrida = json.loads(salida.read_text(encoding='utf-8'))
+
+        for resultado in corrida['resultados']:
+            self.assertTrue(set(resultado['estados']) <= {200, 302}, resultado)
+            self.assertLessEqual(resultado['p50_ms'], resultado['p99_ms'])
+            self.assertIsNotNone(resultado['consultas'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class RouterReplicasTests(SimpleTestCase):
+    """Las lecturas van a la réplica salvo cuando hay que leer lo recién escrito"""
+
+    def setUp(self):
+        self.router = RouterReplicas()
+
+    def test_lecturas_y_escrituras(self):
+        self.assertEqual(self.router.db_for_read(Pedido), 'replica1')
+        self.assertEqual(self.router.db_for_write(Pedido), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+
+    def test_fijado_a_primaria(self):
+        with usar_primaria():
+            self.assertEqual(self.router.db_for_read(Pedido), 'default')
+        for modelo in (Session, Usuario, Permission):
+            with self.subTest(modelo=modelo.__name__):
+                self.assertEqual(self.router.db_for_read(modelo), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_sin_replicas(self):
+        self.assertEqual(self.router.db_for_read(Pedido), 'default')
+
+    def test_dentro_de_transaccion(self):
+        with mock.patch.object(connection, 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Pedido), 'default')
+
+
+class LecturaPrimariaTests(TestCase):
+    def test_cookie_tras_escritura(self):
+        cliente = Usuario.objects.create(username='cliente', rol='cliente')
+        self.client.force_login(cliente)
+        response = self.client.get(reverse('reservar_mesa'))
+        self.assertNotIn('leer_primaria', response.cookies)
+        response = self.client.post(reverse('reservar_mesa'), {
+            'fecha_reserva': '2030-01-01T20:00', 'numero_personas': 2, 'notas': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies['leer_primaria']['max-age'], 5)
+
+
+class ExportacionTests(TestCase):
+    """Las exportaciones se envían en streaming, también comprimidas y bajo ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create(username='admin', rol='admin')
+        cliente = Usuario.objects.create(username='cliente', rol='cliente')
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+        categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        producto = Menu.objects.create(categoria=categoria, nombre='Bandeja', precio=20, restaurante=restaurante)
+        pedido = Pedido.objects.create(cliente=cliente, total=60)
+        ItemPedido.objects.bulk_create([
+            ItemPedido(pedido=pedido, producto=producto, cantidad=1, subtotal=20),
+            ItemPedido(pedido=pedido, producto=producto, cantidad=2, subtotal=40),
+        ])
+        Pedido.objects.create(cliente=cliente)
+        Reserva.objects.create(cliente=cliente, fecha_reserva=timezone.now(), numero_personas=4)
+        hoy = timezone.localdate()
+        cls.parametros = {'desde': hoy.isoformat(), 'hasta': hoy.isoformat()}
+
+    def test_csv_pedidos(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('exportar_datos'), {'conjunto': 'pedidos', **self.parametros})
+        self.assertTrue(response.streaming)
+        filas = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        # Dos líneas del primer pedido y una fila vacía para el pedido sin productos
+        self.assertEqual([fila['cantidad'] for fila in filas], ['1', '2', ''])
+        self.assertEqual(filas[0]['producto'], 'Bandeja')
+
+    def test_jsonl_gzip_reservas(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('exportar_datos'), {
+            'conjunto': 'reservas', 'formato': 'jsonl', 'gzip': '1', **self.parametros,
+        })
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lineas = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(json.loads(lineas[0])['numero_personas'], 4)
+
+    def test_rango_invalido(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('exportar_datos'), {'conjunto': 'pedidos', 'desde': '2024-02-01', 'hasta': '2024-01-01'})
+        self.assertRedirects(response, reverse('generar_reporte'))
+
+    async def test_asgi_iterador_async(self):
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.admin)
+        response = await cliente.get(reverse('exportar_datos'), {'conjunto': 'reservas', **self.parametros})
+        self.assertTrue(response.is_async)
+        contenido = b''.join([trozo async for trozo in response.streaming_content])
+        self.assertIn(b'numero_personas', contenido)
+
+
+class GraficosTests(TestCase):
+    """La vista sirve lo que haya en disco y deja el dibujo para segundo plano"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create(username='admin', rol='admin')
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(GRAFICOS_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(self.admin)
+
+    def test_sin_imagen_programa_y_devuelve_placeholder(self):
+        with mock.patch.object(graficos, 'programar') as programar:
+            response = self.client.get(reverse('grafico_reporte', args=['ventas']))
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        programar.assert_called_once()
+
+    def test_sirve_la_ultima_imagen_aunque_este_vieja(self):
+        graficos.generar_grafico('horas', 30, 'png')
+        with mock.patch.object(graficos, 'programar') as programar:
+            response = self.client.get(reverse('grafico_reporte', args=['horas']))
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+            programar.assert_not_called()
+
+            # Un pedido nuevo cambia la versión: se sirve la imagen anterior y,
+            # con el intervalo mínimo vencido, se programa la nueva
+            cliente = Usuario.objects.create(username='cliente', rol='cliente')
+            Pedido.objects.create(cliente=cliente, total=10)
+            with override_settings(GRAFICOS_INTERVALO_MINIMO=0):
+                response = self.client.get(reverse('grafico_reporte', args=['horas']))
+            self.assertEqual(response['Content-Type'], 'image/png')
+            programar.assert_called_once()
+
+    def test_productos_populares_siguen_la_ventana(self):
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+        categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        producto = Menu.objects.create(categoria=categoria, nombre='Bandeja', precio=20, restaurante=restaurante)
+        cliente = Usuario.objects.create(username='cliente', rol='cliente')
+        for dias, cantidad in ((3, 1), (20, 2), (60, 4)):
+            pedido = Pedido.objects.create(cliente=cliente)
+            Pedido.objects.filter(pk=pedido.pk).update(fecha_pedido=timezone.now() - timedelta(days=dias))
+            ItemPedido.objects.create(pedido=pedido, producto=producto, cantidad=cantidad, subtotal=20 * cantidad)
+
+        for parametro, vendidos in (('', 3), ('?dias=7', 1), ('?dias=90', 7), ('?dias=365', 3)):
+            with self.subTest(parametro=parametro):
+                response = self.client.get(reverse('generar_reporte') + parametro)
+                self.assertEqual([p['total_vendido'] for p in response.context['productos_populares']], [vendidos])
+
+
+class PronosticoTests(TestCase):
+    """El pronóstico sigue el patrón semanal y la vista lo muestra desde la caché"""
+
+    def test_media_movil(self):
+        import numpy as np
+        medias = media_movil(np.array([[1.0, 2, 3, 4]]), 2)
+        self.assertTrue(np.isnan(medias[0, 0]))
+        self.assertEqual(medias[0, 1:].tolist(), [1.5, 2.5, 3.5])
+
+    def test_estacionalidad(self):
+        import numpy as np
+        # Ocho semanas que empiezan un lunes: el sábado vende el triple
+        desde = date(2024, 1, 1)
+        semana = np.array([2, 2, 2, 2, 2, 6, 2], dtype=float)
+        matriz = np.vstack([np.tile(semana, 8), np.zeros(56)])
+        sabado = calcular_pronostico(matriz, desde, date(2024, 3, 2))
+        lunes = calcular_pronostico(matriz, desde, date(2024, 3, 4))
+        self.assertGreater(sabado['pronostico'][0], 2 * lunes['pronostico'][0])
+        self.assertEqual(sabado['preparar'][1], 0)
+
+    def test_vista(self):
+        cache.clear()
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+        categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        producto = Menu.objects.create(categoria=categoria, nombre='Bandeja', precio=20, restaurante=restaurante)
+        cliente = Usuario.objects.create(username='cliente', rol='cliente')
+        for dias in range(1, 15):
+            pedido = Pedido.objects.create(cliente=cliente)
+            Pedido.objects.filter(pk=pedido.pk).update(fecha_pedido=timezone.now() - timedelta(days=dias))
+            ItemPedido.objects.create(pedido=pedido, producto=producto, cantidad=3, subtotal=60)
+
+        self.client.force_login(Usuario.objects.create(username='cocina', rol='personal'))
+        response = self.client.get(reverse('pronostico_preparacion'))
+        self.assertEqual([p['nombre'] for p in response.context['productos']], ['Bandeja'])
+        # 14 de los últimos 28 días con 3 unidades: nivel de 1.5, se preparan 2
+        self.assertEqual(response.context['productos'][0]['preparar'], 2)
+        with self.assertNumQueries(0):
+            pronostico_preparacion()
+
+
+class ImagenesMenuTests(TestCase):
+    """Las variantes se generan fuera de la petición y el menú las ofrece con srcset"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=directorio.name, IMAGENES_ANCHOS=(200, 400, 800))
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.media = Path(directorio.name)
+
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+        categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        self.producto = Menu.objects.create(
+            categoria=categoria, nombre='Bandeja', precio=20, restaurante=restaurante,
+            imagen=self.subir('bandeja.jpg', (1000, 600)),
+        )
+
+    def subir(self, nombre, tamano, color='orange'):
+        from PIL import Image
+        contenido = BytesIO()
+        Image.new('RGB', tamano, color).save(contenido, 'JPEG')
+        return SimpleUploadedFile(nombre, contenido.getvalue(), content_type='image/jpeg')
+
+    def color(self, nombre):
+        from PIL import Image
+        with Image.open(self.media / nombre) as imagen:
+            return imagen.convert('RGB').getpixel((0, 0))
+
+    def renderizar(self, producto):
+        return Template('{% load imagenes_menu %}{% imagen_producto producto clase="card-img-top" %}').render(
+            Context({'producto': producto})
+        )
+
+    def test_genera_variantes_sin_agrandar(self):
+        self.assertIn('bandeja.jpg', self.renderizar(self.producto))
+        self.assertTrue(imagenes.procesar_producto(self.producto.pk))
+        self.assertFalse(imagenes.procesar_producto(self.producto.pk))
+
+        self.producto.refresh_from_db()
+        variantes = self.producto.imagen_variantes
+        self.assertEqual([ancho for ancho, _ in variantes['webp']], [200, 400, 800])
+        from PIL import Image
+        with Image.open(self.media / variantes['webp'][0][1]) as miniatura:
+            self.assertEqual((miniatura.format, miniatura.size), ('WEBP', (200, 120)))
+
+        html = self.renderizar(self.producto)
+        self.assertIn(f'<source type="image/webp" srcset="/media/{variantes["webp"][0][1]} 200w, ', html)
+        self.assertRegex(variantes['webp'][0][1], rf'^menu/variantes/{self.producto.pk}-[0-9a-f]{{12}}-200\.webp$')
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('width="800" height="480"', html)
+
+    def test_imagen_nueva_reemplaza_variantes(self):
+        imagenes.procesar_producto(self.producto.pk)
+        self.producto.refresh_from_db()
+        anteriores = self.producto.imagen_variantes
+
+        self.producto.imagen = self.subir('arepa.png', (300, 300))
+        with mock.patch.object(imagenes, 'programar'), self.captureOnCommitCallbacks(execute=True):
+            self.producto.save()
+        # Mientras no se regeneran se sirve el original, no las variantes viejas
+        self.assertNotIn('srcset', self.renderizar(self.producto))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('generar_variantes_menu', hilos=1, stdout=StringIO())
+        self.producto.refresh_from_db()
+        self.assertEqual([ancho for ancho, _ in self.producto.imagen_variantes['jpg']], [200])
+        self.assertFalse((self.media / anteriores['jpg'][0][1]).exists())
+
+    def test_variantes_por_la_cola_de_tareas(self):
+        [pendiente] = Tarea.objects.filter(tipo='procesar_imagen')
+        self.assertEqual(pendiente.datos, {'producto_id': self.producto.pk})
+        self.assertRegex(pendiente.clave, rf'^imagen:{self.producto.pk}:[0-9a-f]{{12}}$')
+        # Guardar otra vez antes de que corra no encola otra tarea
+        self.producto.precio = 25
+        self.producto.save()
+        self.assertEqual(Tarea.objects.filter(tipo='procesar_imagen').count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tareas.procesar(), 1)
+        pendiente.refresh_from_db()
+        self.assertEqual((pendiente.estado, pendiente.resultado), ('completada', {'generadas': True}))
+        self.assertIn('srcset', self.renderizar(Menu.objects.get(pk=self.producto.pk)))
+
+        # Una imagen nueva es otra tarea
+        self.producto.imagen = self.subir('arepa.jpg', (300, 300))
+        self.producto.save()
+        self.assertEqual(Tarea.objects.filter(tipo='procesar_imagen', estado='pendiente').count(), 1)
+
+    def test_mismo_nombre_base_no_comparte_variantes(self):
+        otro = Menu.objects.create(
+            categoria=self.producto.categoria, restaurante=self.producto.restaurante, nombre='Arepa', precio=5,
+        )
+        self.producto.imagen = self.subir('arepa.jpg', (300, 300), 'red')
+        otro.imagen = self.subir('arepa.png', (300, 300), 'blue')
+        with mock.patch.object(imagenes, 'programar'):
+            self.producto.save()
+            otro.save()
+        imagenes.procesar_producto(self.producto.pk)
+        imagenes.procesar_producto(otro.pk)
+        self.producto.refresh_from_db()
+        otro.refresh_from_db()
+        rojo, azul = self.producto.imagen_variantes['jpg'][0][1], otro.imagen_variantes['jpg'][0][1]
+        self.assertNotEqual(rojo, azul)
+        self.assertGreater(self.color(rojo)[0], 200)
+        self.assertGreater(self.color(azul)[2], 200)
+
+    def test_reemplazo_con_el_mismo_contenido_conserva_las_variantes(self):
+        imagenes.procesar_producto(self.producto.pk)
+        # Se vuelve a subir la misma foto con otro nombre: las variantes coinciden
+        self.producto.imagen = self.subir('bandeja-nueva.jpg', (1000, 600))
+        with mock.patch.object(imagenes, 'programar'):
+            self.producto.save()
+        self.assertTrue(imagenes.procesar_producto(self.producto.pk))
+        self.producto.refresh_from_db()
+        for nombre in imagenes.nombres_variantes(self.producto.imagen_variantes):
+            self.assertTrue((self.media / nombre).exists(), nombre)
+
+
+class EstaticosTests(TestCase):
+    """collectstatic deja archivos con hash y comprimidos que el middleware sirve con caché larga"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(STATIC_ROOT=directorio.name, ESTATICOS_SERVIR=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.middleware = EstaticosMiddleware(lambda request: HttpResponse('vista'))
+        self.factory = RequestFactory()
+
+    def pedir(self, ruta, **cabeceras):
+        return self.middleware(self.factory.get(ruta, headers=cabeceras))
+
+    def test_plantilla_usa_nombre_con_hash(self):
+        response = self.client.get(reverse('menu'))
+        url = re.search(r'href="(/static/core/css/style\.[0-9a-f]{12}\.css)"', response.content.decode()).group(1)
+
+        comprimido = self.pedir(url, accept_encoding='gzip, deflate')
+        self.assertEqual(comprimido['Cache-Control'], estaticos.CACHE_INMUTABLE)
+        self.assertEqual(comprimido['Content-Encoding'], 'gzip')
+        self.assertEqual(comprimido['Vary'], 'Accept-Encoding')
+        original = (Path(settings.STATIC_ROOT) / url[len('/static/'):]).read_bytes()
+        self.assertEqual(gzip.decompress(b''.join(comprimido.streaming_content)), original)
+
+        plano = self.pedir(url, accept_encoding='gzip;q=0')
+        self.assertNotIn('Content-Encoding', plano)
+        self.assertEqual(int(plano['Content-Length']), len(original))
+        plano.close()
+
+    def test_sin_hash_revalida_y_lo_demas_sigue(self):
+        response = self.pedir('/static/core/js/main.js')
+        self.assertEqual(response['Cache-Control'], estaticos.CACHE_SIN_HASH)
+        response.close()
+        self.assertEqual(self.pedir('/static/core/js/main.js', if_modified_since=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.pedir('/static/../settings.py').content, b'vista')
+        self.assertEqual(self.pedir('/menu/').content, b'vista')
+
+    async def test_asgi_lee_por_bloques(self):
+        async def vista(request):
+            return HttpResponse('vista')
+        middleware = EstaticosMiddleware(vista)
+        ruta = Path(settings.STATIC_ROOT) / 'core/js/main.js'
+        with mock.patch.object(estaticos, 'TAMANO_BLOQUE', 100):
+            response = await middleware(self.factory.get('/static/core/js/main.js'))
+            self.assertTrue(response.is_async)
+            bloques = [bloque async for bloque in response.streaming_content]
+        self.assertEqual(b''.join(bloques), ruta.read_bytes())
+        self.assertGreater(len(bloques), 1)
+        self.assertEqual(int(response['Content-Length']), ruta.stat().st_size)
+        self.assertEqual((await middleware(self.factory.get('/menu/'))).content, b'vista')
+
+
+class FragmentosTests(TestCase):
+    """Los fragmentos cacheados se sirven sin consultar la base y caen al cambiar sus modelos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+        categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        cls.producto = Menu.objects.create(categoria=categoria, nombre='Bandeja', precio=20, restaurante=restaurante)
+        cliente = Usuario.objects.create(username='cliente', rol='cliente')
+        cls.pedidos = [Pedido.objects.create(cliente=cliente) for _ in range(3)]
+        for pedido in cls.pedidos:
+            ItemPedido.objects.create(pedido=pedido, producto=cls.producto, cantidad=2)
+        cls.personal = Usuario.objects.create(username='cocina', rol='personal')
+
+    def setUp(self):
+        cache.clear()
+
+    def contadores(self, nombre):
+        datos = fragmentos.estadisticas_fragmentos()[nombre]
+        return datos['aciertos'], datos['fallos']
+
+    def test_ttl_corto_con_cache_local(self):
+        self.assertEqual(fragmentos.ttl_fragmentos(), fragmentos.FRAGMENTOS_TTL_LOCAL)
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(fragmentos.ttl_fragmentos(), fragmentos.FRAGMENTOS_TTL)
+
+    def test_menu_cacheado_no_consulta(self):
+        self.assertContains(self.client.get(reverse('menu')), 'Bandeja')
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(reverse('menu')), 'Bandeja')
+        self.assertEqual(self.contadores('menu'), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.nombre = 'Bandeja paisa'
+            self.producto.save()
+        self.assertContains(self.client.get(reverse('menu')), 'Bandeja paisa')
+        self.assertEqual(self.contadores('menu'), (1, 2))
+
+    def test_detalles_de_pedidos_por_objeto(self):
+        self.client.force_login(self.personal)
+        self.client.get(reverse('personal_dashboard'))
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('personal_dashboard'))
+        self.assertFalse([c for c in consultas.captured_queries if 'core_itempedido' in c['sql']])
+        self.assertEqual(self.contadores('detalle_pedido'), (3, 3))
+
+        # Solo el pedido que cambió se vuelve a renderizar
+        pedido = self.pedidos[0]
+        pedido.estado = 'confirmado'
+        pedido.save()
+        response = self.client.get(reverse('personal_dashboard'))
+        self.assertContains(response, 'Confirmado')
+        self.assertEqual(self.contadores('detalle_pedido'), (5, 4))
+
+        admin = Usuario.objects.create(username='admin', rol='admin')
+        self.client.force_login(admin)
+        datos = self.client.get(reverse('fragmentos_cache')).json()['fragmentos']
+        self.assertEqual(datos['detalle_pedido']['fallos'], 4)
+
+    def test_detalle_sigue_los_datos_del_cliente(self):
+        self.client.force_login(self.personal)
+        self.client.get(reverse('personal_dashboard'))
+        cliente = self.pedidos[0].cliente
+        cliente.telefono = '300 555 0101'
+        cliente.save()
+        # El cliente tiene los tres pedidos: se vuelven a renderizar sus detalles
+        self.assertContains(self.client.get(reverse('personal_dashboard')), '300 555 0101', count=3)
+        self.assertEqual(self.contadores('detalle_pedido'), (0, 6))
+
+
+class SesionesCacheadasTests(TestCase):
+    """La sesión y el usuario salen de la caché; la base queda como respaldo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create(username='cocina', rol='personal')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def test_peticion_autenticada_sin_consultas(self):
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('personal_dashboard'), fetch_redirect_response=False)
+
+    def test_cambio_de_rol_se_escribe_en_la_cache(self):
+        self.client.get(reverse('dashboard'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.rol = 'admin'
+            self.usuario.save()
+        self.assertEqual(cache.get(clave_usuario(self.usuario.pk)).rol, 'admin')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('admin_dashboard'), fetch_redirect_response=False)
+
+    def test_sin_cache_se_lee_de_la_base(self):
+        cache.clear()
+        response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('personal_dashboard'), fetch_redirect_response=False)
+        self.assertIsNotNone(cache.get(clave_usuario(self.usuario.pk)))
+
+    async def test_resolucion_async(self):
+        backend = BackendUsuarioCacheado()
+        self.assertEqual((await backend.aget_user(self.usuario.pk)).rol, 'personal')
+        self.assertIsNotNone(await cache.aget(clave_usuario(self.usuario.pk)))
+        await Usuario.objects.filter(pk=self.usuario.pk).aupdate(is_active=False)
+        await cache.adelete(clave_usuario(self.usuario.pk))
+        self.assertIsNone(await backend.aget_user(self.usuario.pk))
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_usuario_se_cachea_desde_la_primaria(self):
+        # 'replica1' no existe en DATABASES: leer de ella lanzaría un error. El
+        # test corre dentro de una transacción, que ya fija todo a la primaria;
+        # se simula la lectura fuera de ella, como en una petición o al confirmar
+        cache.clear()
+        with mock.patch('core.replicas.fijado_a_primaria', return_value=False):
+            self.assertEqual(BackendUsuarioCacheado().get_user(self.usuario.pk).rol, 'personal')
+            with self.captureOnCommitCallbacks(execute=True):
+                Usuario.objects.filter(pk=self.usuario.pk).update(rol='admin')
+                self.usuario.save(update_fields=['email'])
+        self.assertEqual(cache.get(clave_usuario(self.usuario.pk)).rol, 'admin')
+
+    def test_ttl_corto_con_cache_local(self):
+        # Otro proceso no ve la reescritura de las señales: la copia dura poco
+        self.assertEqual(autenticacion._ttl(), settings.USUARIO_CACHE_TTL_LOCAL)
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(autenticacion._ttl(), settings.USUARIO_CACHE_TTL)
+
+
+class BusquedaTests(TestCase):
+    """El índice FTS5 sigue a las tablas por triggers y busca por prefijo y sin tildes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+        cls.categoria = Categoria.objects.create(nombre='Desayunos', tipo='comida')
+        def crear(nombre, descripcion, **extra):
+            return Menu.objects.create(categoria=cls.categoria, nombre=nombre, descripcion=descripcion,
+                                       precio=10, restaurante=restaurante, **extra)
+        cls.arepa = crear('Arepa con jamón', 'Arepa de maíz')
+        cls.calentado = crear('Calentado', 'Frijoles, arroz y arepa')
+        crear('Arepa agotada', 'No disponible', disponible=False)
+        cliente = Usuario.objects.create(username='cliente', rol='cliente')
+        cls.comentario = Comentario.objects.create(cliente=cliente, texto='El café estaba buenísimo', calificacion=5)
+
+    def nombres(self, texto):
+        return [producto.nombre for producto in buscar_menu(texto)]
+
+    def test_consulta_escapa_operadores(self):
+        self.assertEqual(consulta_fts('arroz OR "x" NEAR(y'), '"arroz"* "OR"* "x"* "NEAR"* "y"*')
+        self.assertIsNone(consulta_fts('  ¿? '))
+
+    def test_prefijo_tildes_y_ranking(self):
+        self.assertEqual(self.nombres('JAMON'), ['Arepa con jamón'])
+        # El nombre pesa más que la descripción; los no disponibles no salen
+        self.assertEqual(self.nombres('arep'), ['Arepa con jamón', 'Calentado'])
+        self.assertCountEqual(self.nombres('desayu'), ['Arepa con jamón', 'Calentado'])
+        self.assertEqual(ids_comentarios('cafe buenisimo'), [self.comentario.pk])
+
+    def test_triggers_siguen_los_cambios(self):
+        Menu.objects.filter(pk=self.calentado.pk).update(nombre='Calentado paisa')
+        Categoria.objects.filter(pk=self.categoria.pk).update(nombre='Almuerzos')
+        self.arepa.delete()
+        self.assertEqual(self.nombres('paisa'), ['Calentado paisa'])
+        self.assertEqual(self.nombres('almuerzo'), ['Calentado paisa'])
+        self.assertEqual(self.nombres('jamon'), [])
+
+    def test_endpoint_y_admin(self):
+        with self.assertNumQueries(2):
+            datos = self.client.get(reverse('buscar_menu'), {'q': 'jamon'}).json()
+        self.assertEqual([r['nombre'] for r in datos['resultados']], ['Arepa con jamón'])
+        self.assertEqual(self.client.get(reverse('buscar_menu'), {'q': 'a'}).json(), {'resultados': []})
+
+        admin = Usuario.objects.create(username='root', rol='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:core_menu_changelist'), {'q': 'agotad'})
+        self.assertEqual([p.nombre for p in response.context['cl'].result_list], ['Arepa agotada'])
+        response = self.client.get(reverse('admin:core_comentario_changelist'), {'q': 'buenisimo'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.comentario])
+
+
+class CambiosDeEstadoTests(TestCase):
+    """El lote de cambios se aplica con un UPDATE condicional y reporta los conflictos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+        categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        producto = Menu.objects.create(categoria=categoria, nombre='Bandeja', precio=20, restaurante=restaurante)
+        cliente = Usuario.objects.create(username='cliente', rol='cliente')
+        cls.pedidos = [Pedido.objects.create(cliente=cliente) for _ in range(3)]
+        for pedido in cls.pedidos:
+            ItemPedido.objects.create(pedido=pedido, producto=producto, cantidad=1)
+        cls.personal = Usuario.objects.create(username='cocina', rol='personal')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lote_con_conflicto_e_invalidos(self):
+        uno, dos, tres = self.pedidos
+        Pedido.objects.filter(pk=dos.pk).update(estado='confirmado')
+        with self.captureOnCommitCallbacks(execute=True):
+            resultados = cambiar_estados([
+                (uno.pk, 'pendiente', 'confirmado'),
+                (dos.pk, 'pendiente', 'confirmado'),
+                (tres.pk, 'pendiente', 'listo'),
+                (uno.pk, 'pendiente', 'cancelado'),
+                (999, 'pendiente', 'confirmado'),
+            ])
+        self.assertEqual(
+            [(r['ok'], r['estado'], r['error']) for r in resultados],
+            [
+                (True, 'confirmado', None),
+                (False, 'confirmado', 'conflicto'),
+                (False, None, 'transicion_invalida'),
+                (False, None, 'duplicado'),
+                (False, None, 'no_existe'),
+            ],
+        )
+        self.assertEqual(Pedido.objects.get(pk=tres.pk).estado, 'pendiente')
+        # Solo el pedido que cambió publica su evento
+        _, eventos = eventos_desde(0)
+        self.assertEqual([(e['pedido'], e['estado']) for e in eventos], [(uno.pk, 'confirmado')])
+
+    def test_invalida_al_confirmar(self):
+        pedido = self.pedidos[0]
+        contadores = (fragmentos.nombre_version(pedido), graficos.VERSION_GRAFICOS)
+        versiones = [obtener_version(nombre) for nombre in contadores]
+        with self.captureOnCommitCallbacks(execute=True):
+            cambiar_estados([(pedido.pk, 'pendiente', 'confirmado')])
+            # Antes del commit otra petición vería el estado viejo: no debe cachearlo con versiones nuevas
+            self.assertEqual([obtener_version(nombre) for nombre in contadores], versiones)
+        for nombre, version in zip(contadores, versiones):
+            self.assertNotEqual(obtener_version(nombre), version)
+
+    def test_resumen_diario_sigue_las_entregas(self):
+        pedido = self.pedidos[0]
+        Pedido.objects.filter(pk=pedido.pk).update(estado='listo')
+        [resultado] = cambiar_estados([(pedido.pk, 'listo', 'entregado')])
+        self.assertTrue(resultado['ok'])
+        self.assertGreater(resultado['fecha_actualizacion'], pedido.fecha_actualizacion)
+        resumen = ResumenDiario.objects.get()
+        self.assertEqual((resumen.total_pedidos, resumen.pedidos_entregados, resumen.total_ventas), (3, 1, 20))
+
+    def test_endpoint_json(self):
+        self.client.force_login(self.personal)
+        url = reverse('cambiar_estados_pedidos')
+        cambios = [{'id': pedido.pk, 'desde': 'pendiente', 'hacia': 'confirmado'} for pedido in self.pedidos]
+        datos = self.client.post(url, json.dumps({'cambios': cambios}), content_type='application/json').json()
+        self.assertEqual(datos['actualizados'], 3)
+        # Repetir el mismo lote choca con el estado nuevo
+        datos = self.client.post(url, json.dumps({'cambios': cambios}), content_type='application/json').json()
+        self.assertEqual({r['error'] for r in datos['resultados']}, {'conflicto'})
+
+        self.assertEqual(self.client.post(url, 'no es json', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_formulario_del_panel(self):
+        self.client.force_login(self.personal)
+        pedido = self.pedidos[0]
+        datos = {'pedido_id': pedido.pk, 'estado_actual': 'pendiente', 'estado': 'confirmado'}
+        self.client.post(reverse('personal_dashboard'), datos)
+        self.assertEqual(Pedido.objects.get(pk=pedido.pk).estado, 'confirmado')
+        response = self.client.post(reverse('personal_dashboard'), datos, follow=True)
+        self.assertContains(response, 'ya había cambiado de estado')
+        # El selector solo ofrece los estados a los que se puede pasar
+        self.assertNotContains(response, '<option value="pendiente">')
+
+
+class ApiLecturaTests(TestCase):
+    """La API responde 304 sin correr la consulta principal si nada cambió"""
+
+    @classmethod
+    def setUpTestData(cls):
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123', area_entrega='Centro')
+        cls.categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        cls.producto = Menu.objects.create(categoria=cls.categoria, nombre='Bandeja', precio=20, restaurante=restaurante)
+        cls.cliente = Usuario.objects.create(username='cliente', rol='cliente')
+        otro = Usuario.objects.create(username='otro', rol='cliente')
+        cls.pedido = Pedido.objects.create(cliente=cls.cliente)
+        ItemPedido.objects.create(pedido=cls.pedido, producto=cls.producto, cantidad=2)
+        cls.ajeno = Pedido.objects.create(cliente=otro)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_menu_condicional(self):
+        response = self.client.get(reverse('api_menu'))
+        datos = response.json()
+        self.assertEqual(datos['productos'][0]['nombre'], 'Bandeja')
+        self.assertEqual(datos['productos'][0]['precio'], '20.00')
+        self.assertEqual(datos['categorias'][0]['nombre'], 'Platos')
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api_menu'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        anterior = response['ETag']
+
+        # Cambiar una categoría o borrar un producto produce otra versión
+        self.categoria.nombre = 'Almuerzos'
+        self.categoria.save()
+        response = self.client.get(reverse('api_menu'), HTTP_IF_NONE_MATCH=anterior)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Menu.objects.filter(pk=self.producto.pk).delete()
+        self.assertEqual(self.client.get(reverse('api_menu'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pedidos_del_cliente(self):
+        self.client.force_login(self.cliente)
+        response = self.client.get(reverse('api_pedidos'))
+        self.assertEqual([p['id'] for p in response.json()['items']], [self.pedido.pk])
+        response = self.client.get(reverse('api_pedidos'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        url = reverse('api_pedido', args=[self.pedido.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['items'], [{'producto_id': self.producto.pk, 'cantidad': 2, 'subtotal': '40.00', 'producto': 'Bandeja'}])
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Pedido.objects.filter(pk=self.pedido.pk).update(estado='confirmado', fecha_actualizacion=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).json()['estado'], 'confirmado')
+
+        self.assertEqual(self.client.get(reverse('api_pedido', args=[self.ajeno.pk])).status_code, 404)
+
+    def test_pedido_cambia_al_renombrar_un_producto(self):
+        self.client.force_login(self.cliente)
+        url = reverse('api_pedido', args=[self.pedido.pk])
+        response = self.client.get(url)
+        etag, ultima = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # El pedido no cambia, pero sus items muestran el nombre nuevo
+        Menu.objects.filter(pk=self.producto.pk).update(nombre='Bandeja paisa', fecha_actualizacion=timezone.now() + timedelta(seconds=2))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['items'][0]['producto'], 'Bandeja paisa')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima).status_code, 200)
+
+    def test_validadores_cuentan_filas(self):
+        vacio = api.validadores(Reserva.objects.all())
+        self.assertIsNone(vacio.ultima_modificacion)
+        Reserva.objects.create(cliente=self.cliente, fecha_reserva=timezone.now(), numero_personas=2)
+        self.assertNotEqual(api.validadores(Reserva.objects.all()).etag, vacio.etag)
+
+
+class TareasTests(TestCase):
+    """La cola reclama por prioridad, reintenta con espera y recupera tareas vencidas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create(username='admin', rol='admin')
+
+    def test_reporte_desde_la_vista_y_el_trabajador(self):
+        self.client.force_login(self.admin)
+        datos = {'tipo': 'semanal', 'clave': 'abc123'}
+        with override_settings(TAREAS_SINCRONAS=False):
+            self.client.post(reverse('generar_reporte'), datos)
+            # Reenviar el mismo formulario no encola otro reporte
+            self.client.post(reverse('generar_reporte'), datos)
+        tarea = Tarea.objects.get()
+        self.assertEqual((tarea.tipo, tarea.prioridad, tarea.clave), ('guardar_reporte', 10, 'reporte:abc123'))
+        self.assertFalse(Reporte.objects.exists())
+
+        salida = StringIO()
+        call_command('procesar_tareas', hilos=1, una_vez=True, stdout=salida)
+        self.assertIn('1 completada', salida.getvalue())
+        tarea.refresh_from_db()
+        reporte = Reporte.objects.get()
+        self.assertEqual(tarea.resultado, {'reporte': reporte.pk})
+        self.assertEqual(reporte.fecha_fin - reporte.fecha_inicio, timedelta(days=6))
+
+    @override_settings(TAREAS_SINCRONAS=True)
+    def test_modo_sincrono(self):
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('generar_reporte'), {'tipo': 'diario'})
+        self.assertEqual(Tarea.objects.get().estado, 'completada')
+        self.assertEqual(Reporte.objects.get().tipo, 'diario')
+
+    @override_settings(TAREAS_SINCRONAS=False, TAREAS_ESPERA_REINTENTO=10)
+    def test_prioridad_reintentos_y_fallo(self):
+        fallar = mock.Mock(side_effect=RuntimeError('sin conexión'))
+        with mock.patch.dict(tareas.TIPOS, {'prueba': fallar}), self.assertLogs('core.tareas', 'ERROR'):
+            baja = tareas.encolar('prueba', {'n': 1})
+            alta = tareas.encolar('prueba', {'n': 2}, prioridad=5, max_intentos=2)
+            self.assertEqual([t.pk for t in tareas.reclamar(1)], [alta.pk])
+            self.assertEqual(tareas.ejecutar(Tarea.objects.get(pk=alta.pk)), 'pendiente')
+            alta.refresh_from_db()
+            self.assertIn('sin conexión', alta.error)
+            self.assertAlmostEqual((alta.disponible_desde - timezone.now()).total_seconds(), 10, delta=2)
+
+            # Cumplida la espera se reintenta y, sin intentos restantes, queda fallida
+            Tarea.objects.filter(pk=alta.pk).update(disponible_desde=timezone.now())
+            [reclamada] = tareas.reclamar(1)
+            self.assertEqual((reclamada.pk, reclamada.intentos), (alta.pk, 2))
+            self.assertEqual(tareas.ejecutar(reclamada), 'fallida')
+            fallar.assert_called_with(n=2)
+            self.assertEqual(tareas.procesar(), 1)
+            self.assertEqual(Tarea.objects.get(pk=baja.pk).estado, 'pendiente')
+
+    @override_settings(TAREAS_SINCRONAS=False)
+    def test_reserva_vencida_y_idempotencia(self):
+        with mock.patch.dict(tareas.TIPOS, {'prueba': lambda: 'ok'}):
+            tarea = tareas.encolar('prueba', clave='unica')
+            self.assertEqual(tareas.encolar('prueba', clave='unica').pk, tarea.pk)
+            [primera] = tareas.reclamar(5)
+            self.assertEqual(tareas.reclamar(5), [])
+
+            # El primer trabajador no terminó a tiempo: otro la retoma
+            Tarea.objects.filter(pk=tarea.pk).update(bloqueada_hasta=timezone.now() - timedelta(seconds=1))
+            [segunda] = tareas.reclamar(5)
+            self.assertNotEqual(segunda.reclamo, primera.reclamo)
+            self.assertEqual(tareas.ejecutar(segunda), 'completada')
+            # Lo que termine el primero se deshace y no pisa el resultado
+            with self.assertLogs('core.tareas', 'WARNING'):
+                self.assertIsNone(tareas.ejecutar(primera))
+            tarea.refresh_from_db()
+            self.assertEqual((tarea.estado, tarea.resultado, tarea.intentos), ('completada', 'ok', 2))
+
+
+class RutasTests(TestCase):
+    """Los pedidos listos se agrupan por cercanía entre zonas respetando capacidad y tiempo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.personal = Usuario.objects.create(username='cocina', rol='personal')
+        cls.cliente = Usuario.objects.create(username='cliente')
+        # centro -5- norte -5- alto, centro -25- sur, y aislada sin trayectos
+        cls.centro, cls.norte, cls.alto, cls.sur, cls.aislada = ZonaEntrega.objects.bulk_create([
+            ZonaEntrega(nombre=nombre) for nombre in ('Centro', 'Norte', 'Alto', 'Sur', 'Aislada')
+        ])
+        TrayectoZona.objects.bulk_create([
+            TrayectoZona(origen=cls.centro, destino=cls.norte, minutos=5),
+            TrayectoZona(origen=cls.norte, destino=cls.alto, minutos=5),
+            TrayectoZona(origen=cls.centro, destino=cls.sur, minutos=30),
+            # El mismo trayecto cargado en el otro sentido: vale el más corto
+            TrayectoZona(origen=cls.sur, destino=cls.centro, minutos=25),
+        ])
+        Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='1', zona=cls.centro)
+
+    def setUp(self):
+        cache.clear()
+
+    def pedido(self, zona, estado='listo'):
+        return Pedido.objects.create(cliente=self.cliente, estado=estado, total=10, zona=zona)
+
+    def test_caminos_minimos(self):
+        red = rutas.obtener_red()
+        self.assertEqual(red.distancias[self.centro.pk][self.alto.pk], 10)
+        self.assertEqual(red.distancias[self.sur.pk][self.alto.pk], 35)
+        self.assertEqual(rutas.camino(red, self.centro.pk, self.alto.pk), [self.norte.pk, self.alto.pk])
+        self.assertNotIn(self.aislada.pk, red.distancias[self.centro.pk])
+
+    def test_agrupa_por_cercania_capacidad_y_tiempo(self):
+        sur = self.pedido(self.sur)
+        norte = [self.pedido(self.norte) for _ in range(2)]
+        alto = self.pedido(self.alto)
+        sin_zona, aislado = self.pedido(None), self.pedido(self.aislada)
+        self.pedido(self.norte, estado='preparando')
+
+        plan = rutas.planificar_listos()
+        self.assertEqual(plan.origen, self.centro.pk)
+        self.assertEqual([p.id for p in plan.sin_ruta], [sin_zona.pk, aislado.pk])
+        # El más antiguo sale primero; norte queda a más de 45 minutos pasando por sur
+        primera, segunda = plan.rutas
+        paradas = lambda ruta: [(p.zona, p.llegada, [pedido.id for pedido in p.pedidos]) for p in ruta.paradas]
+        self.assertEqual(paradas(primera), [(self.sur.pk, 25, [sur.pk])])
+        self.assertEqual(paradas(segunda), [(self.norte.pk, 5, [p.pk for p in norte]), (self.alto.pk, 10, [alto.pk])])
+        self.assertEqual(segunda.recorrido, ['Norte', 'Alto'])
+
+        with override_settings(RUTAS_CAPACIDAD=2):
+            plan = rutas.planificar_listos()
+        self.assertEqual([len(ruta.paradas) for ruta in plan.rutas], [1, 1, 1])
+        with override_settings(RUTAS_MAX_MINUTOS=60):
+            plan = rutas.planificar_listos()
+        self.assertEqual([len(ruta.paradas) for ruta in plan.rutas], [3])
+
+    def test_red_cacheada_e_invalidada(self):
+        rutas.obtener_red()
+        with self.assertNumQueries(0):
+            rutas.obtener_red()
+        # Un trayecto nuevo recalcula la red
+        TrayectoZona.objects.create(origen=self.centro, destino=self.alto, minutos=2)
+        self.assertEqual(rutas.obtener_red().distancias[self.centro.pk][self.alto.pk], 2)
+        self.alto.activa = False
+        self.alto.save()
+        self.assertNotIn(self.alto.pk, rutas.obtener_red().distancias[self.centro.pk])
+
+    def test_vista(self):
+        pedido = self.pedido(self.norte)
+        self.pedido(None)
+        self.client.force_login(self.personal)
+        response = self.client.get(reverse('rutas_reparto'))
+        self.assertContains(response, f'#{pedido.pk}')
+        self.assertContains(response, 'Sin ruta')
+        datos = self.client.get(reverse('rutas_reparto'), {'formato': 'json'}).json()
+        self.assertEqual(datos['rutas'], [
+            {'minutos': 5, 'recorrido': ['Norte'], 'paradas': [{'zona': 'Norte', 'llegada': 5, 'pedidos': [pedido.pk]}]},
+        ])
+        self.assertEqual(len(datos['sin_ruta']), 1)
+
+        # El formulario de pedido ofrece las zonas de la red cacheada
+        self.client.force_login(self.cliente)
+        response = self.client.get(reverse('hacer_pedido'))
+        self.assertContains(response, f'<option value="{self.norte.pk}">Norte</option>', html=True)
+
+
+class VistasAsyncTests(TestCase):
+    """Las vistas async funcionan de punta a punta bajo ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Usuario.objects.create(username='cliente')
+        cls.admin = Usuario.objects.create(username='admin', rol='admin')
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123')
+        categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        cls.arepa = Menu.objects.create(categoria=categoria, restaurante=restaurante, nombre='Arepa', precio=5)
+        cls.agotada = Menu.objects.create(
+            categoria=categoria, restaurante=restaurante, nombre='Bandeja', precio=20, disponible=False,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_dashboards_y_listados(self):
+        await Pedido.objects.acreate(cliente=self.cliente, total=10, direccion_entrega='Calle Falsa 123')
+        await self.async_client.aforce_login(self.cliente)
+        for nombre in ('menu', 'cliente_dashboard', 'ver_pedidos', 'hacer_pedido', 'reservar_mesa'):
+            with self.subTest(vista=nombre):
+                response = await self.async_client.get(reverse(nombre))
+                self.assertEqual(response.status_code, 200)
+        self.assertContains(await self.async_client.get(reverse('menu')), 'Arepa')
+
+        await self.async_client.aforce_login(self.admin)
+        for nombre in ('admin_dashboard', 'personal_dashboard'):
+            with self.subTest(vista=nombre):
+                response = await self.async_client.get(reverse(nombre))
+                self.assertEqual(response.status_code, 200)
+        # Un cliente no entra a los paneles del personal
+        await self.async_client.aforce_login(self.cliente)
+        response = await self.async_client.get(reverse('personal_dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_hacer_pedido(self):
+        await self.async_client.aforce_login(self.cliente)
+        carrito = json.dumps([{'id': self.arepa.pk, 'cantidad': 3, 'precio': 0.01}])
+        response = await self.async_client.post(reverse('hacer_pedido'), {
+            'direccion_entrega': 'Calle 1', 'carrito_data': carrito,
+        })
+        self.assertRedirects(response, reverse('cliente_dashboard'), fetch_redirect_response=False)
+        pedido = await Pedido.objects.aget(cliente=self.cliente)
+        # El precio enviado por el navegador se ignora
+        self.assertEqual(pedido.total, 15)
+        self.assertEqual(await pedido.items.acount(), 1)
+
+        carrito = json.dumps([{'id': self.agotada.pk, 'cantidad': 1}])
+        response = await self.async_client.post(reverse('hacer_pedido'), {
+            'direccion_entrega': 'Calle 1', 'carrito_data': carrito,
+        })
+        self.assertRedirects(response, reverse('hacer_pedido'), fetch_redirect_response=False)
+        self.assertEqual(await Pedido.objects.acount(), 1)
+
+    async def test_reservar_mesa(self):
+        await self.async_client.aforce_login(self.cliente)
+        fecha = (timezone.localtime() + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M')
+        response = await self.async_client.post(reverse('reservar_mesa'), {
+            'fecha_reserva': fecha, 'numero_personas': 2,
+        })
+        self.assertRedirects(response, reverse('cliente_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(await Reserva.objects.filter(cliente=self.cliente).acount(), 1)
+
+
+class GestionPersonalTests(TestCase):
+    """El admin da de alta personal desde gestionar_personal"""
+
+    def test_crear_personal(self):
+        self.client.force_login(Usuario.objects.create(username='admin', rol='admin'))
+        response = self.client.post(reverse('gestionar_personal'), {
+            'username': 'cocinero', 'password': 'clave-segura-123', 'email': 'c@example.com',
+            'first_name': 'Ana', 'last_name': 'Gómez', 'telefono': '555',
+        })
+        self.assertContains(response, 'cocinero')
+        nuevo = Usuario.objects.get(username='cocinero')
+        self.assertEqual(nuevo.rol, 'personal')
+        self.assertTrue(nuevo.check_password('clave-segura-123'))
+
+
+class MesasTests(TestCase):
+    """La agenda responde por mesa con búsqueda binaria y la asignación no duplica mesas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create(username='admin', rol='admin')
+        cls.cliente = Usuario.objects.create(username='cliente')
+        Mesa.objects.bulk_create([
+            Mesa(numero='M1', capacidad=2), Mesa(numero='M2', capacidad=4), Mesa(numero='M3', capacidad=6),
+        ])
+        cls.noche = timezone.make_aware(datetime(2030, 1, 1, 20))
+
+    def setUp(self):
+        cache.clear()
+
+    def reserva(self, personas=2, horas=0, mesa='', estado='pendiente'):
+        return Reserva.objects.create(
+            cliente=self.cliente, fecha_reserva=self.noche + timedelta(hours=horas),
+            numero_personas=personas, mesa=mesa, estado=estado,
+        )
+
+    def test_reservas_solapadas(self):
+        # Datos viejos con reservas que se pisan en la misma mesa: 10-14 y 11-12
+        hora = lambda h, m=0: timezone.make_aware(datetime(2030, 1, 1, h, m))
+        agenda = AgendaMesas(Mesa.objects.filter(numero='M1'))
+        agenda.ocupar('M1', hora(10), hora(14))
+        agenda.ocupar('M1', hora(11), hora(12))
+        self.assertFalse(agenda.libre('M1', hora(12, 30), hora(13)))
+        self.assertFalse(agenda.libre('M1', hora(9), hora(10, 30)))
+        self.assertTrue(agenda.libre('M1', hora(14), hora(15)))
+        self.assertTrue(agenda.libre('M1', hora(8), hora(10)))
+
+    def test_agenda_desde_la_base_igual_a_insertar(self):
+        # Creadas fuera de orden y solapadas: 22-24, 20-22, 21-23, 23-01 en la M1
+        for horas in (2, 0, 1, 3):
+            self.reserva(horas=horas, mesa='M1', estado='confirmada')
+        self.reserva(horas=1, mesa='M2', estado='cancelada')
+
+        agenda = cargar_agenda(timezone.localdate(self.noche))
+        esperada = AgendaMesas(Mesa.objects.all())
+        for horas in (2, 0, 1, 3):
+            inicio = self.noche + timedelta(hours=horas)
+            esperada.ocupar('M1', inicio, inicio + duracion_reserva())
+        for atributo in ('inicios', 'fines', 'hasta'):
+            self.assertEqual(getattr(agenda, atributo), getattr(esperada, atributo))
+        self.assertEqual(agenda.hasta['M1'][-1], self.noche + timedelta(hours=5))
+
+    def test_asigna_la_mesa_mas_chica_y_rechaza_conflictos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            primera = confirmar_reserva(self.reserva(personas=3))
+        self.assertEqual((primera.mesa, primera.estado), ('M2', 'confirmada'))
+
+        # Una hora después la M2 sigue ocupada: se pide explícitamente y falla
+        segunda = self.reserva(personas=3, horas=1)
+        with self.assertRaisesMessage(MesaNoDisponible, 'ya está reservada'):
+            confirmar_reserva(segunda, numero='M2')
+        with self.assertRaisesMessage(MesaNoDisponible, 'es para 2 personas'):
+            confirmar_reserva(segunda, numero='M1')
+        segunda.refresh_from_db()
+        self.assertEqual((segunda.mesa, segunda.estado), ('', 'pendiente'))
+        self.assertEqual(confirmar_reserva(segunda).mesa, 'M3')
+
+        # Sin mesas libres para 5 personas no se confirma
+        with self.assertRaises(MesaNoDisponible):
+            confirmar_reserva(self.reserva(personas=5, horas=1))
+        # Cancelar no necesita mesa libre
+        self.assertEqual(confirmar_reserva(segunda, 'cancelada').estado, 'cancelada')
+
+    def test_agenda_cacheada_y_asignacion_desde_la_base(self):
+        self.assertEqual(len(mesas_disponibles(self.noche, 2)), 3)
+        with self.assertNumQueries(0):
+            mesas_disponibles(self.noche, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reserva(mesa='M1', estado='confirmada')
+        self.assertEqual([mesa.numero for mesa in mesas_disponibles(self.noche, 2)], ['M2', 'M3'])
+
+        # Una escritura que no pasó por las señales no está en la agenda
+        # cacheada, pero la asignación lee la base y no repite la mesa
+        Reserva.objects.filter(pk=self.reserva().pk).update(mesa='M2', estado='confirmada')
+        self.assertIn('M2', [mesa.numero for mesa in mesas_disponibles(self.noche, 2)])
+        self.assertEqual(confirmar_reserva(self.reserva()).mesa, 'M3')
+
+    def test_gestionar_reservas(self):
+        ocupada = self.reserva(mesa='M2', estado='confirmada')
+        reserva = self.reserva(horas=1)
+        self.client.force_login(self.admin)
+        url = reverse('gestionar_reservas')
+
+        # La mesa escrita a mano también se valida
+        response = self.client.post(url, {
+            'reserva_id': reserva.pk, 'estado': 'confirmada', 'mesa': ocupada.mesa, 'asignar_mesa': '1',
+        }, follow=True)
+        self.assertContains(response, 'ya está reservada')
+        reserva.refresh_from_db()
+        self.assertEqual((reserva.mesa, reserva.estado), ('', 'pendiente'))
+
+        self.client.post(url, {'reserva_id': reserva.pk, 'estado': 'confirmada', 'mesa': '', 'asignar_mesa': '1'})
+        reserva.refresh_from_db()
+        self.assertEqual((reserva.mesa, reserva.estado), ('M1', 'confirmada'))
+
+    def test_reservar_mesa_sin_disponibilidad(self):
+        Mesa.objects.exclude(numero='M1').update(activa=False)
+        self.reserva(mesa='M1', estado='confirmada')
+        self.client.force_login(self.cliente)
+        datos = {'fecha_reserva': (self.noche + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'), 'numero_personas': 2}
+        response = self.client.post(reverse('reservar_mesa'), datos)
+        self.assertContains(response, 'No hay mesas disponibles')
+        self.assertEqual(Reserva.objects.count(), 1)
+
+        datos['fecha_reserva'] = (self.noche + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M')
+        response = self.client.post(reverse('reservar_mesa'), datos)
+        self.assertRedirects(response, reverse('cliente_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(Reserva.objects.count(), 2)
+
+
+class CarritoTests(TestCase):
+    """El carrito se lee con validación y se cotiza con los precios de la base"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Usuario.objects.create(username='cliente')
+        restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123')
+        categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        cls.arepa = Menu.objects.create(categoria=categoria, restaurante=restaurante, nombre='Arepa', precio=5)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_leer_carrito(self):
+        self.assertEqual(leer_carrito(''), {})
+        carrito = json.dumps([{'id': '3', 'cantidad': 2}, {'id': 3, 'cantidad': 1}, {'id': 4, 'cantidad': '1'}])
+        self.assertEqual(leer_carrito(carrito), {3: 3, 4: 1})
+        for invalido in ('no es json', '{"id": 1}', '[{"id": 1}]', '[{"id": "x", "cantidad": 1}]',
+                         '[{"id": 1, "cantidad": 0}]', '[null]'):
+            with self.subTest(carrito=invalido), self.assertRaises(CarritoInvalido):
+                leer_carrito(invalido)
+
+    def test_precio_cambiado_en_otro_proceso(self):
+        carrito = json.dumps([{'id': self.arepa.pk, 'cantidad': 2}])
+        crear_pedido(Pedido(cliente=self.cliente), carrito)
+        # Otro worker cambió el precio: la versión de este proceso no se movió
+        Menu.objects.filter(pk=self.arepa.pk).update(precio=7)
+        pedido, [item] = crear_pedido(Pedido(cliente=self.cliente), carrito)
+        self.assertEqual((pedido.total, item.subtotal), (14, 14))
+
+        Menu.objects.filter(pk=self.arepa.pk).update(disponible=False)
+        with self.assertRaisesMessage(CarritoInvalido, 'Arepa'):
+            crear_pedido(Pedido(cliente=self.cliente), carrito)
+        self.assertEqual(Pedido.objects.count(), 2)
+
+    def test_crear_pedido_rechaza_sin_escribir(self):
+        agotada = Menu.objects.create(
+            categoria=self.arepa.categoria, restaurante=self.arepa.restaurante, nombre='Bandeja', precio=20,
+            disponible=False,
+        )
+        casos = (
+            ([{'id': 999999, 'cantidad': 1}], 'no encontrados: 999999'),
+            ([{'id': self.arepa.pk, 'cantidad': 1}, {'id': agotada.pk, 'cantidad': 1}], 'no disponibles: Bandeja'),
+        )
+        for carrito, mensaje in casos:
+            with self.subTest(mensaje=mensaje), self.assertRaisesMessage(CarritoInvalido, mensaje):
+                crear_pedido(Pedido(cliente=self.cliente), json.dumps(carrito))
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(ItemPedido.objects.exists())
+
+    def test_crear_pedido_en_una_transaccion(self):
+        carrito = json.dumps([{'id': self.arepa.pk, 'cantidad': 3, 'precio': 0.5}])
+        # Si falla la inserción de los items tampoco queda el pedido
+        with mock.patch.object(ItemPedido.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                crear_pedido(Pedido(cliente=self.cliente), carrito)
+        self.assertFalse(Pedido.objects.exists())
+
+        pedido, items = crear_pedido(Pedido(cliente=self.cliente), carrito)
+        self.assertEqual(pedido.total, 15)
+        self.assertEqual(list(pedido.items.values_list('producto_id', 'cantidad', 'subtotal')), [(self.arepa.pk, 3, 15)])
+
+
+class CatalogoTests(TestCase):
+    """El snapshot del catálogo y el índice de precios se invalidan con las señales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurante = Restaurante.objects.create(nombre='El Paisa', direccion='Calle 1', telefono='123')
+        cls.categoria = Categoria.objects.create(nombre='Platos', tipo='comida')
+        cls.arepa = Menu.objects.create(categoria=cls.categoria, restaurante=cls.restaurante, nombre='Arepa', precio=5)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalogo_en_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(obtener_catalogo(), {self.categoria: [self.arepa]})
+        with self.assertNumQueries(0):
+            obtener_catalogo()
+            obtener_catalogo()
+
+    def test_catalogo_invalidado_por_menu_y_categoria(self):
+        obtener_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arepa.disponible = False
+            self.arepa.save()
+        self.assertEqual(obtener_catalogo(), {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arepa.disponible = True
+            self.arepa.save()
+            self.categoria.nombre = 'Principales'
+            self.categoria.save()
+        [categoria] = obtener_catalogo()
+        self.assertEqual(categoria.nombre, 'Principales')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bebidas = Categoria.objects.create(nombre='Bebidas', tipo='bebida')
+            jugo = Menu.objects.create(categoria=bebidas, restaurante=self.restaurante, nombre='Jugo', precio=2)
+        self.assertEqual(obtener_catalogo()[bebidas], [jugo])
+        with self.captureOnCommitCallbacks(execute=True):
+            jugo.delete()
+        self.assertNotIn(bebidas, obtener_catalogo())
+
+    def test_version_cambia_al_confirmar(self):
+        version = obtener_version(VERSION_CATALOGO)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arepa.precio = 8
+            self.arepa.save()
+            # Un snapshot armado antes del commit queda bajo la versión vieja
+            obtener_catalogo()
+            self.assertEqual(obtener_version(VERSION_CATALOGO), version)
+        self.assertNotEqual(obtener_version(VERSION_CATALOGO), version)
+
+    def test_indice_precios_invalidado(self):
+        self.assertEqual(obtener_indice_precios()[self.arepa.pk].precio, 5)
+        with self.assertNumQueries(0):
+            obtener_indice_precios()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arepa.precio = 8
+            self.arepa.save()
+        self.assertEqual(obtener_indice_precios()[self.arepa.pk].precio, 8)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arepa.delete()
+        self.assertNotIn(self.arepa.pk, obtener_indice_precios())
+
+
+class PaginacionCursorTests(TestCase):
+    """Los tokens de cursor viajan en la URL: los manipulados se ignoran"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Usuario.objects.create(username='cliente')
+        inicio = timezone.make_aware(datetime(2026, 1, 1, 12))
+        # Cinco pedidos comparten fecha para ejercitar el desempate por id
+        for i in range(12):
+            pedido = Pedido.objects.create(cliente=cliente, total=i)
+            Pedido.objects.filter(pk=pedido.pk).update(fecha_pedido=inicio + timedelta(minutes=max(i, 4)))
+        cls.pedidos = Pedido.objects.all()
+
+    def test_ida_y_vuelta(self):
+        valor = timezone.make_aware(datetime(2026, 1, 1, 12, 30, 15, 250))
+        for direccion in ('sig', 'ant'):
+            token = codificar_cursor(valor, 42, direccion)
+            self.assertNotIn('=', token)
+            self.assertEqual(decodificar_cursor(token), (valor, 42, direccion))
+
+    def test_tokens_manipulados(self):
+        def token(datos):
+            return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+        valido = {'v': '2026-01-01T12:00:00+00:00', 'id': 1, 'd': 'sig'}
+        for invalido in (
+            None, '', '%%%', 'no-es-base64!', base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+            base64.urlsafe_b64encode(b'no es json').decode(), token([1, 2]), token('texto'),
+            token({**valido, 'd': 'x'}), token({**valido, 'v': 'ayer'}), token({**valido, 'v': 5}),
+            token({**valido, 'id': 'uno'}), token({**valido, 'id': None}), token({'v': valido['v'], 'id': 1}),
+        ):
+            with self.subTest(token=invalido):
+                self.assertIsNone(decodificar_cursor(invalido))
+
+    def test_cursor_manipulado_vuelve_a_la_primera_pagina(self):
+        primera = paginar(self.pedidos, 'fecha_pedido', por_pagina=5)
+        manipulado = primera.siguiente[:-3] + 'xyz'
+        self.assertIsNone(decodificar_cursor(manipulado))
+        pagina = paginar(self.pedidos, 'fecha_pedido', manipulado, por_pagina=5)
+        self.assertEqual(pagina.items, primera.items)
+        self.assertIsNone(pagina.anterior)
+
+    def test_navegacion(self):
+        esperado = list(self.pedidos.order_by('-fecha_pedido', '-id'))
+        paginas = [paginar(self.pedidos, 'fecha_pedido', por_pagina=5)]
+        while paginas[-1].siguiente:
+            paginas.append(paginar(self.pedidos, 'fecha_pedido', paginas[-1].siguiente, por_pagina=5))
+
+        self.assertEqual([len(pagina.items) for pagina in paginas], [5, 5, 2])
+        self.assertEqual([item for pagina in paginas for item in pagina.items], esperado)
+        self.assertIsNone(paginas[0].anterior)
+        self.assertIsNone(paginas[-1].siguiente)
+
+        # Volver desde la última página recorre las mismas páginas
+        for i in range(len(paginas) - 1, 0, -1):
+            anterior = paginar(self.pedidos, 'fecha_pedido', paginas[i].anterior, por_pagina=5)
+            self.assertEqual(anterior.items, paginas[i - 1].items)
+            self.assertIsNotNone(anterior.siguiente)
+
+        ascendente = paginar(self.pedidos, 'fecha_pedido', por_pagina=20, descendente=False)
+        self.assertEqual(ascendente.items, esperado[::-1])
+        self.assertFalse(ascendente.tiene_otras_paginas)
+
+    async def test_por_partes(self):
+        estados = ['pendiente', 'listo', 'entregado']
+        async for pedido in self.pedidos:
+            await Pedido.objects.filter(pk=pedido.pk).aupdate(estado=estados[int(pedido.total) % 3])
+        partes = [Q(estado='pendiente'), Q(estado='listo')]
+        esperado = [p async for p in self.pedidos.filter(estado__in=['pendiente', 'listo']).order_by('fecha_pedido', 'id')]
+
+        paginas = [await apaginar_por_partes(self.pedidos, partes, 'fecha_pedido', por_pagina=3, descendente=False)]
+        while paginas[-1].siguiente:
+            paginas.append(await apaginar_por_partes(
+                self.pedidos, partes, 'fecha_pedido', paginas[-1].siguiente, por_pagina=3, descendente=False,
+            ))
+        self.assertEqual([item for pagina in paginas for item in pagina.items], esperado)
+
+        anterior = await apaginar_por_partes(self.pedidos, partes, 'fecha_pedido', paginas[-1].anterior, por_pagina=3, descendente=False)
+        self.assertEqual(anterior.items, paginas[-2].items)
+
+
+class EventosPedidosTests(TestCase):
+    """La cola de cocina recibe los cambios de pedidos por SSE o long-poll"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Usuario.objects.create(username='cliente')
+        cls.personal = Usuario.objects.create(username='cocina', rol='personal')
+        cls.pedido = Pedido.objects.create(cliente=cls.cliente, total=10)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_publicar_evento_pedido(self):
+        evento = publicar_evento_pedido(self.pedido, nuevo=True)
+        self.assertEqual(evento['id'], 1)
+        self.assertEqual(ultimo_evento(), 1)
+        self.assertEqual(
+            {clave: evento[clave] for clave in ('pedido', 'estado', 'total', 'nuevo', 'cerrado')},
+            {'pedido': self.pedido.pk, 'estado': 'pendiente', 'total': str(self.pedido.total), 'nuevo': True, 'cerrado': False},
+        )
+        self.assertIn(f'#{self.pedido.pk}', evento['fila'])
+        self.assertIn('detalle', evento)
+
+        # Un pedido cerrado sale de la cola: no lleva filas renderizadas
+        self.pedido.estado = 'entregado'
+        cerrado = publicar_evento_pedido(self.pedido)
+        self.assertEqual((cerrado['id'], cerrado['cerrado']), (2, True))
+        self.assertNotIn('fila', cerrado)
+        self.assertEqual(eventos_desde(0), (2, [evento, cerrado]))
+
+    def test_eventos_desde(self):
+        self.assertEqual(eventos_desde(0), (0, []))
+        eventos = [publicar_evento_pedido(self.pedido) for _ in range(3)]
+        self.assertEqual(eventos_desde(1), (3, eventos[1:]))
+        self.assertEqual(eventos_desde(3), (3, []))
+        # Un cursor del futuro, expirado o demasiado viejo obliga a recargar
+        self.assertEqual(eventos_desde(7), (3, None))
+        cache.delete('eventos_pedidos:2')
+        self.assertEqual(eventos_desde(1), (3, None))
+        cache.set('eventos_pedidos:secuencia', 3 + MAX_EVENTOS + 1)
+        self.assertEqual(eventos_desde(3)[1], None)
+
+    async def test_esperar_eventos(self):
+        ultimo, eventos = await esperar_eventos(0, espera=0.05, intervalo=0.01)
+        self.assertEqual((ultimo, eventos), (0, []))
+
+        async def publicar_despues():
+            await asyncio.sleep(0.05)
+            await sync_to_async(publicar_evento_pedido)(self.pedido)
+
+        tarea = asyncio.create_task(publicar_despues())
+        ultimo, eventos = await esperar_eventos(0, espera=5, intervalo=0.01)
+        await tarea
+        self.assertEqual(ultimo, 1)
+        self.assertEqual([evento['pedido'] for evento in eventos], [self.pedido.pk])
+
+    async def test_stream_eventos(self):
+        await sync_to_async(publicar_evento_pedido)(self.pedido, nuevo=True)
+        await sync_to_async(publicar_evento_pedido)(self.pedido)
+        mensajes = [mensaje async for mensaje in stream_eventos(0, duracion=0.05, intervalo=0.01)]
+        self.assertEqual(mensajes[0], 'retry: 3000\n\n')
+        id_evento, datos = mensajes[1].removesuffix('\n\n').split('\n')
+        self.assertEqual(id_evento, 'id: 2')
+        self.assertEqual([evento['id'] for evento in json.loads(datos.removeprefix('data: '))], [1, 2])
+        self.assertEqual(set(mensajes[2:]), {': ping\n\n'})
+
+        # Retomar desde el último id recibido solo trae lo nuevo
+        mensajes = [mensaje async for mensaje in stream_eventos(1, duracion=0.05, intervalo=0.01)]
+        self.assertTrue(mensajes[1].startswith('id: 2\ndata: '))
+        self.assertEqual(len(json.loads(mensajes[1].split('data: ')[1])), 1)
+
+        mensajes = [mensaje async for mensaje in stream_eventos(9, duracion=5, intervalo=0.01)]
+        self.assertEqual(mensajes, ['retry: 3000\n\n', 'id: 2\nevent: recargar\ndata: {}\n\n'])
+
+    async def test_poll(self):
+        for _ in range(3):
+            await sync_to_async(publicar_evento_pedido)(self.pedido)
+        await self.async_client.aforce_login(self.personal)
+        response = await self.async_client.get(reverse('eventos_pedidos_poll'), {'desde': 1})
+        datos = response.json()
+        self.assertEqual(datos['ultimo'], 3)
+        self.assertEqual([evento['id'] for evento in datos['eventos']], [2, 3])
+
+        # EventSource manda el último id en Last-Event-ID al reconectarse
+        response = await self.async_client.get(reverse('eventos_pedidos_poll'), headers={'Last-Event-ID': '2'})
+        self.assertEqual([evento['id'] for evento in response.json()['eventos']], [3])
+        response = await self.async_client.get(reverse('eventos_pedidos_poll'), {'desde': 50})
+        self.assertEqual(response.json(), {'ultimo': 3, 'eventos': None})
+
+    async def test_stream_bajo_asgi(self):
+        await sync_to_async(publicar_evento_pedido)(self.pedido)
+        await self.async_client.aforce_login(self.personal)
+        response = await self.async_client.get(reverse('eventos_pedidos'), headers={'Last-Event-ID': '0'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertTrue(response.is_async)
+        trozos = aiter(response.streaming_content)
+        self.assertEqual(await anext(trozos), b'retry: 3000\n\n')
+        self.assertTrue((await anext(trozos)).startswith(b'id: 1\ndata: '))
+        await trozos.aclose()
+
+    def test_solo_personal(self):
+        for usuario in (None, self.cliente):
+            if usuario:
+                self.client.force_login(usuario)
+            for nombre in ('eventos_pedidos', 'eventos_pedidos_poll'):
+                with self.subTest(usuario=usuario, vista=nombre):
+                    response = self.client.get(reverse(nombre))
+                    self.assertEqual(response.status_code, 302)
+                    self.assertIn(settings.LOGIN_URL, response['Location'])
+
+    def test_stream_sync_bajo_wsgi(self):
+        publicar_evento_pedido(self.pedido, nuevo=True)
+        self.client.force_login(self.personal)
+        response = self.client.get(reverse('eventos_pedidos'), {'desde': 0})
+        # Un iterador async se leería entero antes de mandar el primer evento
+        self.assertFalse(response.is_async)
+        trozos = iter(response.streaming_content)
+        self.assertEqual(next(trozos), b'retry: 3000\n\n')
+        self.assertTrue(next(trozos).startswith(b'id: 1\ndata: '))
+        response.close()
+
+    def test_iterar_eventos_termina(self):
+        reloj = [0]
+        falso = mock.Mock(monotonic=lambda: reloj[0], sleep=lambda segundos: reloj.__setitem__(0, reloj[0] + segundos))
+        with mock.patch('core.eventos.time', falso):
+            mensajes = list(iterar_eventos(0, duracion=25))
+        # Un ping cada 15 segundos sin cambios y se corta al llegar a la duración
+        self.assertEqual(mensajes, ['retry: 3000\n\n', ': ping\n\n', ': ping\n\n'])
+        self.assertEqual(reloj[0], 25)
+
+    def test_poll_bajo_wsgi_no_espera(self):
+        self.client.force_login(self.personal)
+        with mock.patch('core.eventos.asyncio.sleep') as dormir:
+            response = self.client.get(reverse('eventos_pedidos_poll'), {'desde': 0})
+        self.assertEqual(response.json(), {'ultimo': 0, 'eventos': []})
+        dormir.assert_not_called()
+
+    def test_dashboard_elige_transporte(self):
+        self.client.force_login(self.personal)
+        self.assertContains(self.client.get(reverse('personal_dashboard')), 'data-tiempo-real="0"')
+
+    async def test_dashboard_en_tiempo_real_bajo_asgi(self):
+        await self.async_client.aforce_login(self.personal)
+        response = await self.async_client.get(reverse('personal_dashboard'))
+        self.assertContains(response, 'data-tiempo-real="1"')
+
+
+class ResumenesTests(TestCase):
+    """El resumen incremental coincide con recalcular los días desde cero"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Usuario.objects.create(username='cliente')
+
+    def dia(self, dias, hora=12):
+        return timezone.make_aware(datetime(2026, 3, 10 + dias, hora))
+
+    def crear_pedido(self, dias, total, estado='pendiente'):
+        pedido = Pedido.objects.create(cliente=self.cliente, total=total, estado=estado)
+        # fecha_pedido es auto_now_add: se mueve con un save normal para pasar por las señales
+        pedido.fecha_pedido = self.dia(dias)
+        pedido.save()
+        return pedido
+
+    def resumenes(self):
+        return {
+            fila['fecha']: fila
+            for fila in ResumenDiario.objects.values('fecha', 'total_pedidos', 'pedidos_entregados',
+                                                     'total_ventas', 'reservas_completadas')
+            if any(fila[campo] for campo in fila if campo != 'fecha')
+        }
+
+    def assertIgualAlRecalculo(self):
+        incremental = self.resumenes()
+        recalcular_dias(date(2026, 3, 1), date(2026, 3, 31))
+        self.assertEqual(incremental, self.resumenes())
+        return incremental
+
+    def test_cambios_de_estado_total_y_fecha(self):
+        uno = self.crear_pedido(0, 10)
+        dos = self.crear_pedido(0, 20, estado='entregado')
+        tres = self.crear_pedido(1, 5)
+        self.assertIgualAlRecalculo()
+
+        uno.estado = 'entregado'
+        uno.save()
+        dos.total = 25
+        dos.save()
+        tres.fecha_pedido = self.dia(2)
+        tres.estado = 'entregado'
+        tres.total = 7
+        tres.save()
+        resumenes = self.assertIgualAlRecalculo()
+        hoy = self.dia(0).date()
+        self.assertEqual(
+            (resumenes[hoy]['total_pedidos'], resumenes[hoy]['pedidos_entregados'], resumenes[hoy]['total_ventas']),
+            (2, 2, 35),
+        )
+        self.assertNotIn(self.dia(1).date(), resumenes)
+
+        # Una entrega que se cancela deja de sumar ventas
+        dos.estado = 'cancelado'
+        dos.save()
+        self.assertEqual(self.assertIgualAlRecalculo()[hoy]['total_ventas'], 10)
+
+    def test_borrar(self):
+        pedido = self.crear_pedido(0, 10, estado='entregado')
+        self.crear_pedido(0, 4)
+        pedido.delete()
+        resumenes = self.assertIgualAlRecalculo()
+        self.assertEqual(resumenes[self.dia(0).date()]['total_ventas'], 0)
+
+        reserva = Reserva.objects.create(cliente=self.cliente, fecha_reserva=self.dia(3), numero_personas=2,
+                                         estado='completada')
+        self.assertEqual(self.assertIgualAlRecalculo()[self.dia(3).date()]['reservas_completadas'], 1)
+        reserva.delete()
+        self.assertNotIn(self.dia(3).date(), self.assertIgualAlRecalculo())
+
+    def test_reservas(self):
+        reserva = Reserva.objects.create(cliente=self.cliente, fecha_reserva=self.dia(0), numero_personas=2)
+        self.assertIgualAlRecalculo()
+        reserva.estado = 'completada'
+        reserva.save()
+        reserva.fecha_reserva = self.dia(4)
+        reserva.save()
+        resumenes = self.assertIgualAlRecalculo()
+        self.assertEqual(resumenes[self.dia(4).date()]['reservas_completadas'], 1)
+        self.assertNotIn(self.dia(0).date(), resumenes)
+
+    def test_original_desconocido_recalcula_el_dia(self):
+        pedido = self.crear_pedido(0, 10)
+        # Sin el total cargado no se conoce el aporte anterior
+        parcial = Pedido.objects.only('id', 'estado').get(pk=pedido.pk)
+        self.assertIsNone(parcial._resumen_original)
+        # Un resumen desfasado se corrige al recalcular el día entero
+        ResumenDiario.objects.filter(fecha=self.dia(0).date()).update(total_pedidos=9)
+        parcial.estado = 'entregado'
+        parcial.save()
+        resumenes = self.assertIgualAlRecalculo()
+        self.assertEqual(
+            (resumenes[self.dia(0).date()]['total_pedidos'], resumenes[self.dia(0).date()]['total_ventas']), (1, 10),
+        )
+
+    def test_reconstruir_por_lotes(self):
+        for dias in range(0, 10, 2):
+            self.crear_pedido(dias, 10 + dias, estado='entregado')
+        Reserva.objects.create(cliente=self.cliente, fecha_reserva=self.dia(5), numero_personas=2,
+                               estado='completada')
+        esperado = self.resumenes()
+        ResumenDiario.objects.all().delete()
+        # Una fila vieja sin pedidos se borra al reconstruir su lote
+        ResumenDiario.objects.create(fecha=self.dia(1).date(), total_pedidos=3)
+
+        salida = StringIO()
+        with CaptureQueriesContext(connection) as consultas:
+            call_command('reconstruir_resumenes', '--dias-por-lote', '3', stdout=salida)
+        self.assertEqual(self.resumenes(), esperado)
+        self.assertIn('6 días entre 2026-03-10 y 2026-03-18', salida.getvalue())
+        # Días 10-18 en lotes de 3: tres lotes, cada uno con su propio borrado
+        borrados = [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('DELETE')]
+        self.assertEqual(len(borrados), 3)
+
+        call_command('reconstruir_resumenes', '--desde', '2026-03-14', '--hasta', '2026-03-14', stdout=StringIO())
+        self.assertEqual(self.resumenes(), esperado)
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_resumenes', '--desde', '2026-03-14', '--hasta', '2026-03-13')
+
+
+class EstadisticasTests(TestCase):
+    """Los contadores agregados coinciden con un count() por filtro"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Usuario.objects.create(username='cliente')
+        Usuario.objects.create(username='otro')
+        Usuario.objects.create(username='cocina', rol='personal')
+        Usuario.objects.create(username='admin', rol='admin')
+        ahora = timezone.now()
+        cls.ayer = timezone.localdate() - timedelta(days=1)
+        for i, (estado, _) in enumerate(Pedido.ESTADOS * 2):
+            pedido = Pedido.objects.create(cliente=cliente, total=10 + i, estado=estado)
+            if i % 2:
+                pedido.fecha_pedido = ahora - timedelta(days=1)
+                pedido.save()
+        for i, (estado, _) in enumerate(Reserva.ESTADOS * 3):
+            Reserva.objects.create(
+                cliente=cliente, numero_personas=2, estado=estado,
+                fecha_reserva=ahora + timedelta(days=-1 if i % 3 == 1 else i % 3 // 2),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_admin(self):
+        esperado = {
+            'total_pedidos': Pedido.objects.count(),
+            'pedidos_pendientes': Pedido.objects.filter(estado='pendiente').count(),
+            'total_ventas': Pedido.objects.filter(estado='entregado').aggregate(Sum('total'))['total__sum'] or 0,
+            'total_clientes': Usuario.objects.filter(rol='cliente').count(),
+            'total_personal': Usuario.objects.filter(rol='personal').count(),
+        }
+        # Pedido, Usuario y los resúmenes diarios: una consulta por tabla
+        with self.assertNumQueries(3):
+            self.assertEqual(estadisticas_admin(), esperado)
+        with self.assertNumQueries(0):
+            estadisticas_admin()
+
+    def test_personal(self):
+        hoy = timezone.localdate()
+        esperado = {
+            'pedidos_pendientes': Pedido.objects.exclude(estado__in=['entregado', 'cancelado']).count(),
+            'pedidos_hoy': Pedido.objects.filter(fecha_pedido__date=hoy).count(),
+        }
+        self.assertEqual(esperado, {'pedidos_pendientes': 8, 'pedidos_hoy': 6})
+        with self.assertNumQueries(1):
+            self.assertEqual(estadisticas_personal(), esperado)
+        with self.assertNumQueries(0):
+            estadisticas_personal()
+
+    def test_reservas(self):
+        hoy = timezone.localdate()
+        for estado in ('', 'pendiente', 'confirmada', 'cancelada'):
+            for fecha in (None, hoy, self.ayer):
+                reservas = Reserva.objects.all()
+                if estado:
+                    reservas = reservas.filter(estado=estado)
+                if fecha:
+                    reservas = reservas.filter(fecha_reserva__date=fecha)
+                esperado = {
+                    'total_reservas': reservas.count(),
+                    'reservas_pendientes': reservas.filter(estado='pendiente').count(),
+                    'reservas_confirmadas': reservas.filter(estado='confirmada').count(),
+                    'reservas_hoy': Reserva.objects.filter(fecha_reserva__date=hoy).count(),
+                }
+                with self.subTest(estado=estado, fecha=fecha), self.assertNumQueries(1):
+                    self.assertEqual(estadisticas_reservas(estado, fecha), esperado)
+        with self.assertNumQueries(0):
+            estadisticas_reservas('pendiente', hoy)
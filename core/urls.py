@@ -7,6 +7,7 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('registro/', views.registro, name='registro'),
     path('menu/', views.menu, name='menu'),
+    path('menu/buscar/', views.buscar_menu, name='buscar_menu'),
     
     # Autenticación
     path('login/', auth_views.LoginView.as_view(template_name='core/login.html'), name='login'),
@@ -18,10 +19,15 @@ urlpatterns = [
     # Dashboards específicos
     path('administrador/dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('personal/dashboard/', views.personal_dashboard, name='personal_dashboard'),
+    path('personal/pedidos/estados/', views.cambiar_estados_pedidos, name='cambiar_estados_pedidos'),
+    path('personal/pedidos/eventos/', views.eventos_pedidos, name='eventos_pedidos'),
+    path('personal/pedidos/eventos/poll/', views.eventos_pedidos_poll, name='eventos_pedidos_poll'),
     path('cliente/dashboard/', views.cliente_dashboard, name='cliente_dashboard'),
     
     # Funcionalidades personal
     path('personal/editar-perfil/', views.editar_perfil_personal, name='editar_perfil_personal'),
+    path('personal/pronostico/', views.pronostico_preparacion, name='pronostico_preparacion'),
+    path('personal/rutas/', views.rutas_reparto, name='rutas_reparto'),
     
     # Funcionalidades cliente
     path('cliente/hacer-pedido/', views.hacer_pedido, name='hacer_pedido'),
@@ -36,6 +42,15 @@ urlpatterns = [
     path('administrador/gestionar-personal/', views.gestionar_personal, name='gestionar_personal'),
     path('administrador/comentarios/', views.ver_comentarios, name='ver_comentarios'),
     path('administrador/reportes/', views.generar_reporte, name='generar_reporte'),
+    path('administrador/reportes/graficos/<str:tipo>/', views.grafico_reporte, name='grafico_reporte'),
+    path('administrador/exportar/', views.exportar_datos, name='exportar_datos'),
+    path('administrador/fragmentos/', views.fragmentos_cache, name='fragmentos_cache'),
     path('admin/gestionar-reservas/', views.gestionar_reservas, name='gestionar_reservas'),
     
+    # API de solo lectura
+    path('api/v1/menu/', views.api_menu, name='api_menu'),
+    path('api/v1/pedidos/', views.api_pedidos, name='api_pedidos'),
+    path('api/v1/pedidos/<int:pedido_id>/', views.api_pedido, name='api_pedido'),
+    path('api/v1/reservas/', views.api_reservas, name='api_reservas'),
+    
 ]
\ No newline at end of file
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Contadores de versión guardados en la caché. Cada vez que cambian los datos
+# de un conjunto (por ejemplo el catálogo) se incrementa su versión y todas las
+# claves derivadas de la versión anterior dejan de usarse. La versión inicial
+# es la hora en milisegundos: si la caché expulsa un contador, al recrearlo no
+# vuelve a un número ya usado y no revive contenido viejo.
+
+PREFIJO = 'version:'
+
+# Backends de caché que viven dentro de cada proceso
+CACHES_LOCALES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_local():
+    """Si la caché no se comparte con otros procesos (workers, procesar_tareas, shell)"""
+    return settings.CACHES['default']['BACKEND'] in CACHES_LOCALES
+
+
+def _version_inicial():
+    return int(time.time() * 1000)
+
+
+def obtener_version(nombre):
+    """Devuelve la versión actual de ``nombre``, creándola si no existe"""
+    clave = PREFIJO + nombre
+    version = cache.get(clave)
+    if version is None:
+        inicial = _version_inicial()
+        cache.add(clave, inicial, timeout=None)
+        version = cache.get(clave, inicial)
+    return version
+
+
+async def aobtener_version(nombre):
+    clave = PREFIJO + nombre
+    version = await cache.aget(clave)
+    if version is None:
+        inicial = _version_inicial()
+        await cache.aadd(clave, inicial, timeout=None)
+        version = await cache.aget(clave, inicial)
+    return version
+
+
+def obtener_versiones(nombres):
+    """``{nombre: version}`` para varios contadores con una sola lectura de la caché"""
+    claves = {PREFIJO + nombre: nombre for nombre in nombres}
+    guardadas = cache.get_many(claves)
+    versiones = {claves[clave]: version for clave, version in guardadas.items()}
+    for clave, nombre in claves.items():
+        if clave not in guardadas:
+            versiones[nombre] = obtener_version(nombre)
+    return versiones
+
+
+async def aobtener_versiones(nombres):
+    claves = {PREFIJO + nombre: nombre for nombre in nombres}
+    guardadas = await cache.aget_many(claves)
+    versiones = {claves[clave]: version for clave, version in guardadas.items()}
+    for clave, nombre in claves.items():
+        if clave not in guardadas:
+            versiones[nombre] = await aobtener_version(nombre)
+    return versiones
+
+
+def incrementar_version(nombre):
+    """Invalida todo lo cacheado bajo la versión actual de ``nombre``"""
+    clave = PREFIJO + nombre
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        version = _version_inicial()
+        cache.set(clave, version, timeout=None)
+        return version
@@ -1,14 +1,42 @@
+import uuid
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate
 from django.contrib.auth import logout as auth_logout
+from django.views.decorators.cache import cache_control
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Sum, Count, Q
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import Sum, Count, Q, prefetch_related_objects
 from datetime import datetime, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import *
 from .forms import *
+from .busqueda import buscar_menu as buscar_productos
+from .catalogo import aobtener_catalogo
+from .pedidos import CambiosInvalidos, CarritoInvalido, cambiar_estados, crear_pedido, leer_cambios
+from .mesas import (
+    MesaNoDisponible, ahay_mesas, amesas_disponibles, confirmar_reserva,
+)
+from .eventos import ESPERA_POLL, aultimo_evento, esperar_eventos, iterar_eventos, stream_eventos
+from .resumenes import rango_fechas, resumen_periodos
+from .paginacion import apaginar, apaginar_por_partes, pagina_json, paginar
+from .consultas import presupuesto_consultas
+from .fragmentos import aprecargar, estadisticas_fragmentos
+from . import api, graficos
+from .pronostico import pronostico_preparacion as calcular_preparacion
+from .rutas import opciones_zonas, planificar_listos
+from .tareas import encolar
+from .exportacion import CONJUNTOS, FORMATOS, respuesta_exportacion
+from .estadisticas import aestadisticas_admin, aestadisticas_personal, estadisticas_reservas
+
+# Días que abarca cada tipo de Reporte, contando el día actual
+DIAS_POR_REPORTE = {'diario': 1, 'semanal': 7, 'mensual': 30}
 
 def es_admin(user):
     return user.is_authenticated and user.rol == 'admin'
@@ -19,6 +47,51 @@ def es_personal(user):
 def es_cliente(user):
     return user.is_authenticated and user.rol == 'cliente'
 
+def usuario_async(vista):
+    """Resuelve ``request.user`` antes de una vista async.
+
+    ``request.user`` es perezoso y se carga con el ORM síncrono; las
+    plantillas lo leen (base.html, el context processor de auth), así que sin
+    esto el render fallaría dentro del event loop.
+    """
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        request.user = await request.auser()
+        return await vista(request, *args, **kwargs)
+    return envoltura
+
+def _pedido_json(pedido):
+    return {
+        'id': pedido.id,
+        'fecha_pedido': pedido.fecha_pedido.isoformat(),
+        'estado': pedido.estado,
+        'estado_display': pedido.get_estado_display(),
+        'total': str(pedido.total),
+        'direccion_entrega': pedido.direccion_entrega,
+    }
+
+def _reserva_json(reserva):
+    return {
+        'id': reserva.id,
+        'fecha_reserva': reserva.fecha_reserva.isoformat(),
+        'fecha_creacion': reserva.fecha_creacion.isoformat(),
+        'numero_personas': reserva.numero_personas,
+        'mesa': reserva.mesa,
+        'estado': reserva.estado,
+        'estado_display': reserva.get_estado_display(),
+    }
+
+def _comentario_json(comentario):
+    return {
+        'id': comentario.id,
+        'cliente': comentario.cliente_id,
+        'pedido': comentario.pedido_id,
+        'texto': comentario.texto,
+        'calificacion': comentario.calificacion,
+        'fecha': comentario.fecha.isoformat(),
+        'aprobado': comentario.aprobado,
+    }
+
 def index(request):
     return render(request, 'core/index.html')
 
@@ -56,35 +129,29 @@ def dashboard(request):
         return redirect('cliente_dashboard')
 
 
+@presupuesto_consultas(6)
 @login_required
 @user_passes_test(es_admin)
-def admin_dashboard(request):
-    # Estadísticas para el admin
-    total_pedidos = Pedido.objects.count()
-    pedidos_pendientes = Pedido.objects.filter(estado='pendiente').count()
-    total_ventas = Pedido.objects.filter(estado='entregado').aggregate(Sum('total'))['total__sum'] or 0
-    total_clientes = Usuario.objects.filter(rol='cliente').count()
-    total_personal = Usuario.objects.filter(rol='personal').count()
-    
+@usuario_async
+async def admin_dashboard(request):
     # Pedidos recientes
-    pedidos_recientes = Pedido.objects.all().order_by('-fecha_pedido')[:5]
+    pedidos_recientes = [
+        pedido async for pedido in Pedido.objects.select_related('cliente').order_by('-fecha_pedido')[:5]
+    ]
     
     context = {
-        'total_pedidos': total_pedidos,
-        'pedidos_pendientes': pedidos_pendientes,
-        'total_ventas': total_ventas,
-        'total_clientes': total_clientes,
-        'total_personal': total_personal,
+        **await aestadisticas_admin(),
         'pedidos_recientes': pedidos_recientes,
     }
     return render(request, 'core/admin_dashboard.html', context)
 
+@presupuesto_consultas(6)
 @login_required
 @user_passes_test(es_admin)
 def gestionar_menu(request):
     """Vista para que el admin gestione el menú"""
     categorias = Categoria.objects.all()
-    productos = Menu.objects.all()
+    productos = Menu.objects.select_related('categoria')
 
     if request.method == 'POST':
         action = request.POST.get('action')
@@ -137,11 +204,12 @@ def gestionar_menu(request):
 
 
 
+@presupuesto_consultas(5)
 @login_required
 @user_passes_test(es_admin)
 def ver_comentarios(request):
     """Vista para que el admin vea y gestione comentarios"""
-    comentarios = Comentario.objects.all().order_by('-fecha')
+    comentarios = Comentario.objects.select_related('cliente')
     
     if request.method == 'POST':
         comentario_id = request.POST.get('comentario_id')
@@ -161,46 +229,129 @@ def ver_comentarios(request):
         except Comentario.DoesNotExist:
             messages.error(request, 'Comentario no encontrado.')
     
+    pagina = paginar(comentarios, 'fecha', request.GET.get('cursor'))
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(pagina_json(pagina, _comentario_json))
+
     context = {
-        'comentarios': comentarios,
+        'comentarios': pagina.items,
+        'pagina': pagina,
     }
     return render(request, 'core/ver_comentarios.html', context)
 
+@presupuesto_consultas(8)
 @login_required
 @user_passes_test(es_admin)
 def generar_reporte(request):
     """Vista para que el admin genere reportes"""
-    # Estadísticas básicas
-    hoy = datetime.now().date()
-    semana_pasada = hoy - timedelta(days=7)
-    mes_pasado = hoy - timedelta(days=30)
-    
-    pedidos_hoy = Pedido.objects.filter(fecha_pedido__date=hoy).count()
-    pedidos_semana = Pedido.objects.filter(fecha_pedido__date__gte=semana_pasada).count()
-    pedidos_mes = Pedido.objects.filter(fecha_pedido__date__gte=mes_pasado).count()
-    
-    ventas_hoy = Pedido.objects.filter(fecha_pedido__date=hoy, estado='entregado').aggregate(Sum('total'))['total__sum'] or 0
-    ventas_semana = Pedido.objects.filter(fecha_pedido__date__gte=semana_pasada, estado='entregado').aggregate(Sum('total'))['total__sum'] or 0
-    ventas_mes = Pedido.objects.filter(fecha_pedido__date__gte=mes_pasado, estado='entregado').aggregate(Sum('total'))['total__sum'] or 0
-    
-    # Productos más vendidos
-    productos_populares = ItemPedido.objects.values(
+    if request.method == 'POST':
+        tipo = request.POST.get('tipo')
+        dias = DIAS_POR_REPORTE.get(tipo)
+        if dias is None:
+            messages.error(request, 'Tipo de reporte no válido.')
+        else:
+            fecha_fin = timezone.localdate()
+            fecha_inicio = fecha_fin - timedelta(days=dias - 1)
+            # La clave del formulario evita guardar dos veces el mismo envío
+            clave = request.POST.get('clave')
+            encolar(
+                'guardar_reporte',
+                {'tipo': tipo, 'fecha_inicio': fecha_inicio.isoformat(), 'fecha_fin': fecha_fin.isoformat()},
+                prioridad=10,
+                clave=f'reporte:{clave[:64]}' if clave else None,
+            )
+            messages.success(request, f'{dict(Reporte.TIPOS)[tipo]} en preparación; aparecerá en la lista en unos segundos.')
+        return redirect('generar_reporte')
+
+    # Estadísticas básicas desde los resúmenes diarios
+    periodos = resumen_periodos()
+    
+    # Productos más vendidos en la misma ventana que los gráficos (?dias=, 30 por defecto)
+    dias = _dias_grafico(request)
+    inicio, _ = rango_fechas(timezone.localdate() - timedelta(days=dias), timezone.localdate())
+    productos_populares = ItemPedido.objects.filter(
+        pedido__fecha_pedido__gte=inicio
+    ).values(
         'producto__nombre'
     ).annotate(
         total_vendido=Sum('cantidad')
     ).order_by('-total_vendido')[:5]
     
     context = {
-        'pedidos_hoy': pedidos_hoy,
-        'pedidos_semana': pedidos_semana,
-        'pedidos_mes': pedidos_mes,
-        'ventas_hoy': ventas_hoy,
-        'ventas_semana': ventas_semana,
-        'ventas_mes': ventas_mes,
+        'pedidos_hoy': periodos['hoy']['total_pedidos'],
+        'pedidos_semana': periodos['semana']['total_pedidos'],
+        'pedidos_mes': periodos['mes']['total_pedidos'],
+        'ventas_hoy': periodos['hoy']['total_ventas'],
+        'ventas_semana': periodos['semana']['total_ventas'],
+        'ventas_mes': periodos['mes']['total_ventas'],
         'productos_populares': productos_populares,
+        'reportes': Reporte.objects.order_by('-fecha_generacion')[:5],
+        'tipos_reporte': Reporte.TIPOS,
+        'clave_formulario': uuid.uuid4().hex,
+        'graficos': graficos.TIPOS,
+        'ventanas_graficos': graficos.VENTANAS,
+        'dias_graficos': dias,
+        'exportar_desde': timezone.localdate().replace(day=1),
+        'exportar_hasta': timezone.localdate(),
     }
     return render(request, 'core/generar_reporte.html', context)
 
+def _dias_grafico(request):
+    try:
+        dias = int(request.GET.get('dias', 30))
+    except ValueError:
+        dias = 30
+    return dias if dias in graficos.VENTANAS else 30
+
+@login_required
+@user_passes_test(es_admin)
+def grafico_reporte(request, tipo):
+    """Imagen cacheada de un gráfico del reporte; nunca se dibuja durante la petición"""
+    formato = request.GET.get('formato', 'png')
+    if tipo not in graficos.TIPOS or formato not in graficos.FORMATOS:
+        raise Http404('Gráfico no encontrado')
+
+    ruta = graficos.obtener_grafico(tipo, _dias_grafico(request), formato)
+    if ruta is None:
+        response = HttpResponse(graficos.PLACEHOLDER_SVG, content_type='image/svg+xml')
+        response['Cache-Control'] = 'no-store'
+        return response
+    try:
+        response = FileResponse(open(ruta, 'rb'), content_type=graficos.FORMATOS[formato])
+    except FileNotFoundError:
+        # Lo reemplazó una versión nueva mientras tanto
+        return redirect(request.get_full_path())
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
+
+@login_required
+@user_passes_test(es_admin)
+def exportar_datos(request):
+    """Descarga en streaming de pedidos o reservas para un rango de fechas"""
+    conjunto = request.GET.get('conjunto', 'pedidos')
+    formato = request.GET.get('formato', 'csv')
+    try:
+        desde = parse_date(request.GET.get('desde', ''))
+        hasta = parse_date(request.GET.get('hasta', ''))
+    except ValueError:
+        desde = hasta = None
+
+    if conjunto not in CONJUNTOS or formato not in FORMATOS:
+        messages.error(request, 'Tipo de exportación no válido.')
+        return redirect('generar_reporte')
+    if not desde or not hasta or desde > hasta:
+        messages.error(request, 'Indica un rango de fechas válido para exportar.')
+        return redirect('generar_reporte')
+
+    return respuesta_exportacion(request, conjunto, formato, desde, hasta, gzip=request.GET.get('gzip') == '1')
+
+@login_required
+@user_passes_test(es_admin)
+def fragmentos_cache(request):
+    """Aciertos y fallos de la caché de fragmentos de plantilla"""
+    return JsonResponse({'fragmentos': estadisticas_fragmentos()})
+
+@presupuesto_consultas(6)
 @login_required
 @user_passes_test(es_admin)
 def gestionar_personal(request):
@@ -234,11 +385,12 @@ def gestionar_personal(request):
     return render(request, 'core/gestionar_personal.html', context)
 
 
+@presupuesto_consultas(8)
 @login_required
 @user_passes_test(es_admin)
 def gestionar_reservas(request):
     """Vista para que el admin gestione las reservas"""
-    reservas = Reserva.objects.all().order_by('-fecha_creacion')
+    reservas = Reserva.objects.select_related('cliente')
     
     # Filtros
     estado_filter = request.GET.get('estado', '')
@@ -247,14 +399,13 @@ def gestionar_reservas(request):
     if estado_filter:
         reservas = reservas.filter(estado=estado_filter)
     
-    if fecha_filter:
-        reservas = reservas.filter(fecha_reserva__date=fecha_filter)
-    
-    # Estadísticas
-    total_reservas = reservas.count()
-    reservas_pendientes = reservas.filter(estado='pendiente').count()
-    reservas_confirmadas = reservas.filter(estado='confirmada').count()
-    reservas_hoy = Reserva.objects.filter(fecha_reserva__date=datetime.now().date()).count()
+    try:
+        fecha = parse_date(fecha_filter) if fecha_filter else None
+    except ValueError:
+        fecha = None
+    if fecha:
+        inicio, fin = rango_fechas(fecha, fecha)
+        reservas = reservas.filter(fecha_reserva__gte=inicio, fecha_reserva__lt=fin)
     
     if request.method == 'POST':
         reserva_id = request.POST.get('reserva_id')
@@ -263,53 +414,180 @@ def gestionar_reservas(request):
         
         try:
             reserva = Reserva.objects.get(id=reserva_id)
-            reserva.estado = nuevo_estado
-            if mesa_asignada:
-                reserva.mesa = mesa_asignada
-            reserva.save()
+            # Con inventario de mesas cargado se valida la mesa pedida o se
+            # elige la mejor libre al confirmar; sin inventario se guarda tal cual.
+            confirmar_reserva(reserva, nuevo_estado, mesa_asignada or None, elegir='asignar_mesa' in request.POST)
             
             messages.success(request, f'Reserva #{reserva_id} actualizada a {nuevo_estado}')
             return redirect('gestionar_reservas')
         except Reserva.DoesNotExist:
             messages.error(request, 'Reserva no encontrada')
+        except MesaNoDisponible as e:
+            messages.error(request, f'Reserva #{reserva_id}: {e}')
+            return redirect('gestionar_reservas')
     
+    pagina = paginar(reservas, 'fecha_creacion', request.GET.get('cursor'))
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(pagina_json(pagina, _reserva_json))
+
     context = {
-        'reservas': reservas,
-        'total_reservas': total_reservas,
-        'reservas_pendientes': reservas_pendientes,
-        'reservas_confirmadas': reservas_confirmadas,
-        'reservas_hoy': reservas_hoy,
+        'reservas': pagina.items,
+        'pagina': pagina,
+        'mesas': Mesa.objects.filter(activa=True).order_by('numero'),
+        **estadisticas_reservas(estado_filter, fecha),
         'estado_filter': estado_filter,
         'fecha_filter': fecha_filter,
     }
     return render(request, 'core/gestionar_reservas.html', context)
 
+@presupuesto_consultas(8)
 @login_required
 @user_passes_test(es_personal)
-def personal_dashboard(request):
-    # Estadísticas para el personal
-    pedidos_pendientes = Pedido.objects.exclude(estado__in=['entregado', 'cancelado']).count()
-    pedidos_hoy = Pedido.objects.filter(fecha_pedido__date=datetime.now().date()).count()
-    
-    # Pedidos asignados al personal (excluir entregados y cancelados)
-    pedidos = Pedido.objects.exclude(estado__in=['entregado', 'cancelado']).order_by('fecha_pedido')
+@usuario_async
+async def personal_dashboard(request):
+    # Pedidos asignados al personal (excluir entregados y cancelados), los más antiguos primero
+    pedidos = Pedido.objects.select_related('cliente')
     
     if request.method == 'POST':
-        pedido_id = request.POST.get('pedido_id')
+        try:
+            pedido_id = int(request.POST.get('pedido_id'))
+        except (TypeError, ValueError):
+            raise Http404
         nuevo_estado = request.POST.get('estado')
-        pedido = get_object_or_404(Pedido, id=pedido_id)
-        pedido.estado = nuevo_estado
-        pedido.save()
-        messages.success(request, f'Pedido #{pedido_id} actualizado a {nuevo_estado}')
+        [resultado] = await sync_to_async(cambiar_estados)(
+            [(pedido_id, request.POST.get('estado_actual'), nuevo_estado)]
+        )
+        if resultado['ok']:
+            messages.success(request, f'Pedido #{pedido_id} actualizado a {nuevo_estado}')
+        elif resultado['error'] == 'no_existe':
+            raise Http404
+        elif resultado['error'] == 'conflicto':
+            messages.warning(request, f'El pedido #{pedido_id} ya había cambiado de estado; revisa la cola.')
+        else:
+            messages.error(request, f'El pedido #{pedido_id} no puede pasar a {nuevo_estado}.')
         return redirect('personal_dashboard')
     
+    # Por partes, un estado cada una: la página sale de pedido_estado_fecha_idx
+    # sin recorrer el historial de pedidos cerrados
+    pagina = await apaginar_por_partes(
+        pedidos, [Q(estado=estado) for estado in Pedido.ESTADOS_ABIERTOS],
+        'fecha_pedido', request.GET.get('cursor'), descendente=False,
+    )
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(pagina_json(pagina, _pedido_json))
+
+    # Los items solo hacen falta para los detalles que no están en caché
+    precarga, faltantes = await aprecargar('detalle_pedido', [((pedido, pedido.cliente, 'menu'), ()) for pedido in pagina.items])
+    if faltantes:
+        await sync_to_async(prefetch_related_objects)([pagina.items[i] for i in faltantes], 'items__producto')
+
     context = {
-        'pedidos': pedidos,
-        'pedidos_pendientes': pedidos_pendientes,
-        'pedidos_hoy': pedidos_hoy,
+        'pedidos': pagina.items,
+        'pagina': pagina,
+        'fragmentos_precargados': precarga,
+        **await aestadisticas_personal(),
+        'ultimo_evento': await aultimo_evento(),
+        # Bajo WSGI una conexión abierta ocupa un worker: la página consulta de a ratos
+        'tiempo_real': isinstance(request, ASGIRequest),
     }
     return render(request, 'core/personal_dashboard.html', context)
 
+@login_required
+@user_passes_test(es_personal)
+@require_http_methods(['POST'])
+def cambiar_estados_pedidos(request):
+    """Cambia el estado de varios pedidos de una vez y devuelve el resultado de cada uno.
+
+    Los pedidos que otra persona ya movió vuelven con ``error: "conflicto"`` y
+    su estado actual, para que la cola se corrija sin recargar la página.
+    """
+    try:
+        cambios = leer_cambios(request.body)
+    except CambiosInvalidos as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    resultados = cambiar_estados(cambios)
+    return JsonResponse({
+        'actualizados': sum(resultado['ok'] for resultado in resultados),
+        'resultados': resultados,
+    })
+
+@presupuesto_consultas(6)
+@login_required
+@user_passes_test(es_personal)
+def rutas_reparto(request):
+    """Pedidos listos agrupados en salidas de repartidor según las zonas de entrega"""
+    plan = planificar_listos()
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'rutas': [
+                {
+                    'minutos': ruta.minutos,
+                    'recorrido': ruta.recorrido,
+                    'paradas': [
+                        {'zona': parada.nombre, 'llegada': parada.llegada, 'pedidos': [p.id for p in parada.pedidos]}
+                        for parada in ruta.paradas
+                    ],
+                }
+                for ruta in plan.rutas
+            ],
+            'sin_ruta': [pedido.id for pedido in plan.sin_ruta],
+        })
+    context = {
+        'plan': plan,
+        'total_pedidos': sum(len(parada.pedidos) for ruta in plan.rutas for parada in ruta.paradas) + len(plan.sin_ruta),
+    }
+    return render(request, 'core/rutas_reparto.html', context)
+
+def _evento_inicial(request):
+    # EventSource reenvía el último id recibido al reconectarse
+    desde = request.headers.get('Last-Event-ID') or request.GET.get('desde', 0)
+    try:
+        return int(desde)
+    except (TypeError, ValueError):
+        return 0
+
+@login_required
+@user_passes_test(es_personal)
+async def eventos_pedidos(request):
+    """Stream SSE con los cambios de pedidos para la cola de cocina"""
+    desde = _evento_inicial(request)
+    # Bajo WSGI un generador async se consumiría entero antes de enviar nada
+    eventos = stream_eventos(desde) if isinstance(request, ASGIRequest) else iterar_eventos(desde)
+    response = StreamingHttpResponse(eventos, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+@user_passes_test(es_personal)
+async def eventos_pedidos_poll(request):
+    """Long-poll de respaldo cuando el navegador no mantiene la conexión SSE"""
+    # Bajo WSGI la espera bloquearía el worker: se responde enseguida
+    espera = ESPERA_POLL if isinstance(request, ASGIRequest) else 0
+    ultimo, eventos = await esperar_eventos(_evento_inicial(request), espera=espera)
+    return JsonResponse({'ultimo': ultimo, 'eventos': eventos})
+
+@presupuesto_consultas(6)
+@login_required
+@user_passes_test(es_personal)
+def pronostico_preparacion(request):
+    """Unidades a preparar por producto según el pronóstico de demanda"""
+    hoy = timezone.localdate()
+    dias_adelante = range(1, 8)
+    try:
+        objetivo = parse_date(request.GET.get('fecha', ''))
+    except ValueError:
+        objetivo = None
+    if objetivo is None or not 1 <= (objetivo - hoy).days <= 7:
+        objetivo = hoy + timedelta(days=1)
+
+    context = {
+        'productos': calcular_preparacion(objetivo),
+        'objetivo': objetivo,
+        'fechas': [hoy + timedelta(days=dias) for dias in dias_adelante],
+    }
+    return render(request, 'core/pronostico.html', context)
+
 @login_required
 @user_passes_test(es_personal)
 def editar_perfil_personal(request):
@@ -328,14 +606,16 @@ def editar_perfil_personal(request):
     
     return render(request, 'core/editar_perfil_personal.html')
 
+@presupuesto_consultas(8)
 @login_required
 @user_passes_test(es_cliente)
-def cliente_dashboard(request):
+@usuario_async
+async def cliente_dashboard(request):
     # Información del cliente
-    pedidos_cliente = Pedido.objects.filter(cliente=request.user).order_by('-fecha_pedido')[:5]
-    reservas_cliente = Reserva.objects.filter(cliente=request.user).order_by('-fecha_creacion')[:5]
-    pedidos_pendientes = Pedido.objects.filter(cliente=request.user).exclude(estado__in=['entregado', 'cancelado']).count()
-    comentarios_count = Comentario.objects.filter(cliente=request.user).count()
+    pedidos_cliente = [p async for p in Pedido.objects.filter(cliente=request.user).order_by('-fecha_pedido')[:5]]
+    reservas_cliente = [r async for r in Reserva.objects.filter(cliente=request.user).order_by('-fecha_creacion')[:5]]
+    pedidos_pendientes = await Pedido.objects.filter(cliente=request.user).exclude(estado__in=['entregado', 'cancelado']).acount()
+    comentarios_count = await Comentario.objects.filter(cliente=request.user).acount()
     
     context = {
         'pedidos': pedidos_cliente,
@@ -346,54 +626,57 @@ def cliente_dashboard(request):
     
     return render(request, 'core/cliente_dashboard.html', context)
 
-def menu(request):
-    categorias = Categoria.objects.all()
-    productos_por_categoria = {}
-    
-    for categoria in categorias:
-        productos = Menu.objects.filter(categoria=categoria, disponible=True)
-        if productos.exists():
-            productos_por_categoria[categoria] = productos
-    
+@presupuesto_consultas(3)
+@usuario_async
+async def menu(request):
+    # Con el fragmento en caché no hace falta ni el catálogo
+    precarga, faltantes = await aprecargar(
+        'menu', [(('menu', 'categoria'), (request.user.is_authenticated, getattr(request.user, 'rol', '')))]
+    )
     context = {
-        'productos_por_categoria': productos_por_categoria,
+        'productos_por_categoria': await aobtener_catalogo() if faltantes else {},
+        'fragmentos_precargados': precarga,
     }
     return render(request, 'core/menu.html', context)
 
+@presupuesto_consultas(2)
+@require_http_methods(['GET'])
+def buscar_menu(request):
+    """Búsqueda pública de productos disponibles por nombre, descripción o categoría"""
+    texto = request.GET.get('q', '').strip()
+    if len(texto) < 2:
+        return JsonResponse({'resultados': []})
+    resultados = [
+        {
+            'id': producto.id,
+            'nombre': producto.nombre,
+            'descripcion': producto.descripcion,
+            'categoria': producto.categoria.nombre,
+            'precio': str(producto.precio),
+        }
+        for producto in buscar_productos(texto)
+    ]
+    return JsonResponse({'resultados': resultados})
+
+@presupuesto_consultas(16)
 @login_required
 @user_passes_test(es_cliente)
-def hacer_pedido(request):
+@usuario_async
+async def hacer_pedido(request):
+    zonas = await sync_to_async(opciones_zonas)()
     if request.method == 'POST':
-        pedido_form = PedidoForm(request.POST)
-        if pedido_form.is_valid():
-            # Crear el pedido
+        pedido_form = PedidoForm(request.POST, zonas=zonas)
+        if await sync_to_async(pedido_form.is_valid)():
             pedido = pedido_form.save(commit=False)
             pedido.cliente = request.user
-            pedido.total = 0  # Se calculará con los items
-            pedido.save()
-            
-            # Procesar el carrito
-            carrito_data = request.POST.get('carrito_data')
-            items_procesados = 0
-            
-            if carrito_data:
-                try:
-                    import json
-                    items = json.loads(carrito_data)
-                    for item in items:
-                        producto = Menu.objects.get(id=item['id'])
-                        ItemPedido.objects.create(
-                            pedido=pedido,
-                            producto=producto,
-                            cantidad=item['cantidad'],
-                            subtotal=item['subtotal']
-                        )
-                        items_procesados += 1
-                except Exception as e:
-                    # En caso de error, eliminar el pedido creado
-                    pedido.delete()
-                    messages.error(request, f'Error al procesar el pedido: {str(e)}')
-                    return redirect('hacer_pedido')
+
+            try:
+                # La transacción de crear_pedido corre entera en un hilo
+                pedido, items = await sync_to_async(crear_pedido)(pedido, request.POST.get('carrito_data'))
+            except CarritoInvalido as e:
+                messages.error(request, f'Error al procesar el pedido: {str(e)}')
+                return redirect('hacer_pedido')
+            items_procesados = len(items)
             
             if items_procesados > 0:
                 messages.success(request, f'¡Pedido #{pedido.id} creado exitosamente! Total: ${pedido.total}. Pronto nos contactaremos contigo.')
@@ -404,34 +687,31 @@ def hacer_pedido(request):
         else:
             messages.error(request, 'Por favor corrige los errores en el formulario.')
     else:
-        pedido_form = PedidoForm()
-    
-    # Obtener productos del menú organizados por categoría
-    categorias = Categoria.objects.all()
-    productos_por_categoria = {}
-    
-    for categoria in categorias:
-        productos = Menu.objects.filter(categoria=categoria, disponible=True)
-        if productos.exists():
-            productos_por_categoria[categoria] = productos
+        pedido_form = PedidoForm(zonas=zonas)
     
+    precarga, faltantes = await aprecargar('hacer_pedido', [(('menu', 'categoria'), ())])
     context = {
         'pedido_form': pedido_form,
-        'productos_por_categoria': productos_por_categoria,
+        'productos_por_categoria': await aobtener_catalogo() if faltantes else {},
+        'fragmentos_precargados': precarga,
     }
     return render(request, 'core/hacer_pedido.html', context)
 
 @login_required
 @user_passes_test(es_cliente)
-def reservar_mesa(request):
+@usuario_async
+async def reservar_mesa(request):
     if request.method == 'POST':
         form = ReservaForm(request.POST)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             reserva = form.save(commit=False)
             reserva.cliente = request.user
-            reserva.save()
-            messages.success(request, 'Reserva creada exitosamente. Te esperamos!')
-            return redirect('cliente_dashboard')
+            if await ahay_mesas() and not await amesas_disponibles(reserva.fecha_reserva, reserva.numero_personas):
+                form.add_error('fecha_reserva', 'No hay mesas disponibles para esa cantidad de personas en ese horario.')
+            else:
+                await reserva.asave()
+                messages.success(request, 'Reserva creada exitosamente. Te esperamos!')
+                return redirect('cliente_dashboard')
     else:
         form = ReservaForm()
     
@@ -440,29 +720,84 @@ def reservar_mesa(request):
     }
     return render(request, 'core/reservar_mesa.html', context)
 
+@presupuesto_consultas(3)
 @login_required
 @user_passes_test(es_cliente)
-def ver_pedidos(request):
-    pedidos = Pedido.objects.filter(cliente=request.user).order_by('-fecha_pedido')
+@usuario_async
+async def ver_pedidos(request):
+    pedidos = Pedido.objects.filter(cliente=request.user)
+    pagina = await apaginar(pedidos, 'fecha_pedido', request.GET.get('cursor'))
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(pagina_json(pagina, _pedido_json))
+
     context = {
-        'pedidos': pedidos,
+        'pedidos': pagina.items,
+        'pagina': pagina,
     }
     return render(request, 'core/ver_pedidos.html', context)
 
+@presupuesto_consultas(3)
 @login_required
 @user_passes_test(es_cliente)
 def ver_reservas(request):
-    reservas = Reserva.objects.filter(cliente=request.user).order_by('-fecha_creacion')
+    reservas = Reserva.objects.filter(cliente=request.user)
+    pagina = paginar(reservas, 'fecha_creacion', request.GET.get('cursor'))
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(pagina_json(pagina, _reserva_json))
+
     context = {
-        'reservas': reservas,
+        'reservas': pagina.items,
+        'pagina': pagina,
     }
     return render(request, 'core/ver_reservas.html', context)
 
+# API de solo lectura (ver core.api). Las respuestas se revalidan siempre
+# (no-cache) y, si no cambió nada, se contestan con 304.
+
+@presupuesto_consultas(4)
+@require_http_methods(['GET', 'HEAD'])
+@cache_control(public=True, no_cache=True)
+@api.condicional(api.validadores_menu)
+def api_menu(request):
+    return api.respuesta(api.menu())
+
+@presupuesto_consultas(3)
+@login_required
+@user_passes_test(es_cliente)
+@require_http_methods(['GET', 'HEAD'])
+@cache_control(private=True, no_cache=True)
+@api.condicional(api.validadores_pedidos)
+def api_pedidos(request):
+    pagina = paginar(api.pedidos_de(request.user), 'fecha_pedido', request.GET.get('cursor'))
+    return api.respuesta(pagina_json(pagina, dict))
+
+@presupuesto_consultas(3)
+@login_required
+@user_passes_test(es_cliente)
+@require_http_methods(['GET', 'HEAD'])
+@cache_control(private=True, no_cache=True)
+@api.condicional(api.validadores_pedido)
+def api_pedido(request, pedido_id):
+    datos = api.pedido(request.user, pedido_id)
+    if datos is None:
+        raise Http404
+    return api.respuesta(datos)
+
+@presupuesto_consultas(3)
+@login_required
+@user_passes_test(es_cliente)
+@require_http_methods(['GET', 'HEAD'])
+@cache_control(private=True, no_cache=True)
+@api.condicional(api.validadores_reservas)
+def api_reservas(request):
+    pagina = paginar(api.reservas_de(request.user), 'fecha_creacion', request.GET.get('cursor'))
+    return api.respuesta(pagina_json(pagina, dict))
+
 @login_required
 @user_passes_test(es_cliente)
 def hacer_comentario(request):
     if request.method == 'POST':
-        form = ComentarioForm(request.POST)
+        form = ComentarioForm(request.POST, cliente=request.user)
         if form.is_valid():
             comentario = form.save(commit=False)
             comentario.cliente = request.user
@@ -470,95 +805,18 @@ def hacer_comentario(request):
             messages.success(request, '¡Gracias por tu comentario!')
             return redirect('cliente_dashboard')
     else:
-        form = ComentarioForm()
+        form = ComentarioForm(cliente=request.user)
     
     context = {
         'form': form,
     }
     return render(request, 'core/hacer_comentario.html', context)
 
-@login_required
-@user_passes_test(es_admin)
-def ver_comentarios(request):
-    comentarios = Comentario.objects.all().order_by('-fecha')
-    context = {
-        'comentarios': comentarios,
-    }
-    return render(request, 'core/ver_comentarios.html', context)
-
-@login_required
-@user_passes_test(es_admin)
-def generar_reporte(request):
-    if request.method == 'POST':
-        # Lógica para generar reportes
-        pass
-    
-    # Estadísticas para mostrar
-    hoy = datetime.now().date()
-    semana_pasada = hoy - timedelta(days=7)
-    mes_pasado = hoy - timedelta(days=30)
-    
-    pedidos_hoy = Pedido.objects.filter(fecha_pedido__date=hoy).count()
-    pedidos_semana = Pedido.objects.filter(fecha_pedido__date__gte=semana_pasada).count()
-    pedidos_mes = Pedido.objects.filter(fecha_pedido__date__gte=mes_pasado).count()
-    
-    context = {
-        'pedidos_hoy': pedidos_hoy,
-        'pedidos_semana': pedidos_semana,
-        'pedidos_mes': pedidos_mes,
-    }
-    return render(request, 'core/generar_reporte.html', context)
-
 def custom_logout(request):
     auth_logout(request)
     messages.success(request, 'Has cerrado sesión correctamente.')
     return redirect('index')
 
-# =============================================
-# VISTAS DEL ADMINISTRADOR
-# =============================================
-
-@login_required
-@user_passes_test(es_admin)
-def gestionar_personal(request):
-    """Vista para que el admin gestione el personal"""
-    personal = Usuario.objects.filter(rol='personal')
-    
-    context = {
-        'personal': personal,
-    }
-    return render(request, 'core/gestionar_personal.html', context)
-
-@login_required
-@user_passes_test(es_admin)
-def ver_comentarios(request):
-    """Vista para que el admin vea los comentarios"""
-    comentarios = Comentario.objects.all().order_by('-fecha')
-    
-    context = {
-        'comentarios': comentarios,
-    }
-    return render(request, 'core/ver_comentarios.html', context)
-
-@login_required
-@user_passes_test(es_admin)
-def generar_reporte(request):
-    """Vista para que el admin genere reportes"""
-    # Estadísticas básicas
-    from datetime import datetime, timedelta
-    hoy = datetime.now().date()
-    
-    pedidos_hoy = Pedido.objects.filter(fecha_pedido__date=hoy).count()
-    pedidos_semana = Pedido.objects.filter(fecha_pedido__date__gte=hoy - timedelta(days=7)).count()
-    pedidos_mes = Pedido.objects.filter(fecha_pedido__date__gte=hoy - timedelta(days=30)).count()
-
-    context = {
-        'pedidos_hoy': pedidos_hoy,
-        'pedidos_semana': pedidos_semana,
-        'pedidos_mes': pedidos_mes,
-    }
-    return render(request, 'core/generar_reporte.html', context)
-
 @login_required
 def editar_perfil_cliente(request):
     """Vista para que el cliente edite su perfil"""
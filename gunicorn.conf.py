@@ -0,0 +1,78 @@
+# Configuración de gunicorn; se carga sola al ejecutarlo desde la raíz del proyecto.
+#
+# Despliegue por defecto: workers de uvicorn sobre restaurant.asgi. Los
+# paneles son vistas async y la cola de cocina mantiene conexiones SSE
+# abiertas; mientras esperan a la base, a la caché o a nuevos eventos el
+# worker sigue atendiendo otras peticiones.
+#
+#     gunicorn
+#
+# Despliegue sync, con hilos si se pide GUNICORN_THREADS. Sigue funcionando,
+# pero la cola de cocina consulta cada pocos segundos en lugar de recibir los
+# cambios al instante:
+#
+#     GUNICORN_WORKER_CLASS=sync gunicorn
+#
+# En desarrollo se puede usar uvicorn directamente:
+#
+#     uvicorn restaurant.asgi:application --port 8000
+#
+# Más de un worker necesita REDIS_URL: sin ella la caché es memoria local de
+# cada proceso y las versiones, los eventos de la cocina y el usuario en caché
+# no se verían entre workers. Por eso sin REDIS_URL se arranca un solo worker
+# (y el check core.E001 rechaza WEB_CONCURRENCY > 1); con uvicorn ese worker
+# atiende muchas conexiones a la vez.
+#
+# Los estáticos los sirve la propia aplicación (core.middleware.EstaticosMiddleware)
+# desde STATIC_ROOT, así que el build debe correr antes
+# `python manage.py collectstatic --noinput`.
+#
+# Las tareas en segundo plano (core.tareas) las ejecuta un proceso aparte:
+#
+#     python manage.py procesar_tareas --hilos 4
+#
+# Variables: PORT, WEB_CONCURRENCY (workers), GUNICORN_WORKER_CLASS,
+# GUNICORN_THREADS (solo workers sync/gthread) y GUNICORN_TIMEOUT.
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+# Aplicación cuando no se pasa una en la línea de comandos
+wsgi_app = 'restaurant.asgi:application' if 'uvicorn' in worker_class.lower() else 'restaurant.wsgi:application'
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY',
+    multiprocessing.cpu_count() * 2 + 1 if os.environ.get('REDIS_URL') else 1,
+))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Los workers sync se cortan si una petición tarda más que esto; bajo WSGI el
+# stream SSE dura 25 segundos y el long-poll responde enseguida
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Reciclar workers de vez en cuando evita que la memoria crezca sin límite
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # uvicorn trata al handler WSGI como una app ASGI 2 y todas las
+    # peticiones terminarían en 500; un worker sync no sabe llamar a la app
+    # ASGI. En los dos casos es mejor no arrancar
+    aplicacion = getattr(server.app, 'app_uri', None) or ''
+    asgi = '.asgi:' in aplicacion
+    if 'uvicorn' in server.cfg.worker_class_str.lower():
+        if not asgi:
+            raise RuntimeError(
+                f'Los workers de uvicorn necesitan restaurant.asgi:application, no {aplicacion or "otra aplicación"}'
+            )
+    elif asgi:
+        raise RuntimeError(
+            f'Los workers {server.cfg.worker_class_str} necesitan restaurant.wsgi:application, no {aplicacion}'
+        )
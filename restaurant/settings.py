@@ -36,6 +36,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.EstaticosMiddleware',
+    'core.middleware.LecturaPrimariaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -44,6 +46,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if DEBUG:
+    # Cuenta las consultas por petición y avisa de presupuestos excedidos y N+1
+    MIDDLEWARE.insert(0, 'core.middleware.PresupuestoConsultasMiddleware')
+
 ROOT_URLCONF = 'restaurant.urls'
 
 TEMPLATES = [
@@ -64,13 +70,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'restaurant.wsgi.application'
 
+# Con varios escritores a la vez (hilos de gunicorn, procesar_tareas) las
+# transacciones toman el lock de escritura al empezar y esperan hasta 20 s en
+# lugar de fallar con "database is locked" al pasar de leer a escribir.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
     }
 }
 
+# Réplicas de solo lectura: rutas a archivos SQLite separadas por comas en
+# DB_REPLICAS (p. ej. DB_REPLICAS=replica.sqlite3). Para una réplica Postgres
+# se agrega la entrada en DATABASES y su alias en DATABASE_REPLICAS. En los
+# tests las réplicas apuntan a la base de pruebas de 'default'.
+DATABASE_REPLICAS = []
+for numero, ruta in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{numero}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / ruta.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{numero}')
+
+DATABASE_ROUTERS = ['core.replicas.RouterReplicas']
+
+# Segundos que un navegador sigue leyendo de la primaria después de escribir
+REPLICA_RETRASO_MAXIMO = 5
+
+# Caché compartida entre workers: con REDIS_URL (p. ej. redis://localhost:6379/0)
+# se usa Redis; si no, memoria local, que solo sirve con un único proceso.
+# Las sesiones, las versiones de core.versiones y los eventos de la cocina
+# dependen de que todos los workers vean la misma caché.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Sesiones leídas de la caché y escritas también en la base (si la caché las
+# pierde se recuperan de ahí); el usuario de la sesión se resuelve con
+# core.autenticacion sin consultar Usuario en cada petición
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['core.autenticacion.BackendUsuarioCacheado']
+USUARIO_CACHE_TTL = 60 * 60
+# Con la caché local de cada proceso, el tope para que un cambio de rol o una
+# baja llegue a los otros procesos
+USUARIO_CACHE_TTL_LOCAL = 30
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -97,6 +154,15 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'core/static'),
 ]
 
+# collectstatic escribe los archivos con hash en el nombre más sus variantes
+# .gz y .br (ver core.estaticos); EstaticosMiddleware los sirve con caché
+# inmutable cuando ESTATICOS_SERVIR está activo.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.estaticos.AlmacenComprimido'},
+}
+ESTATICOS_SERVIR = not DEBUG
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -107,4 +173,38 @@ AUTH_USER_MODEL = 'core.Usuario'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Segundos que se reutilizan los contadores de los dashboards (0 para desactivar)
+ESTADISTICAS_CACHE_TTL = 10
+
+# Gráficos de reportes (ver core.graficos): carpeta de la caché en disco,
+# procesos que dibujan y segundos mínimos entre dos regeneraciones
+GRAFICOS_DIR = BASE_DIR / 'cache' / 'graficos'
+GRAFICOS_PROCESOS = 2
+GRAFICOS_INTERVALO_MINIMO = 60
+
+# Miniaturas de las imágenes del menú (ver core.imagenes): anchos en píxeles
+# de las variantes JPEG/WebP, que genera la tarea procesar_imagen
+IMAGENES_ANCHOS = (200, 400, 800)
+
+# Segundos que se reutiliza el pronóstico de preparación (core.pronostico)
+PRONOSTICO_CACHE_TTL = 60 * 60
+
+# Repartos (ver core.rutas): pedidos por salida de repartidor y minutos
+# máximos desde el restaurante hasta la última entrega
+RUTAS_CAPACIDAD = 5
+RUTAS_MAX_MINUTOS = 45
+
+# Cola de tareas en segundo plano (ver core.tareas). Las ejecuta
+# `python manage.py procesar_tareas`; con TAREAS_SINCRONAS se corren en el
+# mismo proceso al confirmar la transacción, para desarrollar sin trabajador.
+TAREAS_SINCRONAS = DEBUG
+TAREAS_MAX_INTENTOS = 3
+TAREAS_VISIBILIDAD = 5 * 60
+TAREAS_ESPERA_REINTENTO = 30
+
+# Presupuesto de consultas (ver core.middleware.PresupuestoConsultasMiddleware)
+PRESUPUESTO_CONSULTAS_DEFECTO = None
+PRESUPUESTO_CONSULTAS_REPETIDAS = 5
+PRESUPUESTO_CONSULTAS_ESTRICTO = False
+
 AUTH_USER_MODEL='core.Usuario'
\ No newline at end of file